@@ -1,35 +1,243 @@
 import os
+import uuid
+import atexit
+import hashlib
 import logging
-from flask import Flask, render_template, jsonify, request, redirect, url_for, flash
+import time
+from flask import Flask, Response, render_template, jsonify, request, redirect, url_for, flash, stream_with_context
+from werkzeug.http import http_date
 from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+# Set up logging (LOG_LEVEL=INFO skips the per-rule and per-post debug messages)
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "DEBUG").upper())
 logger = logging.getLogger(__name__)
 
 # Import local modules
-from data_store import DataStore
+import metrics
+import serialization
+from data_store import DataStore, SettingsError
 from bot import Bot
 from comment_service import CommentService
+from posting_pipeline import PostingPipeline
+from post_events import create_post_source
+from storage import create_backend
+from history_archive import HistoryArchive
+from history_record import as_dict
+from template_compiler import TemplateError
+from rule_scheduler import CronError
+from tick_jobs import TickCoordinator
+from deployment import LeaderElector, PeriodicTask, create_leader_lock
 
 # Initialize Flask app
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev_secret_key")
+# orjson when installed; responses are compressed in compress_response below
+app.json = serialization.FastJSONProvider(app)
+# Encoded API responses, reused until the data they were built from changes
+response_cache = serialization.ResponseCache(default=app.json.default)
 
-# Initialize data store
-data_store = DataStore()
+# "single": this process runs everything. "multi": several web workers share
+# DATABASE_URL and elect one scheduler leader; the rest only serve requests.
+DEPLOYMENT_MODE = os.environ.get("DEPLOYMENT_MODE", "single")
+MULTI_PROCESS = DEPLOYMENT_MODE == "multi"
+# Seconds between checks for changes made by other processes
+SYNC_INTERVAL = float(os.environ.get("SYNC_INTERVAL", 2))
+
+# Initialize data store (memory only unless DATABASE_URL is set)
+storage_backend = create_backend(os.environ.get("DATABASE_URL"))
+atexit.register(storage_backend.close)
+if MULTI_PROCESS and not storage_backend.persistent:
+    raise RuntimeError("DEPLOYMENT_MODE=multi needs a shared DATABASE_URL")
+# History evicted from the in-memory window is archived to compressed daily segments
+history_archive = HistoryArchive(os.environ.get("HISTORY_ARCHIVE_DIR", "history_archive"),
+                                 read_only=MULTI_PROCESS)
+atexit.register(history_archive.close)
+# In multi-process mode only the elected leader seeds sample data
+data_store = DataStore(backend=storage_backend, archive=history_archive, sample_data=not MULTI_PROCESS)
 
 # Initialize comment service
 comment_service = CommentService(data_store)
 
+# Initialize posting pipeline
+posting_pipeline = PostingPipeline(
+    comment_service,
+    workers=int(os.environ.get("POSTING_WORKERS", 4)),
+    max_queue=int(os.environ.get("POSTING_QUEUE_SIZE", 100)),
+    events=data_store.events,
+    clock=data_store.clock,
+    rng=data_store.rng
+)
+atexit.register(posting_pipeline.stop)
+
+# Initialize post sources (comma separated: simulated, replay:<path>, twitter)
+post_sources = [
+    create_post_source(spec.strip(), clock=data_store.clock, rng=data_store.rng)
+    for spec in os.environ.get("POST_SOURCES", "simulated").split(",")
+    if spec.strip()
+]
+
 # Initialize bot
-bot = Bot(data_store, comment_service)
+bot = Bot(data_store, comment_service, pipeline=posting_pipeline, sources=post_sources)
+
+# Ticks run one at a time in the background; overlapping requests are coalesced
+tick_coordinator = TickCoordinator(bot.run_scheduled_tasks, events=data_store.events, clock=data_store.clock)
+atexit.register(tick_coordinator.stop)
 
-# Initialize scheduler
+# Initialize scheduler (polls post sources; scheduled rules have their own timer)
 scheduler = BackgroundScheduler()
-scheduler.add_job(bot.run_scheduled_tasks, 'interval', minutes=5)
-scheduler.start()
+scheduler.add_job(tick_coordinator.request, 'interval', minutes=5, args=['scheduled'], id='bot-tick')
+
+def shutdown_scheduler():
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+
+atexit.register(shutdown_scheduler)
+
+# Only the leader runs the bot; its status is shared through the store for the other workers
+leader_elector = None
+last_tick_request = None
+last_shared_status = None
+# The leader's status as last relayed to this follower's live streams
+relayed_status = {}
+
+def is_leader():
+    return leader_elector is None or leader_elector.is_leader
+
+def start_scheduling():
+    global last_tick_request
+    if MULTI_PROCESS:
+        data_store.set_leader(True)
+        data_store.sync_from_backend()
+        data_store.seed_sample_data()
+        # Don't replay a run-now that was requested before this process took over
+        last_tick_request = (storage_backend.load_state("tick_request") or {}).get("id")
+    bot.start()
+    if scheduler.running:
+        scheduler.resume()
+    else:
+        scheduler.start()
+
+def stop_scheduling():
+    if scheduler.running:
+        scheduler.pause()
+    bot.stop()
+    data_store.set_leader(False)
+
+def next_tick_at():
+    job = scheduler.get_job('bot-tick')
+    return job.next_run_time.isoformat() if job and job.next_run_time else None
+
+def bot_status():
+    return {
+        "last_tick": bot.last_tick,
+        "next_tick_at": next_tick_at(),
+        "rate_limits": bot.rate_limiter.snapshot(),
+        "schedule": bot.rule_scheduler.snapshot(),
+        "posting": posting_pipeline.stats()
+    }
+
+def sync_shared_state():
+    """Pick up changes from other workers; the leader also runs forwarded ticks and shares its status"""
+    global last_tick_request, last_shared_status
+    data_store.sync_from_backend()
+    if not is_leader():
+        relay_shared_events()
+        return
+    
+    tick_request = storage_backend.load_state("tick_request")
+    if tick_request and tick_request.get("id") != last_tick_request:
+        last_tick_request = tick_request["id"]
+        tick_coordinator.request("forwarded")
+    
+    jobs = [job.to_dict() for job in tick_coordinator.recent()]
+    changed = (bot.last_tick, next_tick_at(), jobs, posting_pipeline.queue_depth())
+    if changed != last_shared_status:
+        last_shared_status = changed
+        storage_backend.save_state("bot_status", dict(bot_status(), jobs=jobs))
+
+def relay_shared_events():
+    """
+    Followers never run ticks or post, so their live streams get the
+    leader's tick, job and queue updates from the shared bot status instead,
+    up to SYNC_INTERVAL late and without the tick "start" phase.
+    """
+    global relayed_status
+    status = storage_backend.load_state("bot_status") or {}
+    if not status or status == relayed_status:
+        return
+    
+    if status.get("last_tick") and status["last_tick"] != relayed_status.get("last_tick"):
+        data_store.events.publish("tick", dict(status["last_tick"], phase="end"))
+    relayed_jobs = {job["id"]: job for job in relayed_status.get("jobs", [])}
+    for job in reversed(status.get("jobs", [])):
+        if relayed_jobs.get(job["id"]) != job:
+            data_store.events.publish("job", job)
+    posting = status.get("posting") or {}
+    if posting.get("queue_depth") != (relayed_status.get("posting") or {}).get("queue_depth"):
+        data_store.events.publish("queue", {"depth": posting.get("queue_depth"),
+                                            "capacity": posting.get("queue_capacity")})
+    relayed_status = status
+
+if MULTI_PROCESS:
+    data_store.set_leader(False)
+    state_sync = PeriodicTask(sync_shared_state, SYNC_INTERVAL, name="state-sync")
+    state_sync.start()
+    atexit.register(state_sync.stop)
+    
+    leader_elector = LeaderElector(
+        create_leader_lock(os.environ.get("DATABASE_URL"), os.environ.get("LEADER_LOCK_FILE", "sigm-leader.lock")),
+        on_elected=start_scheduling,
+        on_lost=stop_scheduling
+    )
+    leader_elector.start()
+    atexit.register(leader_elector.stop)
+else:
+    start_scheduling()
+    atexit.register(bot.stop)
+
+# Process state sampled when /metrics is scraped
+metrics.gauge("sigm_history_entries", "Comment history entries held in memory", lambda: len(data_store.comment_history))
+metrics.gauge("sigm_posting_queue_depth", "Comments waiting for a posting worker",
+              lambda: posting_pipeline.stats()["queue_depth"])
+metrics.gauge("sigm_posting_dead_letters", "Post jobs that ran out of attempts",
+              lambda: posting_pipeline.stats()["dead_letters"])
+metrics.gauge("sigm_stream_subscribers", "Open live update streams", data_store.events.subscriber_count)
+metrics.gauge("sigm_scheduler_leader", "1 if this process runs the schedulers", lambda: int(is_leader()))
+
+def cached_json(key, version, build):
+    """JSON response for `key` at data `version`, encoded (and compressed) once per version"""
+    body = response_cache.get(key, version, build)
+    response = app.response_class(body.data, mimetype='application/json')
+    response.encoded_body = body
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Compress bodies with the best encoding the client accepts (brotli if installed, else gzip)"""
+    if (response.direct_passthrough or response.is_streamed or response.status_code in (204, 304)
+            or response.status_code < 200 or 'Content-Encoding' in response.headers
+            or response.mimetype not in serialization.COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = serialization.negotiate_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    
+    body = getattr(response, 'encoded_body', None)
+    if body is not None:
+        data = body.compressed(encoding)
+    else:
+        data = serialization.compress(response.get_data(), encoding)
+    if data is None:
+        return response
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    # The compressed bytes differ, so a strong validator would be wrong for them
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
 
 # Routes
 @app.route('/')
@@ -44,22 +252,33 @@ def templates():
 
 @app.route('/api/templates', methods=['GET'])
 def get_templates():
-    return jsonify(data_store.get_templates())
+    snapshot = data_store.snapshot()
+    return cached_json("templates", snapshot.version, lambda: snapshot.template_list)
 
 @app.route('/api/templates', methods=['POST'])
 def add_template():
     template_data = request.json
-    template_id = data_store.add_template(template_data)
+    try:
+        template_id = data_store.add_template(template_data)
+    except TemplateError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     return jsonify({"success": True, "id": template_id})
 
 @app.route('/api/templates/<template_id>', methods=['PUT'])
 def update_template(template_id):
     template_data = request.json
-    success = data_store.update_template(template_id, template_data)
+    try:
+        success = data_store.update_template(template_id, template_data)
+    except TemplateError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     return jsonify({"success": success})
 
 @app.route('/api/templates/<template_id>', methods=['DELETE'])
 def delete_template(template_id):
+    rule_ids = data_store.rules_using_template(template_id)
+    if rule_ids:
+        return jsonify({"success": False, "message": f"Template is used by {len(rule_ids)} rule(s)",
+                        "rule_ids": rule_ids})
     success = data_store.delete_template(template_id)
     return jsonify({"success": success})
 
@@ -71,18 +290,25 @@ def rules():
 
 @app.route('/api/rules', methods=['GET'])
 def get_rules():
-    return jsonify(data_store.get_rules())
+    snapshot = data_store.snapshot()
+    return cached_json("rules", snapshot.version, lambda: snapshot.rule_list)
 
 @app.route('/api/rules', methods=['POST'])
 def add_rule():
     rule_data = request.json
-    rule_id = data_store.add_rule(rule_data)
+    try:
+        rule_id = data_store.add_rule(rule_data)
+    except CronError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     return jsonify({"success": True, "id": rule_id})
 
 @app.route('/api/rules/<rule_id>', methods=['PUT'])
 def update_rule(rule_id):
     rule_data = request.json
-    success = data_store.update_rule(rule_id, rule_data)
+    try:
+        success = data_store.update_rule(rule_id, rule_data)
+    except CronError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     return jsonify({"success": success})
 
 @app.route('/api/rules/<rule_id>', methods=['DELETE'])
@@ -90,45 +316,262 @@ def delete_rule(rule_id):
     success = data_store.delete_rule(rule_id)
     return jsonify({"success": success})
 
+def read_items():
+    """
+    Read a request body that is either a JSON array or NDJSON (one JSON
+    object per line, sent as application/x-ndjson), line by line.
+
+    Raises:
+        ValueError: If the body or one of its lines isn't valid JSON
+    """
+    if request.mimetype != 'application/x-ndjson':
+        items = request.get_json(silent=True)
+        if not isinstance(items, list):
+            raise ValueError("Expected a JSON array or application/x-ndjson body")
+        return items
+    
+    items = []
+    for number, line in enumerate(request.stream, 1):
+        if not line.strip():
+            continue
+        try:
+            items.append(serialization.loads(line))
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON on line {number}: {e}") from e
+    return items
+
+def batch_response(results):
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return jsonify({"success": "error" not in counts, "counts": counts, "results": results})
+
+def apply_batch(kind):
+    """Apply a batch of objects, each with an optional "op" (?op= sets the default, upsert if not given)"""
+    try:
+        items = read_items()
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    
+    default_op = request.args.get('op', 'upsert')
+    operations = []
+    for item in items:
+        data = dict(item) if isinstance(item, dict) else item
+        op = data.pop("op", default_op) if isinstance(data, dict) else default_op
+        operations.append({"op": op, "kind": kind, "data": data})
+    results = data_store.apply_config_batch(operations, atomic=request.args.get('atomic') in ('1', 'true'))
+    return batch_response(results)
+
+@app.route('/api/templates/batch', methods=['POST'])
+def batch_templates():
+    """Create, update, upsert or delete many templates in one transaction"""
+    return apply_batch("template")
+
+@app.route('/api/rules/batch', methods=['POST'])
+def batch_rules():
+    """Create, update, upsert or delete many rules in one transaction"""
+    return apply_batch("rule")
+
+@app.route('/api/export', methods=['GET'])
+def export_config():
+    """Stream settings, templates and rules as NDJSON, one {"kind", "data"} object per line"""
+    snapshot = data_store.snapshot()
+    
+    def generate():
+        yield serialization.dumps({"kind": "settings", "data": snapshot.settings}) + b"\n"
+        for template in snapshot.template_list:
+            yield serialization.dumps({"kind": "template", "data": template}) + b"\n"
+        for rule in snapshot.rule_list:
+            yield serialization.dumps({"kind": "rule", "data": rule}) + b"\n"
+    
+    filename = f"sigm-export-{datetime.now().strftime('%Y%m%d-%H%M%S')}.ndjson"
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@app.route('/api/import', methods=['POST'])
+def import_config():
+    """Upsert an export; all or nothing unless ?atomic=0"""
+    try:
+        items = read_items()
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    
+    operations = [
+        {"op": item.get("op", "upsert"), "kind": item.get("kind"), "data": item.get("data")}
+        if isinstance(item, dict) else item
+        for item in items
+    ]
+    results = data_store.apply_config_batch(operations, atomic=request.args.get('atomic', '1') in ('1', 'true'))
+    return batch_response(results)
+
 @app.route('/analytics')
 def analytics():
     return render_template('analytics.html', 
-                          history=data_store.get_comment_history(),
                           stats=data_store.get_analytics())
 
 @app.route('/api/analytics', methods=['GET'])
 def get_analytics():
-    return jsonify(data_store.get_analytics())
+    days = request.args.get('days', 7, type=int)
+    hours = min(max(request.args.get('hours', 24, type=int), 1), 24 * 7)
+    # Windows end at the current hour, so a new hour is a new version too
+    version = (data_store.history_version, data_store.snapshot().version,
+               data_store.clock.now().strftime("%Y-%m-%dT%H"))
+    try:
+        return cached_json(("analytics", days, hours), version,
+                           lambda: data_store.get_analytics(days=days, hours=hours))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+HISTORY_FILTERS = ('status', 'rule_id', 'template_id', 'start', 'end')
 
 @app.route('/api/history', methods=['GET'])
 def get_history():
-    return jsonify(data_store.get_comment_history())
+    # The history version changes on every write, so unchanged polls get a 304
+    version = data_store.history_version
+    etag = f"h{version}-{hashlib.md5(request.query_string).hexdigest()[:12]}"
+    last_modified = data_store.history_modified_at.replace(microsecond=0).astimezone()
+    if request.if_none_match.contains_weak(etag) or (
+            not request.if_none_match and request.if_modified_since is not None
+            and last_modified <= request.if_modified_since):
+        response = app.response_class(status=304)
+    else:
+        response = history_response(version)
+    
+    response.set_etag(etag)
+    response.headers['Last-Modified'] = http_date(last_modified)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def history_response(version):
+    try:
+        return cached_json(("history", request.query_string), version, build_history)
+    except ValueError as e:
+        response = jsonify({"success": False, "message": str(e)})
+        response.status_code = 400
+        return response
+
+def build_history():
+    paged = request.args.get('limit') is not None or any(
+        name in request.args for name in ('cursor', 'fields') + HISTORY_FILTERS
+    )
+    if not paged:
+        return [as_dict(entry) for entry in data_store.get_comment_history()]
+    
+    entries, next_cursor = data_store.query_history(
+        cursor=request.args.get('cursor'),
+        limit=min(max(request.args.get('limit', 50, type=int), 1), 500),
+        **{name: request.args.get(name) or None for name in HISTORY_FILTERS}
+    )
+    
+    fields = [field for field in request.args.get('fields', '').split(',') if field]
+    if fields:
+        entries = [{field: entry[field] for field in fields if field in entry} for entry in entries]
+    else:
+        entries = [as_dict(entry) for entry in entries]
+    
+    return {"items": entries, "next_cursor": next_cursor}
 
 @app.route('/settings')
 def settings():
     return render_template('settings.html', 
                           settings=data_store.get_settings())
 
+@app.route('/api/settings', methods=['GET'])
+def get_settings():
+    snapshot = data_store.snapshot()
+    return cached_json("settings", snapshot.version, lambda: snapshot.settings)
+
 @app.route('/api/settings', methods=['PUT'])
 def update_settings():
     settings_data = request.json
-    success = data_store.update_settings(settings_data)
+    try:
+        success = data_store.update_settings(settings_data)
+    except SettingsError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     return jsonify({"success": success})
 
 @app.route('/api/run-now', methods=['POST'])
 def run_now():
-    try:
-        bot.run_scheduled_tasks()
-        return jsonify({"success": True, "message": "Bot tasks executed successfully"})
-    except Exception as e:
-        logger.error(f"Error running bot: {str(e)}")
-        return jsonify({"success": False, "message": f"Error: {str(e)}"})
-
-# Register cleanup function
-@app.teardown_appcontext
-def shutdown_scheduler(exception=None):
-    if scheduler.running:
-        scheduler.shutdown()
+    """Queue a tick and return its job ID without waiting for it to run"""
+    if not is_leader():
+        # Picked up by the leader on its next sync
+        storage_backend.save_state("tick_request", {"id": uuid.uuid4().hex, "requested_at": datetime.now().isoformat()})
+        return jsonify({"success": True, "job_id": None, "status": "forwarded", "coalesced": False}), 202
+    
+    job, coalesced = tick_coordinator.request("manual")
+    return jsonify({
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "coalesced": coalesced
+    }), 202
+
+def shared_bot_status():
+    """The leader's bot status as last shared through the store"""
+    return storage_backend.load_state("bot_status") or {}
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    limit = request.args.get('limit', 20, type=int)
+    if not is_leader():
+        return jsonify(shared_bot_status().get("jobs", [])[:limit])
+    return jsonify([job.to_dict() for job in tick_coordinator.recent(limit)])
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    if not is_leader():
+        job = next((job for job in shared_bot_status().get("jobs", []) if job["id"] == job_id), None)
+    else:
+        job = tick_coordinator.get(job_id)
+        job = job.to_dict() if job is not None else None
+    if job is None:
+        return jsonify({"success": False, "message": "Job not found"}), 404
+    return jsonify(job)
+
+@app.route('/api/bot/stats', methods=['GET'])
+def bot_stats():
+    if not is_leader():
+        status = shared_bot_status()
+        status.pop("jobs", None)
+        return jsonify(dict(status, leader=False))
+    return jsonify(dict(bot_status(), leader=True))
+
+# Seconds between keep-alive comments on idle event streams
+STREAM_KEEPALIVE = 15
+# Streams end after this many seconds and the browser's EventSource reconnects,
+# so a stream never holds a worker indefinitely (use threaded workers anyway, see .env.example)
+STREAM_MAX_SECONDS = float(os.environ.get("STREAM_MAX_SECONDS", 300))
+
+@app.route('/api/stream')
+def stream():
+    """Server-Sent Events: history, stats, tick and queue updates as they happen"""
+    topics = [topic for topic in request.args.get('topics', '').split(',') if topic]
+    subscription = data_store.events.subscribe(topics or None)
+    
+    def generate():
+        deadline = time.monotonic() + STREAM_MAX_SECONDS
+        try:
+            yield "retry: 5000\n\n"
+            while not subscription.closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                event = subscription.get(timeout=min(STREAM_KEEPALIVE, remaining))
+                yield event.to_sse() if event is not None else ": keep-alive\n\n"
+        finally:
+            subscription.close()
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/posting/dead-letters', methods=['GET'])
+def posting_dead_letters():
+    return jsonify(posting_pipeline.dead_letters())
+
+@app.route('/metrics')
+def metrics_endpoint():
+    # Each worker process keeps its own metrics; in multi-process mode scrape every worker
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,116 @@
+"""
+Bytes on the wire and server CPU per request for the JSON API routes,
+polled repeatedly with unchanged data, under each serialization setup:
+
+  stdlib       Flask's json encoder, no response cache, no compression
+               (the behavior before the serialization layer)
+  fast         orjson when installed, no response cache, no compression
+  cached       fast, plus encoded bodies reused while the data is unchanged
+  cached+gzip  cached, with gzip negotiated through Accept-Encoding
+  cached+br    cached, with brotli, when the brotli package is installed
+
+Usage:
+    python benchmarks/bench_api_responses.py [history_size] [requests]   (default 10000 50)
+"""
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask.json.provider import DefaultJSONProvider
+
+import serialization
+from storage import create_backend
+from synthetic import make_history, make_rules, make_settings, make_templates, seed_backend
+
+ROUTES = [
+    "/api/templates",
+    "/api/rules",
+    "/api/settings",
+    "/api/history?limit=50",
+    "/api/history?status=error&limit=500",
+    "/api/history",
+    "/api/analytics?days=90",
+]
+
+
+def seed(workdir, size):
+    rng = random.Random(5)
+    templates = make_templates(rng, 20)
+    rules = make_rules(rng, templates, 200)
+    database_url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    backend = create_backend(database_url)
+    seed_backend(backend, templates, rules, make_settings(size), make_history(rng, rules, size))
+    backend.close()
+    os.environ.update({
+        "DATABASE_URL": database_url,
+        "HISTORY_ARCHIVE_DIR": os.path.join(workdir, "archive"),
+        "DEPLOYMENT_MODE": "single",
+        "LOG_LEVEL": "WARNING",
+    })
+
+
+def measure(client, path, requests, headers):
+    """Average (bytes, CPU ms) per request"""
+    client.get(path, headers=headers)
+    started = time.process_time()
+    for _ in range(requests):
+        response = client.get(path, headers=headers)
+    cpu = time.process_time() - started
+    assert response.status_code == 200, (path, response.status_code)
+    return len(response.data), cpu / requests * 1000
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    workdir = tempfile.mkdtemp(prefix="sigm-bench-")
+    try:
+        seed(workdir, size)
+        import app
+        # Nothing may write while polling, or every setup would measure cache misses
+        app.stop_scheduling()
+        app.tick_coordinator.stop()
+        app.posting_pipeline.join()
+        logging.disable(logging.CRITICAL)
+        client = app.app.test_client()
+        fast_json, orjson = app.app.json, serialization.orjson
+
+        setups = [("stdlib", 0, None), ("fast", 0, None), ("cached", 256, None), ("cached+gzip", 256, "gzip")]
+        if "br" in serialization.COMPRESSORS:
+            setups.append(("cached+br", 256, "br"))
+
+        results = {}
+        for name, cache_size, encoding in setups:
+            stdlib = name == "stdlib"
+            app.app.json = DefaultJSONProvider(app.app) if stdlib else fast_json
+            serialization.orjson = None if stdlib else orjson
+            app.response_cache.max_entries = cache_size
+            app.response_cache.clear()
+            headers = {"Accept-Encoding": encoding or "identity"}
+            for path in ROUTES:
+                results[name, path] = measure(client, path, requests, headers)
+
+        print(f"{size:,} history entries, {requests} requests per route "
+              f"({'orjson' if orjson is not None else 'no orjson: fast is stdlib, compact'})")
+        print(f"{'route':<38}" + "".join(f"{name:>22}" for name, _, _ in setups))
+        for path in ROUTES:
+            base_bytes, base_cpu = results["stdlib", path]
+            row = f"{path:<38}"
+            for name, _, _ in setups:
+                size_bytes, cpu = results[name, path]
+                row += f"{size_bytes / 1024:>9.1f}K {cpu:>7.2f}ms" + (f" {base_cpu / cpu:>3.0f}x" if cpu else "     ")
+            print(row)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
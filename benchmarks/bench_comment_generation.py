@@ -0,0 +1,56 @@
+"""
+Compare serial, concurrent and cached comment generation against the stub model.
+
+Usage:
+    python benchmarks/bench_comment_generation.py [num_posts] [latency_seconds]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gpt_comment_generator import CommentGenerator, StubBackend
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def report(name, elapsed, latencies):
+    print(f"{name:>12} {elapsed:>9.2f} {len(latencies) / elapsed:>10.1f} "
+          f"{percentile(latencies, 0.5) * 1000:>9.1f} {percentile(latencies, 0.95) * 1000:>9.1f}")
+
+
+def main():
+    num_posts = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    posts = [f"Shipped day {i} of building on SIGN Protocol!" for i in range(num_posts)]
+
+    print(f"{num_posts} posts, stub latency {latency * 1000:.0f} ms")
+    print(f"{'mode':>12} {'total s':>9} {'posts/s':>10} {'p50 ms':>9} {'p95 ms':>9}")
+
+    serial = CommentGenerator(backend=StubBackend(latency=latency, seed=1), max_workers=1)
+    latencies = []
+    started = time.perf_counter()
+    for post in posts:
+        t = time.perf_counter()
+        serial.generate(post)
+        latencies.append(time.perf_counter() - t)
+    report("serial", time.perf_counter() - started, latencies)
+
+    concurrent = CommentGenerator(backend=StubBackend(latency=latency, seed=1), max_workers=8)
+    started = time.perf_counter()
+    results = concurrent.generate_many(posts)
+    report("concurrent", time.perf_counter() - started, [r.latency for r in results])
+
+    # Same posts again, e.g. a retry after a failed post: served from the cache
+    started = time.perf_counter()
+    results = concurrent.generate_many(posts)
+    assert all(r.cached for r in results)
+    report("cached", time.perf_counter() - started, [r.latency for r in results])
+
+
+if __name__ == "__main__":
+    main()
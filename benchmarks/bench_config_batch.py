@@ -0,0 +1,78 @@
+"""
+Provisioning synthetic rules one add_rule call at a time vs one
+apply_config_batch call, on a fresh SQLite database, and the time to
+export and re-import everything.
+
+Usage:
+    python benchmarks/bench_config_batch.py [sizes...]   (default 1000 5000 20000)
+"""
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_store import DataStore
+from storage import SQLiteBackend
+from synthetic import make_rules, make_templates
+
+
+def provision(size, batched):
+    """Create 20 templates and `size` rules in an empty store, returning (seconds, store)"""
+    rng = random.Random(size)
+    templates = make_templates(rng, 20)
+    rules = make_rules(rng, templates, size)
+    store = DataStore(SQLiteBackend(os.path.join(tempfile.mkdtemp(), "bench.db")), sample_data=False)
+
+    started = time.perf_counter()
+    if batched:
+        operations = [{"op": "upsert", "kind": "template", "data": template} for template in templates]
+        operations += [{"op": "upsert", "kind": "rule", "data": rule} for rule in rules]
+        results = store.apply_config_batch(operations, atomic=True)
+        assert all(result["status"] == "created" for result in results)
+    else:
+        for template in templates:
+            store.add_template(dict(template))
+        template_ids = [template["id"] for template in store.get_templates()]
+        for rule, template_id in zip(rules, template_ids * size):
+            store.add_rule(dict(rule, template_id=template_id))
+    return time.perf_counter() - started, store
+
+
+def run(size):
+    single, _ = provision(size, batched=False)
+    batch, store = provision(size, batched=True)
+
+    started = time.perf_counter()
+    snapshot = store.snapshot()
+    lines = [json.dumps({"kind": "template", "data": template}) for template in snapshot.template_list]
+    lines += [json.dumps({"kind": "rule", "data": rule}) for rule in snapshot.rule_list]
+    export = time.perf_counter() - started
+
+    started = time.perf_counter()
+    operations = [dict(json.loads(line), op="upsert") for line in lines]
+    results = store.apply_config_batch(operations, atomic=True)
+    reimport = time.perf_counter() - started
+    assert all(result["status"] == "updated" for result in results)
+
+    print(f"\n{size:,} rules")
+    print(f"  one call each     {single:7.2f}s  ({single / size * 1e6:,.0f} us/rule)")
+    print(f"  one batch         {batch:7.2f}s  ({batch / size * 1e6:,.0f} us/rule, {single / batch:.1f}x faster)")
+    print(f"  export            {export:7.2f}s  ({sum(map(len, lines)) / 2 ** 20:.1f} MiB NDJSON)")
+    print(f"  re-import         {reimport:7.2f}s")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 5000, 20000]
+    logging.disable(logging.CRITICAL)
+    for size in sizes:
+        run(size)
+
+
+if __name__ == "__main__":
+    main()
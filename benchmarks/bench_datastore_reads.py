@@ -0,0 +1,80 @@
+"""
+Read latency of DataStore dashboard/API reads while posting workers keep
+adding history, as during a busy bot tick.
+
+Usage:
+    python benchmarks/bench_datastore_reads.py [readers] [seconds]
+"""
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_store import DataStore
+
+READS = {
+    "get_rules": lambda store: store.get_rules(),
+    "get_settings": lambda store: store.get_settings(),
+    "get_dashboard_stats": lambda store: store.get_dashboard_stats(),
+    "get_analytics(90)": lambda store: store.get_analytics(days=90, hours=24),
+}
+
+
+def writer(store, stop, writes):
+    i = 0
+    while not stop.is_set():
+        store.add_comment_history({
+            "post_id": f"post-{i}", "comment_id": f"comment-{i}",
+            "status": "success" if i % 5 else "error", "content": "benchmark"
+        })
+        if i % 3 == 0:
+            store.update_comment_engagement(f"comment-{i}", {"likes": i % 7, "replies": 0})
+        i += 1
+        writes.append(i)
+        time.sleep(0.0005)
+
+
+def reader(store, read, samples, stop):
+    while not stop.is_set():
+        started = time.perf_counter()
+        read(store)
+        samples.append(time.perf_counter() - started)
+        # Requests arrive over time rather than in a busy loop
+        time.sleep(0.001)
+
+
+def main():
+    readers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3
+    logging.disable(logging.CRITICAL)
+
+    store = DataStore()
+    for i in range(5000):
+        store.add_comment_history({"post_id": f"seed-{i}", "comment_id": f"seed-{i}", "status": "success"})
+
+    print(f"{readers} reader threads per call plus 2 history writers, {seconds:.0f}s each")
+    for name, read in READS.items():
+        stop = threading.Event()
+        samples = []
+        writes = []
+        threads = [threading.Thread(target=writer, args=(store, stop, writes)) for _ in range(2)]
+        threads += [threading.Thread(target=reader, args=(store, read, samples, stop)) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        samples.sort()
+        p99 = samples[int(len(samples) * 0.99)]
+        print(f"{name:22s} {len(samples):8d} reads  p50 {statistics.median(samples) * 1e6:8.1f} us  "
+              f"p99 {p99 * 1e6:8.1f} us  ({len(writes) / seconds:.0f} writes/s)")
+
+
+if __name__ == "__main__":
+    main()
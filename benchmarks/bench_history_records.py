@@ -0,0 +1,140 @@
+"""
+Memory and scan speed of history entries as dicts vs HistoryRecords.
+
+Usage:
+    python benchmarks/bench_history_records.py [sizes...]   (default 10000 100000 1000000)
+"""
+import gc
+import os
+import random
+import sys
+import time
+import uuid
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_record import IDS, SUCCESS, HistoryRecord, to_epoch
+
+START = datetime(2026, 1, 1)
+RULE_IDS = [str(uuid.UUID(int=i + 1)) for i in range(50)]
+TEMPLATE_IDS = [str(uuid.UUID(int=i + 1000)) for i in range(20)]
+CONTENTS = [f"Thanks for sharing this, template {i}!" for i in range(20)]
+
+
+def make_entry(i):
+    """An entry shaped like CommentService.record_success/record_failure output"""
+    failed = i % 10 == 0
+    entry = {
+        "post_id": f"post_{1700000000 + i}_{i % 9000 + 1000}",
+        "rule_id": RULE_IDS[i % len(RULE_IDS)],
+        "template_id": TEMPLATE_IDS[i % len(TEMPLATE_IDS)],
+        "content": CONTENTS[i % len(CONTENTS)],
+        "status": "error" if failed else "success",
+        "platform": "simulated",
+        "id": str(uuid.uuid4()),
+        "timestamp": (START + timedelta(seconds=i * 7, microseconds=i % 1000)).isoformat()
+    }
+    if failed:
+        entry["error_message"] = "Rate limited by platform"
+    else:
+        entry["comment_id"] = f"comment_{i}"
+        entry["engagement"] = {"likes": i % 5, "replies": i % 3}
+    return entry
+
+
+def deep_size(root):
+    """Bytes used by an object graph, counting shared objects (interned keys, contents) once"""
+    seen = set()
+    stack = [root]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+        elif isinstance(obj, HistoryRecord):
+            stack.extend(getattr(obj, name) for name in HistoryRecord.__slots__)
+    return total
+
+
+def timed(build):
+    started = time.perf_counter()
+    value = build()
+    return value, time.perf_counter() - started
+
+
+def best_of(func, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def run(size):
+    dicts = [make_entry(i) for i in range(size)]
+    records, build = timed(lambda: [HistoryRecord.from_dict(entry) for entry in dicts])
+    # The ring's timestamp column: ISO strings before, epoch int64s now
+    dict_times = [entry["timestamp"] for entry in dicts]
+    record_times = array("q", [record.ts for record in records])
+
+    dict_bytes = deep_size(dicts)
+    record_bytes = deep_size(records)
+
+    # Window covering the middle half, successes only
+    lo = dicts[size // 4]["timestamp"]
+    hi = dicts[3 * size // 4]["timestamp"]
+    lo_epoch, hi_epoch = to_epoch(lo), to_epoch(hi)
+    rule_id = RULE_IDS[7]
+    rule = IDS.find(rule_id)
+
+    dict_window, expected = best_of(lambda: sum(
+        1 for e in dicts if lo <= e["timestamp"] < hi and e["status"] == "success"))
+    record_window, counted = best_of(lambda: sum(
+        1 for r in records if lo_epoch <= r.ts < hi_epoch and r.status_handle == SUCCESS))
+    assert expected == counted
+
+    dict_rule, expected = best_of(lambda: sum(1 for e in dicts if e["rule_id"] == rule_id))
+    record_rule, counted = best_of(lambda: sum(1 for r in records if r.rule == rule))
+    assert expected == counted
+
+    rng = random.Random(3)
+    probes = [dicts[rng.randrange(size)]["timestamp"] for _ in range(100_000)]
+    probe_epochs = [to_epoch(probe) for probe in probes]
+    dict_bisect, expected = best_of(lambda: [bisect_left(dict_times, probe) for probe in probes])
+    record_bisect, counted = best_of(lambda: [bisect_left(record_times, probe) for probe in probe_epochs])
+    assert expected == counted
+
+    assert records[size // 2].to_dict() == dicts[size // 2]
+
+    print(f"\n{size:,} entries")
+    print(f"  memory            dict {dict_bytes / size:7.0f} B/entry   record {record_bytes / size:7.0f} B/entry   "
+          f"({dict_bytes / record_bytes:.1f}x smaller, {(dict_bytes - record_bytes) / 2 ** 20:.0f} MiB saved)")
+    print(f"  window scan       dict {dict_window * 1000:7.1f} ms        record {record_window * 1000:7.1f} ms "
+          f"({dict_window / record_window:.1f}x)")
+    print(f"  rule scan         dict {dict_rule * 1000:7.1f} ms        record {record_rule * 1000:7.1f} ms "
+          f"({dict_rule / record_rule:.1f}x)")
+    print(f"  100k bisects      str  {dict_bisect * 1000:7.1f} ms        int64  {record_bisect * 1000:7.1f} ms "
+          f"({dict_bisect / record_bisect:.1f}x)")
+    print(f"  build records     {build / size * 1e6:.1f} us/entry")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for size in sizes:
+        run(size)
+        gc.collect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compare the per-rule substring scan with the keyword automaton on 10k keywords.
+
+Usage:
+    python benchmarks/bench_keyword_matcher.py [num_rules] [keywords_per_rule]
+"""
+import os
+import random
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_matcher import KeywordMatcher
+
+WORDS = ["sign", "protocol", "attest", "비트코인", "이더리움", "서명", "builder", "airdrop",
+         "orange", "커뮤니티", "wallet", "zk", "layer", "온체인", "token", "grant"]
+
+
+def make_keyword(rng):
+    return "".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))) + str(rng.randint(0, 999))
+
+
+def legacy_match(rules, post_content):
+    """The any(keyword.lower() in post_content.lower()) check Bot did per rule"""
+    return {
+        rule_id for rule_id, keywords in rules.items()
+        if any(keyword.lower() in post_content.lower() for keyword in keywords)
+    }
+
+
+def main():
+    num_rules = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    per_rule = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    rng = random.Random(7)
+
+    rules = {f"rule-{i}": [make_keyword(rng) for _ in range(per_rule)] for i in range(num_rules)}
+    all_keywords = [k for keywords in rules.values() for k in keywords]
+    posts = [
+        " ".join(rng.choice(WORDS + all_keywords[:50]) for _ in range(40))
+        for _ in range(50)
+    ]
+
+    matcher = KeywordMatcher(normalization=None)
+    started = time.perf_counter()
+    for rule_id, keywords in rules.items():
+        matcher.set_rule(rule_id, keywords)
+    matcher.match("")
+    build = time.perf_counter() - started
+
+    for post in posts:
+        assert legacy_match(rules, post) == matcher.match(post)
+
+    number = 5
+    legacy = timeit.timeit(lambda: [legacy_match(rules, p) for p in posts], number=number)
+    automaton = timeit.timeit(lambda: [matcher.match(p) for p in posts], number=number)
+    count = number * len(posts)
+
+    started = time.perf_counter()
+    matcher.set_rule("rule-0", [make_keyword(rng) for _ in range(per_rule)])
+    matcher.match("")
+    update = time.perf_counter() - started
+
+    print(f"{num_rules} rules x {per_rule} keywords = {len(all_keywords)} keywords, "
+          f"{len(posts)} posts of ~{sum(map(len, posts)) // len(posts)} chars")
+    print(f"build automaton:   {build * 1000:8.1f} ms")
+    print(f"update one rule:   {update * 1000:8.1f} ms")
+    print(f"legacy per post:   {legacy / count * 1e6:8.1f} us")
+    print(f"automaton per post:{automaton / count * 1e6:8.1f} us ({legacy / automaton:.0f}x faster)")
+
+    nfkc = KeywordMatcher(word_boundary=True)
+    for rule_id, keywords in rules.items():
+        nfkc.set_rule(rule_id, keywords)
+    nfkc.match("")
+    timed = timeit.timeit(lambda: [nfkc.match(p) for p in posts], number=number)
+    print(f"NFKC + whole word: {timed / count * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Replay days of synthetic traffic against synthetic rules in virtual time,
+reporting cooldown, rate-limit and posting behavior and how much faster
+than real time it ran. The run is repeated to check it is reproducible.
+
+Usage:
+    python benchmarks/bench_simulation.py [days] [rules] [posts_per_tick] [seed]
+"""
+import logging
+import os
+import random
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bot import Bot
+from clock import VirtualClock
+from comment_service import CommentService
+from data_store import DataStore
+from simulation import Simulation
+from synthetic import SyntheticPostSource, make_rules, make_templates
+
+START = datetime(2026, 1, 5)
+
+
+def simulate(days, num_rules, posts_per_tick, seed):
+    clock = VirtualClock(START)
+    store = DataStore(sample_data=False, clock=clock, rng=random.Random(seed))
+    store.update_settings({"max_comments_per_hour": 30, "max_comments_per_rule_per_hour": 3,
+                           "max_concurrent_rules": 1})
+
+    rng = random.Random(seed)
+    template_ids = {}
+    for template in make_templates(rng, 10):
+        template_ids[template["id"]] = store.add_template(
+            {"name": template["name"], "content": template["content"], "variables": template["variables"]})
+    keywords = set()
+    for rule in make_rules(rng, [{"id": key, "variables": []} for key in template_ids], num_rules, max_keywords=5):
+        keywords.update(rule["trigger_keywords"])
+        store.add_rule(dict(rule, id=None, template_id=template_ids[rule["template_id"]],
+                            cooldown_minutes=rng.choice([0, 15, 60, 240])))
+
+    source = SyntheticPostSource(random.Random(seed + 1), sorted(keywords), posts_per_poll=posts_per_tick,
+                                 match_rate=0.3, clock=clock)
+    bot = Bot(store, CommentService(store), sources=[source])
+    summary = Simulation(bot, clock).run(days * 24 * 3600)
+    history = [(entry["id"], entry["timestamp"], entry["status"]) for entry in store.get_comment_history()]
+    return summary, history
+
+
+def main():
+    days = float(sys.argv[1]) if len(sys.argv) > 1 else 14
+    num_rules = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    posts_per_tick = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    seed = int(sys.argv[4]) if len(sys.argv) > 4 else 7
+    logging.disable(logging.CRITICAL)
+
+    summary, history = simulate(days, num_rules, posts_per_tick, seed)
+    outcomes = summary["outcomes"]
+    print(f"{days:g} simulated days with {num_rules} rules and {posts_per_tick} posts per tick")
+    print(f"  wall time        {summary['wall_seconds']:.2f}s ({summary['speedup']:,}x real time)")
+    print(f"  ticks            {summary['ticks']:,} ({summary['events']:,} posts), "
+          f"{summary['scheduled_runs']:,} scheduled rule runs, skipped {summary['skipped']}")
+    for outcome in sorted(outcomes):
+        print(f"  {outcome:<16} {outcomes[outcome]:>8,}  ({outcomes[outcome] / days:,.1f}/day)")
+    print(f"  history entries  {len(history):,}")
+
+    _, repeated = simulate(days, num_rules, posts_per_tick, seed)
+    print(f"  reproducible     {'yes' if repeated == history else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
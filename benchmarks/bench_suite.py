@@ -0,0 +1,387 @@
+"""
+End-to-end benchmark suite on synthetic load, against local stubs for the
+Twitter and OpenAI APIs.
+
+For each history size a fresh process seeds a SQLite database with
+synthetic templates, rules and history, starts the app on it and measures:
+
+  startup    loading the app and its history from the database
+  bot        Bot.run_scheduled_tasks over synthetic posts, posting through
+             the pipeline to the stub platform, and scheduled rule runs
+  api        Flask routes through the test client
+  analytics  DataStore analytics, dashboard stats and history queries,
+             warm (cached) and cold (after a new history entry)
+
+plus comment generation against the stub model. Throughput, p50/p95/p99
+latency and peak RSS are written as JSON; --compare prints the change
+from an earlier run so regressions show up between versions.
+
+Usage:
+    python benchmarks/bench_suite.py [--history 1000,100000] [--output results.json]
+    python benchmarks/bench_suite.py --history 1000,10000,100000,1000000 --compare base.json
+    python benchmarks/bench_suite.py --load new.json --compare base.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# (name, path, share of --requests); the full history dump scales with the history size
+API_ROUTES = [
+    ("GET /", "/", 1),
+    ("GET /api/templates", "/api/templates", 1),
+    ("GET /api/rules", "/api/rules", 1),
+    ("GET /api/settings", "/api/settings", 1),
+    ("GET /api/history?limit=50", "/api/history?limit=50", 1),
+    ("GET /api/history?status=error&limit=50", "/api/history?status=error&limit=50", 1),
+    ("GET /api/history?rule_id=...&limit=50", "/api/history?rule_id={rule_id}&limit=50", 1),
+    ("GET /api/history", "/api/history", 0.05),
+    ("GET /api/analytics?days=7", "/api/analytics?days=7", 1),
+    ("GET /api/analytics?days=90", "/api/analytics?days=90", 1),
+    ("GET /api/bot/stats", "/api/bot/stats", 1),
+    ("GET /metrics", "/metrics", 1),
+]
+
+# Flag a change as a regression past this fraction
+REGRESSION_THRESHOLD = 0.10
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def result(scenario, name, samples, seconds=None, ops=None, **extra):
+    """One result row: latency percentiles over `samples` and throughput over `seconds`"""
+    seconds = seconds if seconds is not None else sum(samples)
+    ops = ops if ops is not None else len(samples)
+    row = {
+        "scenario": scenario,
+        "name": name,
+        "ops": ops,
+        "seconds": round(seconds, 6),
+        "throughput": round(ops / seconds, 3) if seconds else None,
+    }
+    if samples:
+        row.update({
+            "p50_ms": round(percentile(samples, 0.50) * 1000, 4),
+            "p95_ms": round(percentile(samples, 0.95) * 1000, 4),
+            "p99_ms": round(percentile(samples, 0.99) * 1000, 4),
+        })
+    row.update(extra)
+    return row
+
+
+def timed_calls(func, count, before=None):
+    """Call func `count` times, returning per-call seconds (time spent in `before` excluded)"""
+    samples = []
+    for i in range(count):
+        if before is not None:
+            before(i)
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+# Worker: one history size per process, so peak RSS and interned state are per size
+
+def run_size(args, size):
+    from synthetic import (SyntheticPostSource, StubPlatform, make_history, make_rules, make_settings,
+                           make_templates, seed_backend)
+    from storage import create_backend
+
+    workdir = tempfile.mkdtemp(prefix="sigm-bench-")
+    try:
+        rng = random.Random(args.seed)
+        templates = make_templates(rng, args.templates)
+        rules = make_rules(rng, templates, args.rules)
+        database_url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+        started = time.perf_counter()
+        backend = create_backend(database_url)
+        seed_backend(backend, templates, rules, make_settings(size), make_history(rng, rules, size))
+        backend.close()
+        seed_seconds = time.perf_counter() - started
+
+        os.environ.update({
+            "DATABASE_URL": database_url,
+            "HISTORY_ARCHIVE_DIR": os.path.join(workdir, "archive"),
+            "DEPLOYMENT_MODE": "single",
+            "POST_SOURCES": "simulated",
+            "LOG_LEVEL": "WARNING",
+        })
+        started = time.perf_counter()
+        import app
+        startup_seconds = time.perf_counter() - started
+        # The benchmark drives the bot itself
+        app.stop_scheduling()
+        store = app.data_store
+        results = [result("startup", "import app", [startup_seconds],
+                          history_loaded=len(store.comment_history))]
+
+        results += bench_bot(args, store, rules, StubPlatform, SyntheticPostSource)
+        results += bench_api(args, app, rules)
+        results += bench_analytics(args, store, rules)
+
+        return {
+            "history_size": size,
+            "seed_seconds": round(seed_seconds, 3),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "results": results,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def bench_bot(args, store, rules, StubPlatform, SyntheticPostSource):
+    from bot import Bot
+    from posting_pipeline import PostingPipeline
+
+    platform_stub = StubPlatform(store, random.Random(args.seed + 1), latency=args.latency,
+                                 error_rate=args.error_rate)
+    pipeline = PostingPipeline(platform_stub, workers=args.workers, max_queue=1000,
+                               base_delay=0.001, max_delay=0.01, events=store.events)
+    keywords = sorted({keyword for rule in rules for keyword in rule["trigger_keywords"]})
+    source = SyntheticPostSource(random.Random(args.seed + 2), keywords, posts_per_poll=args.posts)
+    bot = Bot(store, platform_stub, pipeline=pipeline, sources=[source])
+
+    samples = []
+    events = queued = 0
+    started = time.perf_counter()
+    for _ in range(args.ticks):
+        tick_started = time.perf_counter()
+        stats = bot.run_scheduled_tasks()
+        samples.append(time.perf_counter() - tick_started)
+        events += stats.get("events", 0)
+        queued += stats.get("outcomes", {}).get("queued", 0)
+    ticks_seconds = time.perf_counter() - started
+    pipeline.join()
+    drained_seconds = time.perf_counter() - started
+    counts = pipeline.stats()["counts"]
+    pipeline.stop()
+
+    scheduled = [rule["id"] for rule in rules if rule["trigger_type"] == "scheduled"]
+    scheduled_samples = timed_calls(lambda: bot.run_due_rules(scheduled), args.ticks)
+
+    return [
+        result("bot", "run_scheduled_tasks", samples, posts=events, posts_per_second=round(events / ticks_seconds, 1),
+               comments_queued=queued),
+        result("bot", "post comments", [], seconds=drained_seconds, ops=counts["posted"] + counts["failed"],
+               posted=counts["posted"], failed=counts["failed"], retried=counts["retried"]),
+        result("bot", "run_due_rules", scheduled_samples, rules_per_run=len(scheduled)),
+    ]
+
+
+def bench_api(args, app, rules):
+    client = app.app.test_client()
+    rows = []
+    for name, path, share in API_ROUTES:
+        path = path.format(rule_id=rules[0]["id"])
+        count = max(int(args.requests * share), 3)
+        statuses = set()
+
+        def call():
+            statuses.add(client.get(path).status_code)
+
+        samples = timed_calls(call, count)
+        if statuses != {200}:
+            raise RuntimeError(f"{name} returned {sorted(statuses)}")
+        rows.append(result("api", name, samples))
+    return rows
+
+
+def bench_analytics(args, store, rules):
+    rows = []
+    counter = iter(range(10 ** 9))
+
+    def add_entry(_):
+        # A new entry invalidates the cached stats, as a posted comment would
+        store.add_comment_history({"post_id": f"cold_{next(counter)}", "rule_id": rules[0]["id"],
+                                   "status": "success", "content": "cold"})
+
+    for days in (7, 30, 90):
+        rows.append(result("analytics", f"get_analytics({days}) warm",
+                           timed_calls(lambda: store.get_analytics(days=days), args.requests)))
+    rows.append(result("analytics", "get_analytics(90) cold",
+                       timed_calls(lambda: store.get_analytics(days=90), args.requests, before=add_entry)))
+    rows.append(result("analytics", "get_dashboard_stats cold",
+                       timed_calls(store.get_dashboard_stats, args.requests, before=add_entry)))
+    rows.append(result("analytics", "query_history(rule_id)",
+                       timed_calls(lambda: store.query_history(rule_id=rules[1]["id"], limit=50), args.requests)))
+    rows.append(result("analytics", "query_history(status=error)",
+                       timed_calls(lambda: store.query_history(status="error", limit=50), args.requests)))
+    return rows
+
+
+def bench_generation(args):
+    from gpt_comment_generator import CommentGenerator, StubBackend
+
+    rng = random.Random(args.seed + 3)
+    posts = [f"Day {i} of building on SIGN Protocol, {rng.choice(['shipped', 'learned', 'fixed'])} something"
+             for i in range(args.posts * 4)]
+    generator = CommentGenerator(StubBackend(latency=args.latency * 10, error_rate=args.error_rate, seed=args.seed),
+                                 max_workers=args.workers * 2)
+    rows = []
+    for name in ("generate_many", "generate_many cached"):
+        started = time.perf_counter()
+        generated = generator.generate_many(posts)
+        rows.append(result("generation", name, [item.latency for item in generated],
+                           seconds=time.perf_counter() - started,
+                           errors=sum(1 for item in generated if not item.ok)))
+    return rows
+
+
+# Reporting
+
+def git_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def row_key(size, row):
+    return (size, row["scenario"], row["name"])
+
+
+def iter_rows(report):
+    for run in report["runs"]:
+        for row in run["results"]:
+            yield row_key(run["history_size"], row), row
+
+
+def print_report(report):
+    print(f"\n{'history':>9} {'scenario':<10} {'name':<40} {'ops/s':>11} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for (size, scenario, name), row in iter_rows(report):
+        throughput = f"{row['throughput']:.1f}" if row.get("throughput") else "-"
+        print(f"{size if size is not None else '-':>9} {scenario:<10} {name:<40} {throughput:>11} "
+              f"{row.get('p50_ms', '-'):>10} {row.get('p95_ms', '-'):>10} {row.get('p99_ms', '-'):>10}")
+    for run in report["runs"]:
+        if run.get("peak_rss_mb") is not None:
+            print(f"peak RSS at {run['history_size']:,} entries: {run['peak_rss_mb']} MiB")
+
+
+def print_comparison(base, report):
+    """Change in p95 latency and throughput against an earlier report"""
+    base_rows = dict(iter_rows(base))
+    print(f"\nCompared with {base.get('version') or 'base'} ({base.get('created_at')})")
+    print(f"{'history':>9} {'name':<50} {'p95':>9} {'ops/s':>9}")
+    regressions = 0
+    for key, row in iter_rows(report):
+        old = base_rows.get(key)
+        if old is None:
+            continue
+        changes = []
+        flagged = False
+        for field, worse_if_higher in (("p95_ms", True), ("throughput", False)):
+            if old.get(field) and row.get(field):
+                change = row[field] / old[field] - 1
+                flagged |= (change > REGRESSION_THRESHOLD) if worse_if_higher else (change < -REGRESSION_THRESHOLD)
+                changes.append(f"{change:+.0%}")
+            else:
+                changes.append("-")
+        regressions += flagged
+        size = key[0] if key[0] is not None else "-"
+        print(f"{size:>9} {key[1] + ' ' + key[2]:<50} {changes[0]:>9} {changes[1]:>9}{'  <- regression' if flagged else ''}")
+    for run in report["runs"]:
+        old_run = next((r for r in base["runs"] if r["history_size"] == run["history_size"]), None)
+        if old_run and old_run.get("peak_rss_mb") and run.get("peak_rss_mb"):
+            print(f"peak RSS at {run['history_size']:,}: {old_run['peak_rss_mb']} -> {run['peak_rss_mb']} MiB")
+    print(f"{regressions} regressions past {REGRESSION_THRESHOLD:.0%}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="sigm benchmark suite")
+    parser.add_argument("--history", default="1000,100000",
+                        help="comma separated history sizes (default 1000,100000)")
+    parser.add_argument("--templates", type=int, default=50)
+    parser.add_argument("--rules", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=50, help="synthetic posts per tick")
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=100, help="calls per API route and analytics read")
+    parser.add_argument("--workers", type=int, default=4, help="posting workers")
+    parser.add_argument("--latency", type=float, default=0.005, help="mean stub platform latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="stub platform and model error rate")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="where to write the JSON results (default bench-results-<version>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to compare with")
+    parser.add_argument("--load", help="report on a saved results JSON instead of running")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def worker_args(args):
+    """The options a size worker needs, as command line arguments"""
+    names = ("templates", "rules", "posts", "ticks", "requests", "workers", "latency", "error_rate", "seed")
+    return [item for name in names for item in (f"--{name.replace('_', '-')}", str(getattr(args, name)))]
+
+
+def run_suite(args):
+    runs = []
+    for size in [int(size) for size in args.history.split(",") if size.strip()]:
+        print(f"Running with {size:,} history entries...", file=sys.stderr)
+        completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", str(size)] + worker_args(args),
+                                   capture_output=True, text=True)
+        if completed.returncode != 0:
+            sys.stderr.write(completed.stderr)
+            raise SystemExit(f"Benchmark worker for {size} entries failed")
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    runs.append({"history_size": None, "peak_rss_mb": None, "results": bench_generation(args)})
+    return {
+        "version": git_version(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {name: value for name, value in vars(args).items()
+                   if name not in ("output", "compare", "load", "worker")},
+        "runs": runs,
+    }
+
+
+def main():
+    args = parse_args()
+    if args.worker is not None:
+        import logging
+        logging.disable(logging.CRITICAL)
+        print(json.dumps(run_size(args, args.worker)))
+        return
+
+    if args.load:
+        with open(args.load, encoding="utf-8") as f:
+            report = json.load(f)
+    else:
+        report = run_suite(args)
+        output = args.output or f"bench-results-{report['version'] or 'local'}.json"
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output}", file=sys.stderr)
+
+    print_report(report)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Compare the old per-variable regex rendering with the compiled template cache.
+
+Usage:
+    python benchmarks/bench_template_render.py
+"""
+import logging
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from template_compiler import TemplateCache
+
+logging.disable(logging.WARNING)
+
+
+def legacy_prepare(template, variable_values):
+    """The regex-per-variable implementation Bot used before the compiler"""
+    content = template.get("content", "")
+
+    for var_name, var_value in variable_values.items():
+        pattern = r'\{' + re.escape(var_name) + r'\}'
+        content = re.sub(pattern, str(var_value), content)
+
+    remaining_vars = re.findall(r'\{([^}]+)\}', content)
+    if remaining_vars:
+        for var_name in remaining_vars:
+            pattern = r'\{' + re.escape(var_name) + r'\}'
+            content = re.sub(pattern, f"[{var_name}]", content)
+
+    return content
+
+
+def make_template(num_variables):
+    words = " ".join(f"lorem ipsum {{var{i}}} dolor" for i in range(num_variables))
+    return {
+        "id": f"template-{num_variables}",
+        "content": f"Hello! {words} Thanks for posting.",
+        "updated_at": "2024-01-01T00:00:00"
+    }
+
+
+def main():
+    cache = TemplateCache()
+    print(f"{'variables':>9} {'legacy us':>10} {'compiled us':>12} {'speedup':>8}")
+
+    for num_variables in (1, 5, 10, 20, 50):
+        template = make_template(num_variables)
+        # Leave one variable unfilled so both paths take the placeholder branch
+        values = {f"var{i}": f"value{i}" for i in range(num_variables - 1)}
+
+        assert legacy_prepare(template, values) == cache.get(template).render(values)
+
+        number = 2000
+        legacy = timeit.timeit(lambda: legacy_prepare(template, values), number=number)
+        compiled = timeit.timeit(lambda: cache.get(template).render(values), number=number)
+        print(f"{num_variables:>9} {legacy / number * 1e6:>10.1f} {compiled / number * 1e6:>12.1f} "
+              f"{legacy / compiled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
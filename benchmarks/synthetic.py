@@ -0,0 +1,175 @@
+"""
+Synthetic load for the benchmarks: templates, rules, history and posts
+generated from a seeded RNG, and a stub platform standing in for the
+Twitter API. The OpenAI side is gpt_comment_generator.StubBackend.
+"""
+import os
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from comment_service import CommentService, PostError
+from post_events import PostEvent
+
+WORDS = ["sign", "protocol", "attest", "schema", "builder", "airdrop", "orange", "wallet", "zk",
+         "layer", "token", "grant", "help", "question", "shipped", "feedback", "서명", "커뮤니티"]
+# Post filler that never contains a keyword, so matches come only from inserted keywords
+FILLER = ["today", "building", "again", "small", "steps", "still", "going", "nice", "week", "ideas",
+          "오늘도", "성장", "with", "friends", "and", "more"]
+TRIGGER_TYPES = ("new_post", "keyword", "keyword", "scheduled")
+VARIABLES = ("name", "project", "suggestion", "topic")
+
+
+def make_id(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def make_templates(rng, count):
+    """Templates using zero to three variables each"""
+    templates = []
+    for i in range(count):
+        variables = rng.sample(VARIABLES, rng.randint(0, 3))
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12)))
+        content = f"Template {i}: {words} " + " ".join(f"{{{name}}}" for name in variables)
+        templates.append({
+            "id": make_id(rng),
+            "name": f"Template {i}",
+            "content": content.strip(),
+            "variables": variables,
+            "created_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat()
+        })
+    return templates
+
+
+def make_rules(rng, templates, count, max_keywords=20):
+    """Rules with mixed trigger types and 1 to `max_keywords` keywords; no cooldown so every match posts"""
+    rules = []
+    for i in range(count):
+        template = rng.choice(templates)
+        trigger_type = TRIGGER_TYPES[i % len(TRIGGER_TYPES)]
+        keywords = []
+        if trigger_type != "scheduled":
+            keywords = [f"{rng.choice(WORDS)}{rng.randint(0, 50)}" for _ in range(rng.randint(1, max_keywords))]
+        rules.append({
+            "id": make_id(rng),
+            "name": f"Rule {i}",
+            "template_id": template["id"],
+            "trigger_type": trigger_type,
+            "trigger_keywords": keywords,
+            "variable_values": {name: rng.choice(WORDS) for name in template["variables"]},
+            "enabled": True,
+            "cooldown_minutes": 0,
+            "created_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat()
+        })
+    return rules
+
+
+def make_settings(history_size):
+    """Settings keeping `history_size` entries in memory without rate limiting the benchmark"""
+    return {
+        "enabled": True,
+        "max_comments_per_hour": 10 ** 9,
+        "max_concurrent_rules": 4,
+        "history_hot_size": max(history_size, 1000),
+        "history_archive_days": 90,
+        "notification_email": "",
+        "error_notification": True
+    }
+
+
+def make_history(rng, rules, size, days=89):
+    """`size` history entries spread over the last `days` days, oldest first"""
+    now = datetime.now()
+    step = timedelta(days=days) / max(size, 1)
+    start = now - timedelta(days=days)
+    for i in range(size):
+        rule = rng.choice(rules)
+        failed = rng.random() < 0.08
+        entry = {
+            "id": make_id(rng),
+            "timestamp": (start + step * i).isoformat(),
+            "post_id": f"post_{i}",
+            "rule_id": rule["id"],
+            "template_id": rule["template_id"],
+            "content": f"Synthetic comment for rule {rule['name']}",
+            "status": "error" if failed else "success",
+            "platform": "stub"
+        }
+        if failed:
+            entry["error_message"] = "Stub platform error"
+        else:
+            entry["comment_id"] = f"comment_{i}"
+            entry["engagement"] = {"likes": rng.randint(0, 20), "replies": rng.randint(0, 5)}
+        yield entry
+
+
+def seed_backend(backend, templates, rules, settings, history):
+    """Write a synthetic data set through a storage backend, as if the app had run"""
+    for template in templates:
+        backend.save_template(template)
+    for rule in rules:
+        backend.save_rule(rule)
+    backend.save_settings(settings)
+    for entry in history:
+        backend.save_history(entry)
+    backend.flush()
+
+
+class SyntheticPostSource:
+    """
+    Post source returning `posts_per_poll` posts on every poll, a
+    `match_rate` share of them containing one of the rules' keywords.
+    """
+
+    def __init__(self, rng, keywords, posts_per_poll=50, match_rate=0.5, clock=None):
+        self.rng = rng
+        self.clock = clock
+        self.keywords = list(keywords) or FILLER
+        self.posts_per_poll = posts_per_poll
+        self.match_rate = match_rate
+        self._count = 0
+
+    def poll(self):
+        events = []
+        for _ in range(self.posts_per_poll):
+            self._count += 1
+            words = [self.rng.choice(FILLER) for _ in range(self.rng.randint(5, 25))]
+            if self.rng.random() < self.match_rate:
+                words.insert(self.rng.randrange(len(words)), self.rng.choice(self.keywords))
+            events.append(PostEvent(f"synthetic_{self._count}", " ".join(words), author="bench", source="synthetic",
+                                    clock=self.clock))
+        return events
+
+
+class StubPlatform(CommentService):
+    """
+    CommentService whose platform calls take `latency` seconds on average
+    (uniform between half and one and a half times that) and fail with
+    probability `error_rate`, drawn from a seeded RNG.
+    """
+
+    platform = "stub"
+
+    def __init__(self, data_store, rng, latency=0.005, error_rate=0.05):
+        super().__init__(data_store, rng=rng)
+        self.latency = latency
+        self.error_rate = error_rate
+        self._rng_lock = threading.Lock()
+        self.calls = 0
+
+    def _send(self, post_id, comment_content):
+        with self._rng_lock:
+            self.calls += 1
+            delay = self.latency * self.rng.uniform(0.5, 1.5)
+            fail = self.rng.random() < self.error_rate
+            comment_id = f"stub_{self.calls}"
+        time.sleep(delay)
+        if fail:
+            raise PostError("Stub platform error", retryable=True)
+        return comment_id
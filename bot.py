@@ -1,24 +1,98 @@
 import logging
 import threading
-from datetime import datetime, timedelta
-import re
-import time
-import random
+from collections import Counter
+from datetime import datetime
+import queue
+
+import metrics
+from rule_executor import RuleExecutor, DEFAULT_MAX_CONCURRENT_RULES
+from rate_limiter import RateLimiter
+from rule_index import RuleMatch
+from rule_scheduler import RuleScheduler
+from post_events import SimulatedPostSource
 
 logger = logging.getLogger(__name__)
 
+# Seconds a rule waits for room in a full posting queue before giving up
+PIPELINE_SUBMIT_TIMEOUT = 60
+
+TICK_SECONDS = metrics.histogram("sigm_tick_seconds", "Duration of bot ticks (polling and routing posts)")
+RULE_SECONDS = metrics.histogram("sigm_rule_seconds", "Duration of processing one rule match")
+TRIGGER_SECONDS = metrics.histogram("sigm_trigger_seconds", "Duration of rule trigger handlers", ["trigger"])
+RENDER_SECONDS = metrics.histogram("sigm_render_seconds", "Duration of rendering comment templates")
+RULE_OUTCOMES = metrics.counter("sigm_rule_outcomes", "Outcomes of rule runs", ["outcome"])
+
 class Bot:
     """
     Bot that handles scheduled comment posting based on rules.
+    
+    Each tick polls the post sources for new post events and routes every
+    event to the rules it matches through the DataStore's rule index, so the
+    work done scales with incoming posts rather than with the number of rules.
+    Scheduled rules are fired by the rule scheduler's timer thread instead,
+    which also tracks every rule's cooldown.
     """
     
-    def __init__(self, data_store, comment_service):
+    def __init__(self, data_store, comment_service, pipeline=None, sources=None, clock=None):
         self.data_store = data_store
+        # Shares the store's clock, so a VirtualClock drives cooldowns and rate limits too
+        self.clock = clock or data_store.clock
         self.comment_service = comment_service
+        # When set, comments are queued for the posting workers instead of
+        # being posted on the rule's thread
+        self.pipeline = pipeline
+        self.sources = list(sources) if sources is not None else [
+            SimulatedPostSource(rng=data_store.rng, clock=self.clock)]
         self.lock = threading.RLock()
+        self.executor = RuleExecutor(clock=self.clock)
+        self.last_tick = None
+        self.rate_limiter = RateLimiter(clock=self.clock)
+        # The platform's own rate-limit headers close the platform scope before it refuses posts
+        comment_service.add_headers_listener(self.rate_limiter.update_from_headers)
+        self._rate_limiter_seeded = False
+        # Outcome counts for the run in progress (rules run concurrently)
+        self._outcomes = Counter()
+        self._outcomes_lock = threading.Lock()
+        
+        self.rule_scheduler = RuleScheduler(callback=self.run_due_rules, clock=self.clock.time)
+        self._load_rule_schedule()
+        data_store.add_rule_listener(self._on_rule_changed)
+    
+    def _load_rule_schedule(self):
+        """Register every rule with the scheduler, resuming cooldowns from history"""
+        for rule in self.data_store.get_rules():
+            self._on_rule_changed(rule["id"], rule)
+            last_comment = self.data_store.get_last_rule_comment(rule["id"])
+            if last_comment:
+                fired_at = datetime.fromisoformat(last_comment["timestamp"]).timestamp()
+                self.rule_scheduler.record_fired(rule["id"], fired_at)
     
+    def _on_rule_changed(self, rule_id, rule):
+        if rule is None:
+            self.rule_scheduler.remove_rule(rule_id)
+            return
+        try:
+            self.rule_scheduler.set_rule(rule)
+        except ValueError as e:
+            logger.error("Not scheduling rule %s: %s", rule_id, e)
+    
+    def start(self):
+        """Start the timer thread that fires scheduled rules"""
+        # Another process may have posted since this bot was created
+        self._load_rule_schedule()
+        self.rule_scheduler.start()
+    
+    def stop(self):
+        self.rule_scheduler.stop()
+    
+    @metrics.timed(TICK_SECONDS)
     def run_scheduled_tasks(self):
-        """Run scheduled comment posting tasks"""
+        """
+        Run scheduled comment posting tasks
+        
+        Returns:
+            The tick statistics, or {"skipped": reason} if the tick didn't run
+        """
         logger.debug("Running scheduled comment tasks")
         
         with self.lock:
@@ -26,189 +100,271 @@ class Bot:
             settings = self.data_store.get_settings()
             if not settings.get("enabled", True):
                 logger.info("Bot is disabled in settings, skipping scheduled tasks")
-                return
+                return {"skipped": "disabled"}
             
-            # Check rate limiting
-            max_comments_per_hour = settings.get("max_comments_per_hour", 10)
-            recent_comments = self.data_store.get_recent_comments(hours=1)
-            if len(recent_comments) >= max_comments_per_hour:
-                logger.info(f"Rate limit reached: {len(recent_comments)}/{max_comments_per_hour} comments in the last hour")
-                return
+            # Check rate limiting; each post is checked again before it is sent
+            self._configure_rate_limiter(settings)
+            if not self.rate_limiter.has_capacity():
+                logger.info("Rate limit reached: %s comments per hour", settings.get("max_comments_per_hour", 10))
+                return {"skipped": "rate_limited"}
             
-            # Process active rules
-            rules = self.data_store.get_rules()
-            active_rules = [rule for rule in rules if rule.get("enabled", True)]
+            self.data_store.events.publish("tick", {"phase": "start", "started_at": self.clock.now().isoformat()})
             
-            logger.debug(f"Processing {len(active_rules)} active rules")
+            # Route new posts to the rules they match
+            events = self._collect_events()
+            matches = []
+            for event in events:
+                for rule, keywords in self.data_store.dispatch_event(event):
+                    matches.append(RuleMatch(rule, event, keywords))
+            
+            logger.debug("%d new posts matched %d rule runs", len(events), len(matches))
+            
+            stats = self._run_matches(matches, settings)
+            stats["events"] = len(events)
+            
+            self.last_tick = stats
+            self.data_store.events.publish("tick", dict(stats, phase="end"))
+            logger.info(
+                "Tick finished in %.2fs: %d posts, %d rule runs, concurrency %s, rule latency p50 %.2fs p95 %.2fs",
+                stats["duration"], len(events), stats["rules_processed"], stats["concurrency"],
+                stats["rule_latency"]["p50"], stats["rule_latency"]["p95"]
+            )
+            return stats
+    
+    def run_due_rules(self, rule_ids):
+        """Run scheduled rules the rule scheduler found due, returning the run's statistics"""
+        with self.lock:
+            settings = self.data_store.get_settings()
+            if not settings.get("enabled", True):
+                logger.info("Bot is disabled in settings, skipping scheduled rules")
+                return {"skipped": "disabled"}
+            
+            self._configure_rate_limiter(settings)
+            rules = [self.data_store.get_rule(rule_id) for rule_id in rule_ids]
+            matches = [RuleMatch(rule) for rule in rules if rule and rule.get("enabled", True)]
+            
+            stats = self._run_matches(matches, settings)
+            logger.info("Ran %d scheduled rules in %.2fs", stats["rules_processed"], stats["duration"])
+            return stats
+    
+    def _run_matches(self, matches, settings):
+        """Run rule matches concurrently; they share the rate limiter"""
+        with self._outcomes_lock:
+            self._outcomes = Counter()
+        
+        stats = self.executor.run(
+            matches,
+            self._run_rule,
+            max_workers=settings.get("max_concurrent_rules", DEFAULT_MAX_CONCURRENT_RULES),
+            key=lambda match: match.key
+        )
+        
+        with self._outcomes_lock:
+            stats["outcomes"] = dict(self._outcomes)
+        return stats
+    
+    def _record_outcome(self, outcome):
+        RULE_OUTCOMES.inc(outcome=outcome)
+        with self._outcomes_lock:
+            self._outcomes[outcome] += 1
+    
+    def _collect_events(self):
+        """Poll every post source, skipping sources that fail"""
+        events = []
+        for source in self.sources:
+            try:
+                events.extend(source.poll())
+            except Exception as e:
+                logger.error("Error polling post source %s: %s", type(source).__name__, e)
+        return events
+    
+    def _configure_rate_limiter(self, settings):
+        """Apply limits from settings, charging posts made before a restart once"""
+        self.rate_limiter.configure(
+            global_per_hour=settings.get("max_comments_per_hour", 10),
+            per_rule_per_hour=settings.get("max_comments_per_rule_per_hour"),
+            per_target_per_hour=settings.get("max_comments_per_target_per_hour"),
+            per_platform_per_hour=settings.get("platform_limits")
+        )
+        
+        if not self._rate_limiter_seeded:
+            self.rate_limiter.record_usage(self.data_store.count_recent_comments(hours=1))
+            self._rate_limiter_seeded = True
+    
+    def _run_rule(self, match):
+        """Process a rule match, recording any failure in comment history"""
+        rule = match.rule
+        try:
+            self._process_rule(rule, match.event, match.keywords)
+        except Exception as e:
+            logger.error("Error processing rule %s: %s", rule.get("id"), e)
+            self._record_outcome("error")
             
-            for rule in active_rules:
-                try:
-                    self._process_rule(rule)
-                except Exception as e:
-                    logger.error(f"Error processing rule {rule.get('id')}: {str(e)}")
-                    
-                    # Record error in comment history
-                    self.data_store.add_comment_history({
-                        "rule_id": rule.get("id"),
-                        "template_id": rule.get("template_id"),
-                        "status": "error",
-                        "error_message": str(e),
-                        "timestamp": datetime.now().isoformat()
-                    })
-    
-    def _process_rule(self, rule):
-        """Process a single rule"""
+            # Record error in comment history
+            self.data_store.add_comment_history({
+                "rule_id": rule.get("id"),
+                "template_id": rule.get("template_id"),
+                "status": "error",
+                "error_message": str(e),
+                "timestamp": self.clock.now().isoformat()
+            })
+    
+    @metrics.timed(RULE_SECONDS)
+    def _process_rule(self, rule, event=None, keywords=()):
+        """Process a single rule for a matching post event (None for scheduled rules)"""
         rule_id = rule.get("id")
         template_id = rule.get("template_id")
         
-        logger.debug(f"Processing rule: {rule.get('name')} (ID: {rule_id})")
+        logger.debug("Processing rule: %s (ID: %s)", rule.get("name"), rule_id)
         
-        # Check cooldown
-        self._check_rule_cooldown(rule)
+        # Skip rules on cooldown before rendering anything
+        if not self._check_rule_cooldown(rule):
+            self._record_outcome("cooldown")
+            return
         
         # Get the template
         template = self.data_store.get_template(template_id)
         if not template:
-            logger.error(f"Template not found for rule {rule_id}: {template_id}")
+            logger.error("Template not found for rule %s: %s", rule_id, template_id)
             return
         
         # Process the rule based on trigger type
         trigger_type = rule.get("trigger_type", "manual")
         
         if trigger_type == "new_post":
-            self._process_new_post_trigger(rule, template)
+            self._process_new_post_trigger(rule, template, event)
         elif trigger_type == "keyword":
-            self._process_keyword_trigger(rule, template)
+            self._process_keyword_trigger(rule, template, event, keywords)
         elif trigger_type == "scheduled":
             self._process_scheduled_trigger(rule, template)
         else:
-            logger.warning(f"Unknown trigger type for rule {rule_id}: {trigger_type}")
+            logger.warning("Unknown trigger type for rule %s: %s", rule_id, trigger_type)
     
     def _check_rule_cooldown(self, rule):
-        """Check if a rule is on cooldown"""
+        """Check if a rule is off cooldown"""
         rule_id = rule.get("id")
-        cooldown_minutes = rule.get("cooldown_minutes", 60)
         
-        # Get recent comment history for this rule
-        comment_history = self.data_store.get_comment_history()
-        rule_comments = [c for c in comment_history if c.get("rule_id") == rule_id]
-        
-        if rule_comments:
-            last_comment = max(rule_comments, key=lambda x: x["timestamp"])
-            last_time = datetime.fromisoformat(last_comment["timestamp"])
-            elapsed = datetime.now() - last_time
-            
-            if elapsed.total_seconds() < cooldown_minutes * 60:
-                cooldown_remaining = cooldown_minutes - (elapsed.total_seconds() / 60)
-                logger.debug(f"Rule {rule_id} is on cooldown. {cooldown_remaining:.1f} minutes remaining")
-                return False
+        if not self.rule_scheduler.is_eligible(rule_id):
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Rule %s is on cooldown. %.1f minutes remaining",
+                             rule_id, self.rule_scheduler.cooldown_remaining(rule_id) / 60)
+            return False
         
         return True
     
-    def _process_new_post_trigger(self, rule, template):
+    @metrics.timed(TRIGGER_SECONDS, trigger="new_post")
+    def _process_new_post_trigger(self, rule, template, event):
         """Process a new post trigger"""
-        # In a real implementation, this would check external APIs for new posts
-        # For this example, we'll simulate finding a new post with random chance
+        # The rule index already checked the rule's keywords and target account
+        logger.info("Found new post matching rule %s: %s", rule.get("id"), event.post_id)
         
-        if random.random() < 0.3:  # 30% chance to find a new post
-            post_id = f"post_{int(time.time())}"
-            post_content = "This is a simulated new post that matches trigger criteria"
-            
-            logger.info(f"Found new post matching rule {rule.get('id')}: {post_id}")
-            
-            # Check for keywords if specified
-            keywords = rule.get("trigger_keywords", [])
-            if keywords and not any(keyword.lower() in post_content.lower() for keyword in keywords):
-                logger.debug(f"Post {post_id} does not contain any required keywords: {keywords}")
-                return
-            
-            # Prepare comment content
-            comment_content = self._prepare_comment_content(template, rule.get("variable_values", {}))
-            
-            # Post the comment
-            success, message = self.comment_service.post_comment(
-                post_id=post_id,
-                comment_content=comment_content,
-                rule_id=rule.get("id"),
-                template_id=template.get("id")
-            )
-            
-            if success:
-                logger.info(f"Successfully posted comment to {post_id}")
-            else:
-                logger.error(f"Failed to post comment: {message}")
+        # Prepare comment content
+        comment_content = self._prepare_comment_content(template, rule.get("variable_values", {}))
+        
+        # Post the comment
+        success, message = self._post_comment(rule, template, event.post_id, comment_content, target=event.author)
+        
+        if success:
+            logger.info("Comment for %s accepted: %s", event.post_id, message)
+        else:
+            logger.error("Failed to post comment: %s", message)
     
-    def _process_keyword_trigger(self, rule, template):
+    @metrics.timed(TRIGGER_SECONDS, trigger="keyword")
+    def _process_keyword_trigger(self, rule, template, event, keywords):
         """Process a keyword trigger"""
-        # In a real implementation, this would search for content with specific keywords
-        # For this example, we'll simulate finding a match with random chance
+        matched_keyword = keywords[0] if keywords else "default"
         
-        if random.random() < 0.2:  # 20% chance to find a keyword match
-            post_id = f"post_{int(time.time())}"
-            keywords = rule.get("trigger_keywords", [])
-            matched_keyword = random.choice(keywords) if keywords else "default"
-            
-            logger.info(f"Found keyword match for rule {rule.get('id')}: {matched_keyword}")
-            
-            # Prepare comment content
-            variable_values = dict(rule.get("variable_values", {}))
-            variable_values["keyword"] = matched_keyword  # Add the matched keyword as a variable
-            
-            comment_content = self._prepare_comment_content(template, variable_values)
-            
-            # Post the comment
-            success, message = self.comment_service.post_comment(
-                post_id=post_id,
-                comment_content=comment_content,
-                rule_id=rule.get("id"),
-                template_id=template.get("id")
-            )
-            
-            if success:
-                logger.info(f"Successfully posted comment to {post_id} based on keyword: {matched_keyword}")
-            else:
-                logger.error(f"Failed to post comment: {message}")
+        logger.info("Found keyword match for rule %s: %s", rule.get("id"), matched_keyword)
+        
+        # Prepare comment content
+        variable_values = dict(rule.get("variable_values", {}))
+        variable_values["keyword"] = matched_keyword  # Add the matched keyword as a variable
+        
+        comment_content = self._prepare_comment_content(template, variable_values)
+        
+        # Post the comment
+        success, message = self._post_comment(rule, template, event.post_id, comment_content, target=event.author)
+        
+        if success:
+            logger.info("Comment for %s accepted based on keyword %s: %s", event.post_id, matched_keyword, message)
+        else:
+            logger.error("Failed to post comment: %s", message)
     
+    @metrics.timed(TRIGGER_SECONDS, trigger="scheduled")
     def _process_scheduled_trigger(self, rule, template):
         """Process a scheduled trigger"""
         # This would be triggered on a schedule rather than by external events
-        post_id = f"scheduled_{int(time.time())}"
+        post_id = self.clock.unique_id("scheduled")
         
-        logger.info(f"Processing scheduled comment for rule {rule.get('id')}")
+        logger.info("Processing scheduled comment for rule %s", rule.get("id"))
         
         # Prepare comment content
         comment_content = self._prepare_comment_content(template, rule.get("variable_values", {}))
         
         # Post the comment
-        success, message = self.comment_service.post_comment(
-            post_id=post_id,
-            comment_content=comment_content,
-            rule_id=rule.get("id"),
-            template_id=template.get("id")
-        )
+        success, message = self._post_comment(rule, template, post_id, comment_content)
         
         if success:
-            logger.info(f"Successfully posted scheduled comment to {post_id}")
+            logger.info("Scheduled comment for %s accepted: %s", post_id, message)
         else:
-            logger.error(f"Failed to post scheduled comment: {message}")
+            logger.error("Failed to post scheduled comment: %s", message)
     
-    def _prepare_comment_content(self, template, variable_values):
-        """Prepare comment content by filling in template variables"""
-        content = template.get("content", "")
+    def _post_comment(self, rule, template, post_id, comment_content, target=None):
+        """Post a comment if the rule is off cooldown and every rate limit scope allows it"""
+        rule_id = rule.get("id")
         
-        # Replace variables using regex to handle complex variable names
-        for var_name, var_value in variable_values.items():
-            pattern = r'\{' + re.escape(var_name) + r'\}'
-            content = re.sub(pattern, str(var_value), content)
+        # Claiming starts the cooldown, so concurrent matches for a rule post once
+        previous = self.rule_scheduler.claim(rule_id)
+        if previous is None:
+            self._record_outcome("cooldown")
+            return False, "Rule is on cooldown"
         
-        # Check for any remaining unfilled variables
-        remaining_vars = re.findall(r'\{([^}]+)\}', content)
-        if remaining_vars:
-            logger.warning(f"Template has unfilled variables: {remaining_vars}")
-            
-            # Replace remaining variables with placeholders
-            for var_name in remaining_vars:
-                pattern = r'\{' + re.escape(var_name) + r'\}'
-                content = re.sub(pattern, f"[{var_name}]", content)
+        scopes = {
+            "rule_id": rule_id,
+            "target": target or rule.get("target_account"),
+            "platform": self.comment_service.platform,
+            "rule_limit": rule.get("max_comments_per_hour")
+        }
+        allowed, scope = self.rate_limiter.try_acquire(**scopes)
+        if not allowed:
+            self._record_outcome("rate_limited")
+            self.rule_scheduler.release(rule_id, previous)
+            logger.info("Rate limit reached (%s), not posting comment for rule %s", scope, rule_id)
+            return False, f"Rate limit reached ({scope})"
+        
+        if self.pipeline is None:
+            success, message = self.comment_service.post_comment(
+                post_id=post_id,
+                comment_content=comment_content,
+                rule_id=rule_id,
+                template_id=template.get("id")
+            )
+            # A comment the platform refused still spent its token and cooldown,
+            # as a queued one that ends up dead-lettered does
+            self._record_outcome("posted" if success else "failed")
+            return success, message
         
-        return content
+        try:
+            self.pipeline.submit(
+                post_id=post_id,
+                comment_content=comment_content,
+                rule_id=rule_id,
+                template_id=template.get("id"),
+                timeout=PIPELINE_SUBMIT_TIMEOUT
+            )
+        except queue.Full:
+            # Never reached the platform: give back the cooldown and the tokens
+            self._record_outcome("queue_full")
+            self.rule_scheduler.release(rule_id, previous)
+            self.rate_limiter.release(**scopes)
+            return False, "Posting queue is full"
+        
+        self._record_outcome("queued")
+        return True, f"Comment queued for posting to {post_id}"
+    
+    @metrics.timed(RENDER_SECONDS)
+    def _prepare_comment_content(self, template, variable_values):
+        """Prepare comment content by filling in template variables"""
+        # Templates are parsed once and cached until they are updated
+        compiled = self.data_store.get_compiled_template(template)
+        return compiled.render(variable_values)
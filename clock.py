@@ -0,0 +1,107 @@
+import threading
+import time
+import uuid
+from datetime import datetime
+
+
+class Clock:
+    """
+    Source of time and unique IDs for the bot, comment service and store.
+
+    Subclasses provide time(), monotonic() and sleep(); now() is naive
+    local time like datetime.now(). unique_id() never returns the same
+    value twice from one clock, even within the same microsecond.
+    """
+
+    def __init__(self):
+        self._last_id = 0
+        self._id_lock = threading.Lock()
+
+    def time(self):
+        raise NotImplementedError
+
+    def monotonic(self):
+        raise NotImplementedError
+
+    def sleep(self, seconds):
+        raise NotImplementedError
+
+    def wait(self, event, timeout):
+        """Sleep up to `timeout` seconds, ending early once `event` is set; returns whether it is set"""
+        self.sleep(timeout)
+        return event.is_set()
+
+    def now(self):
+        return datetime.fromtimestamp(self.time())
+
+    def unique_id(self, prefix):
+        """A prefixed ID from the clock's microseconds, bumped past the last one handed out"""
+        with self._id_lock:
+            value = max(int(self.time() * 1_000_000), self._last_id + 1)
+            self._last_id = value
+        return f"{prefix}_{value}"
+
+
+class SystemClock(Clock):
+    """Wall clock time; sleep() blocks"""
+
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def wait(self, event, timeout):
+        return event.wait(timeout)
+
+    def now(self):
+        return datetime.now()
+
+
+class VirtualClock(Clock):
+    """
+    Simulated time for fast-forward runs. It only moves when advanced, and
+    sleep() advances it instead of blocking, so a day of ticks and posting
+    delays runs in as long as the work itself takes.
+
+    Threads share the one timeline: concurrent sleeps each move it forward.
+    """
+
+    def __init__(self, start=None):
+        super().__init__()
+        if isinstance(start, datetime):
+            start = start.timestamp()
+        self._now = time.time() if start is None else float(start)
+        self._lock = threading.Lock()
+
+    def time(self):
+        return self._now
+
+    def monotonic(self):
+        return self._now
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    def advance(self, seconds):
+        with self._lock:
+            self._now += max(seconds, 0)
+
+    def advance_to(self, timestamp):
+        """Move forward to `timestamp`; time never goes backwards"""
+        with self._lock:
+            self._now = max(self._now, timestamp)
+
+
+SYSTEM_CLOCK = SystemClock()
+
+
+def new_uuid(rng=None):
+    """A random UUID string, drawn from `rng` when given so seeded runs repeat"""
+    if rng is None:
+        return str(uuid.uuid4())
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
@@ -0,0 +1,346 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+
+from history_record import IDS, compact_id, from_epoch, to_epoch
+
+
+class HistoryRollup:
+    """
+    Running per-day, per-hour and per-template status counters.
+    Kept in step with CommentHistory so analytics never rescan the entries.
+    When an archive is attached the counters also cover archived entries.
+
+    Each bucket's counts dict is replaced rather than changed in place, so a
+    snapshot() only has to copy the outer dicts and can be read without a lock.
+    """
+
+    def __init__(self):
+        self.daily = {}
+        self.hourly = {}
+        self.by_template = {}
+
+    @staticmethod
+    def _bump(index, key, status, delta):
+        counts = dict(index.get(key, ()))
+        counts[status] = counts.get(status, 0) + delta
+        if counts[status] <= 0:
+            del counts[status]
+        if counts:
+            index[key] = counts
+        else:
+            index.pop(key, None)
+
+    def _apply(self, entry, status, delta):
+        timestamp = entry["timestamp"]
+        self._bump(self.daily, timestamp[:10], status, delta)
+        self._bump(self.hourly, timestamp[:13], status, delta)
+        if entry.get("template_id"):
+            self._bump(self.by_template, entry["template_id"], status, delta)
+
+    def add(self, entry):
+        self._apply(entry, entry.get("status"), 1)
+
+    def remove(self, entry):
+        self._apply(entry, entry.get("status"), -1)
+
+    def change_status(self, entry, old_status, new_status):
+        self._apply(entry, old_status, -1)
+        self._apply(entry, new_status, 1)
+
+    def merge_day(self, day_key, counts):
+        """Add archived status counts for a day"""
+        for status, count in counts.items():
+            self._bump(self.daily, day_key, status, count)
+
+    def merge_template(self, template_id, counts):
+        for status, count in counts.items():
+            self._bump(self.by_template, template_id, status, count)
+
+    def drop_before(self, day_key, template_counts=None):
+        """Forget days (and their hours) before day_key, and the given template counts"""
+        for day in [day for day in self.daily if day < day_key]:
+            del self.daily[day]
+        for hour in [hour for hour in self.hourly if hour[:10] < day_key]:
+            del self.hourly[hour]
+        for template_id, counts in (template_counts or {}).items():
+            for status, count in counts.items():
+                if status in self.by_template.get(template_id, {}):
+                    self._bump(self.by_template, template_id, status, -count)
+
+    def snapshot(self):
+        """Get a copy that later changes to this rollup don't affect"""
+        copy = HistoryRollup()
+        copy.daily = dict(self.daily)
+        copy.hourly = dict(self.hourly)
+        copy.by_template = dict(self.by_template)
+        return copy
+
+    def day(self, day_key):
+        """Get status counts for a YYYY-MM-DD day"""
+        return self.daily.get(day_key, {})
+
+    def hour(self, hour_key):
+        """Get status counts for a YYYY-MM-DDTHH hour"""
+        return self.hourly.get(hour_key, {})
+
+    def template_counts(self):
+        """Get the total number of entries per template id"""
+        return {template_id: sum(counts.values()) for template_id, counts in self.by_template.items()}
+
+
+class CommentHistory:
+    """
+    Comment history hot window with secondary indexes.
+    Entries are HistoryRecords in a fixed-capacity ring buffer kept in
+    timestamp order, with their epoch timestamps in a parallel int64 array,
+    so time-range queries bisect on integers, eviction is O(1) with no
+    copying, and per-rule, per-template and per-comment lookups avoid full
+    scans. Query methods take ISO timestamps and convert them once.
+
+    Evicted entries are handed to `on_evict` (e.g. HistoryArchive.append);
+    their rollup counts are then kept, since the archive still holds them.
+    Not thread-safe on its own; DataStore serializes access with its lock.
+    """
+
+    def __init__(self, max_size=1000, on_evict=None):
+        self.max_size = max_size
+        self.on_evict = on_evict
+        self._ring = [None] * max_size
+        self._times = array("q", bytes(8 * max_size))
+        self._head = 0
+        self._size = 0
+        self._by_rule = {}
+        self._by_template = {}
+        self._by_comment_id = {}
+        self._by_id = {}
+        self.rollup = HistoryRollup()
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return iter(self.oldest_first())
+
+    def _segments(self):
+        """Physical (start, end) ranges of the ring, oldest first"""
+        first_end = min(self._head + self._size, self.max_size)
+        return (self._head, first_end), (0, self._size - (first_end - self._head))
+
+    def _bisect(self, timestamp, search):
+        """Logical position of an epoch timestamp, using C bisect on each ring segment"""
+        (a_start, a_end), (b_start, b_end) = self._segments()
+        pos = search(self._times, timestamp, a_start, a_end) - a_start
+        if pos < a_end - a_start or b_end == 0:
+            return pos
+        return (a_end - a_start) + search(self._times, timestamp, b_start, b_end)
+
+    def _slice(self, lo, hi):
+        """Entries between logical positions lo and hi, oldest first"""
+        (a_start, a_end), (b_start, b_end) = self._segments()
+        if lo >= hi:
+            return []
+        a_len = a_end - a_start
+        result = self._ring[a_start + min(lo, a_len):a_start + min(hi, a_len)]
+        if hi > a_len:
+            result += self._ring[b_start + max(lo - a_len, 0):b_start + hi - a_len]
+        return result
+
+    def _put(self, pos, entry):
+        i = (self._head + pos) % self.max_size
+        self._ring[i] = entry
+        self._times[i] = entry.ts if entry is not None else 0
+
+    def _get(self, pos):
+        return self._ring[(self._head + pos) % self.max_size]
+
+    def append(self, entry):
+        """Add a HistoryRecord, evicting the oldest one when the window is full"""
+        timestamp = entry.ts
+        if self._size == self.max_size:
+            if timestamp < self._times[self._head]:
+                # Older than the whole window: goes straight to the archive
+                if self.on_evict is not None:
+                    self.rollup.add(entry)
+                    self.on_evict(entry)
+                return
+            self._evict_oldest()
+
+        if self._size == 0 or timestamp >= self._times[(self._head + self._size - 1) % self.max_size]:
+            self._put(self._size, entry)
+        else:
+            # Clock went backwards; shift newer entries up to keep time order
+            pos = self._bisect(timestamp, bisect_right)
+            for i in range(self._size, pos, -1):
+                self._put(i, self._get(i - 1))
+            self._put(pos, entry)
+        self._size += 1
+
+        self._index(entry)
+        self.rollup.add(entry)
+
+    # Rule and template buckets are keyed by interned handle; 0 (None) and
+    # -1 (absent) are not indexed
+
+    def _index(self, entry):
+        self._by_id[entry.key] = entry
+        if entry.get("comment_id"):
+            self._by_comment_id[entry.comment_id] = entry
+        if entry.rule > 0:
+            self._by_rule.setdefault(entry.rule, deque()).append(entry)
+        if entry.template > 0:
+            self._by_template.setdefault(entry.template, deque()).append(entry)
+
+    def _unindex(self, entry):
+        self._by_id.pop(entry.key, None)
+        if entry.get("comment_id"):
+            self._by_comment_id.pop(entry.comment_id, None)
+        for index, key in ((self._by_rule, entry.rule),
+                           (self._by_template, entry.template)):
+            bucket = index.get(key)
+            if bucket is None:
+                continue
+            if bucket and bucket[0] is entry:
+                bucket.popleft()
+            else:
+                bucket.remove(entry)
+            if not bucket:
+                del index[key]
+
+    def _release(self, entry):
+        """Drop an entry from the window, archiving it if there is an archive"""
+        self._unindex(entry)
+        if self.on_evict is not None:
+            self.on_evict(entry)
+        else:
+            self.rollup.remove(entry)
+
+    def _evict_oldest(self):
+        entry = self._ring[self._head]
+        self._put(0, None)
+        self._head = (self._head + 1) % self.max_size
+        self._size -= 1
+        self._release(entry)
+        return entry
+
+    def resize(self, max_size):
+        """Change the window size, evicting the oldest entries if it shrinks"""
+        if max_size == self.max_size:
+            return
+        while self._size > max_size:
+            self._evict_oldest()
+        entries = self.oldest_first()
+        self.max_size = max_size
+        self._ring = entries + [None] * (max_size - len(entries))
+        self._times = array("q", [entry.ts for entry in entries] + [0] * (max_size - len(entries)))
+        self._head = 0
+
+    def oldest_first(self):
+        """Get all entries in ascending timestamp order"""
+        return self._slice(0, self._size)
+
+    def newest_first(self):
+        """Get all entries in descending timestamp order"""
+        entries = self.oldest_first()
+        entries.reverse()
+        return entries
+
+    def oldest_timestamp(self):
+        return from_epoch(self._times[self._head]) if self._size else None
+
+    def iter_newest_first(self, until=None, rule_id=None, template_id=None):
+        """
+        Yield entries with a timestamp <= the ISO `until`, newest first.
+        With rule_id or template_id only that index bucket is walked.
+        """
+        until = to_epoch(until) if until is not None else None
+        if rule_id is not None or template_id is not None:
+            if rule_id is not None:
+                bucket = self._by_rule.get(IDS.find(rule_id), ())
+            else:
+                bucket = self._by_template.get(IDS.find(template_id), ())
+            for entry in reversed(bucket):
+                if until is None or entry.ts <= until:
+                    yield entry
+            return
+
+        pos = self._bisect(until, bisect_right) if until is not None else self._size
+        for i in range(pos - 1, -1, -1):
+            yield self._get(i)
+
+    def count_since(self, cutoff):
+        """Count entries with a timestamp strictly after the ISO cutoff"""
+        return self._size - self._bisect(to_epoch(cutoff), bisect_right)
+
+    def between(self, start, end):
+        """Get entries with start <= timestamp <= end (ISO strings)"""
+        return self._slice(self._bisect(to_epoch(start), bisect_left), self._bisect(to_epoch(end), bisect_right))
+
+    def last_for_rule(self, rule_id):
+        """Get the most recent entry recorded for a rule"""
+        bucket = self._by_rule.get(IDS.find(rule_id))
+        return bucket[-1] if bucket else None
+
+    def for_rule(self, rule_id):
+        """Get all entries for a rule in ascending timestamp order"""
+        return list(self._by_rule.get(IDS.find(rule_id), ()))
+
+    def for_template(self, template_id):
+        """Get all entries for a template in ascending timestamp order"""
+        return list(self._by_template.get(IDS.find(template_id), ()))
+
+    def _position(self, entry):
+        pos = self._bisect(entry.ts, bisect_left)
+        while self._get(pos) is not entry:
+            pos += 1
+        return pos
+
+    def replace(self, entry, new_entry):
+        """
+        Swap an entry for an updated copy with the same id and timestamp,
+        keeping the indexes and rollup counters in step. Entries are never
+        changed in place, so readers holding the old one are unaffected.
+        """
+        self._put(self._position(entry), new_entry)
+        self._by_id[entry.key] = new_entry
+        if entry.get("comment_id"):
+            self._by_comment_id.pop(entry.comment_id, None)
+        if new_entry.get("comment_id"):
+            self._by_comment_id[new_entry.comment_id] = new_entry
+        for index, key in ((self._by_rule, entry.rule),
+                           (self._by_template, entry.template)):
+            bucket = index.get(key)
+            if not bucket:
+                continue
+            # Updates are usually to recent entries, so search from the end
+            for i in range(len(bucket) - 1, -1, -1):
+                if bucket[i] is entry:
+                    bucket[i] = new_entry
+                    break
+
+        if entry.status_handle != new_entry.status_handle:
+            self.rollup.change_status(entry, entry.status, new_entry.status)
+
+    def remove(self, entry_id):
+        """Remove an entry by its history id"""
+        entry = self._by_id.get(compact_id(entry_id))
+        if entry is None:
+            return None
+
+        pos = self._position(entry)
+        for i in range(pos, self._size - 1):
+            self._put(i, self._get(i + 1))
+        self._put(self._size - 1, None)
+        self._size -= 1
+
+        self._unindex(entry)
+        self.rollup.remove(entry)
+        return entry
+
+    def get(self, entry_id):
+        """Get an entry by its history id"""
+        return self._by_id.get(compact_id(entry_id))
+
+    def get_by_comment_id(self, comment_id):
+        """Get an entry by the platform comment id"""
+        return self._by_comment_id.get(comment_id)
@@ -1,10 +1,26 @@
 import logging
 import random
-import time
-from datetime import datetime
+import threading
+
+import metrics
 
 logger = logging.getLogger(__name__)
 
+POST_SECONDS = metrics.histogram("sigm_post_comment_seconds", "Duration of posting a comment and recording it")
+SEND_SECONDS = metrics.histogram("sigm_platform_send_seconds", "Duration of single send attempts to the platform")
+COMMENTS = metrics.counter("sigm_comments", "Comments recorded in history by status", ["status"])
+
+class PostError(Exception):
+    """
+    Raised when the platform rejects a comment.
+    Retryable errors (rate limits, timeouts) may succeed if sent again.
+    """
+    
+    def __init__(self, message, retryable=False, retry_after=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
 class CommentService:
     """
     Service for posting comments to external platforms.
@@ -12,9 +28,29 @@ class CommentService:
     For this demo, it simulates posting comments.
     """
     
-    def __init__(self, data_store):
+    platform = "simulated"
+    
+    def __init__(self, data_store, clock=None, rng=None):
         self.data_store = data_store
+        # Shares the store's clock and RNG unless given its own
+        self.clock = clock or data_store.clock
+        self.rng = rng or data_store.rng or random.Random()
+        self._sent = {}
+        self._sent_lock = threading.Lock()
+        self._headers_listeners = []
+    
+    def add_headers_listener(self, listener):
+        """Call listener(platform, headers) with the headers of every platform response"""
+        self._headers_listeners.append(listener)
+    
+    def report_headers(self, headers):
+        """Pass a platform response's headers on, whether the request succeeded or not"""
+        if not headers:
+            return
+        for listener in self._headers_listeners:
+            listener(self.platform, headers)
     
+    @metrics.timed(POST_SECONDS)
     def post_comment(self, post_id, comment_content, rule_id=None, template_id=None):
         """
         Post a comment to the target platform.
@@ -28,36 +64,74 @@ class CommentService:
         Returns:
             Tuple of (success, message)
         """
-        logger.debug(f"Posting comment to {post_id}: {comment_content[:50]}...")
+        try:
+            comment_id = self.send_comment(post_id, comment_content)
+        except PostError as e:
+            self.record_failure(post_id, str(e), comment_content, rule_id, template_id)
+            return False, str(e)
+        
+        self.record_success(post_id, comment_id, comment_content, rule_id, template_id)
+        return True, f"Comment posted successfully. ID: {comment_id}"
+    
+    @metrics.timed(SEND_SECONDS)
+    def send_comment(self, post_id, comment_content, idempotency_key=None):
+        """
+        Make a single attempt to post a comment, without recording history.
+        
+        Args:
+            post_id: ID of the post to comment on
+            comment_content: Content of the comment
+            idempotency_key: Key that makes repeated sends post only once
+            
+        Returns:
+            The platform comment ID
+            
+        Raises:
+            PostError: If the platform rejects the comment
+        """
+        logger.debug("Posting comment to %s: %.50s...", post_id, comment_content)
+        
+        # A key that already posted returns the same comment instead of a duplicate
+        if idempotency_key is not None:
+            with self._sent_lock:
+                if idempotency_key in self._sent:
+                    return self._sent[idempotency_key]
+        
+        comment_id = self._send(post_id, comment_content)
         
+        if idempotency_key is not None:
+            with self._sent_lock:
+                self._sent[idempotency_key] = comment_id
+                if len(self._sent) > 10000:
+                    self._sent.pop(next(iter(self._sent)))
+        
+        logger.info("Successfully posted comment. ID: %s", comment_id)
+        return comment_id
+    
+    def _send(self, post_id, comment_content):
+        """
+        The platform API call: returns the new comment ID or raises PostError.
+        Implementations pass every response's headers to report_headers(),
+        so rate limits are followed before the platform starts refusing.
+        """
         # In a real implementation, this would call an external API
         # For this demo, we'll simulate a success/failure response
         
         # Simulate API delay
-        time.sleep(random.uniform(0.5, 1.5))
+        self.clock.sleep(self.rng.uniform(0.5, 1.5))
         
         # Simulate occasional failures (10% chance)
-        if random.random() < 0.1:
+        if self.rng.random() < 0.1:
             error_message = "Simulated API error: Rate limit exceeded"
-            logger.error(f"Failed to post comment: {error_message}")
-            
-            # Record in comment history
-            self.data_store.add_comment_history({
-                "post_id": post_id,
-                "rule_id": rule_id,
-                "template_id": template_id,
-                "content": comment_content,
-                "status": "error",
-                "error_message": error_message,
-                "platform": "simulated"
-            })
-            
-            return False, error_message
+            logger.error("Failed to post comment: %s", error_message)
+            raise PostError(error_message, retryable=True)
         
         # Generate a fake comment ID
-        comment_id = f"comment_{int(time.time())}_{random.randint(1000, 9999)}"
-        
-        # Record in comment history
+        return self.clock.unique_id("comment")
+    
+    def record_success(self, post_id, comment_id, comment_content, rule_id=None, template_id=None):
+        """Record a posted comment in history"""
+        COMMENTS.inc(status="success")
         self.data_store.add_comment_history({
             "post_id": post_id,
             "comment_id": comment_id,
@@ -65,33 +139,35 @@ class CommentService:
             "template_id": template_id,
             "content": comment_content,
             "status": "success",
-            "platform": "simulated",
+            "platform": self.platform,
             "engagement": {
                 "likes": 0,
                 "replies": 0
             }
         })
-        
-        logger.info(f"Successfully posted comment. ID: {comment_id}")
-        return True, f"Comment posted successfully. ID: {comment_id}"
+    
+    def record_failure(self, post_id, error_message, comment_content, rule_id=None, template_id=None):
+        """Record a comment that could not be posted in history"""
+        COMMENTS.inc(status="error")
+        self.data_store.add_comment_history({
+            "post_id": post_id,
+            "rule_id": rule_id,
+            "template_id": template_id,
+            "content": comment_content,
+            "status": "error",
+            "error_message": error_message,
+            "platform": self.platform
+        })
     
     def update_comment_engagement(self, comment_id, likes=0, replies=0):
         """
         Update engagement metrics for a comment.
         In a real implementation, this would fetch data from the platform API.
         """
-        history = self.data_store.get_comment_history()
-        
-        for comment in history:
-            if comment.get("comment_id") == comment_id:
-                comment["engagement"] = {
-                    "likes": likes,
-                    "replies": replies
-                }
-                comment["updated_at"] = datetime.now().isoformat()
-                return True
-        
-        return False
+        return self.data_store.update_comment_engagement(comment_id, {
+            "likes": likes,
+            "replies": replies
+        })
     
     def delete_comment(self, comment_id):
         """
@@ -99,15 +175,7 @@ class CommentService:
         In a real implementation, this would call the platform's API.
         """
         # Simulate API call
-        time.sleep(random.uniform(0.3, 1.0))
+        self.clock.sleep(self.rng.uniform(0.3, 1.0))
         
         # Update status in history
-        history = self.data_store.get_comment_history()
-        
-        for comment in history:
-            if comment.get("comment_id") == comment_id:
-                comment["status"] = "deleted"
-                comment["updated_at"] = datetime.now().isoformat()
-                return True
-        
-        return False
+        return self.data_store.update_comment_status(comment_id, "deleted")
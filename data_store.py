@@ -1,58 +1,484 @@
-import uuid
+import base64
 import logging
-from datetime import datetime, timedelta
+from datetime import timedelta
 import json
 import threading
 
+import metrics
+from clock import SYSTEM_CLOCK, new_uuid
+from comment_history import CommentHistory
+from event_bus import EventBus
+from history_record import SUCCESS, HistoryRecord, as_dict, entry_epoch, to_epoch
+from rule_index import RuleIndex
+from rule_scheduler import CronExpression
+from snapshots import ConfigSnapshot, HistoryStats, freeze
+from storage import MemoryBackend
+from template_compiler import TemplateCache, validate_template
+
 logger = logging.getLogger(__name__)
 
+# Supported analytics windows, in days
+ANALYTICS_WINDOWS = (7, 30, 90)
+
+# How far back history is loaded from a persistent backend on start
+HISTORY_LOAD_DAYS = max(ANALYTICS_WINDOWS)
+
+STORE_SECONDS = metrics.histogram("sigm_datastore_seconds", "Duration of DataStore calls", ["method"])
+STORE_LOCK_WAIT = metrics.histogram("sigm_datastore_lock_wait_seconds", "Time spent waiting for the DataStore lock")
+
+
+def _timed(method):
+    # Only for methods doing real work; the lock-free snapshot getters cost less than timing them
+    return metrics.timed(STORE_SECONDS, method=method.__name__)(method)
+
+
+def _template_references(rules):
+    """Map each template id to the set of ids of the rules using it"""
+    references = {}
+    for rule_id, rule in rules.items():
+        if rule.get("template_id") is not None:
+            references.setdefault(rule["template_id"], set()).add(rule_id)
+    return references
+
+
+def _move_template_reference(references, rule_id, old_rule, new_rule):
+    """Update a template references map for a rule that was added, changed or removed"""
+    old_template = old_rule.get("template_id") if old_rule is not None else None
+    new_template = new_rule.get("template_id") if new_rule is not None else None
+    if old_template == new_template:
+        return
+    if old_template is not None and old_template in references:
+        references[old_template].discard(rule_id)
+        if not references[old_template]:
+            del references[old_template]
+    if new_template is not None:
+        references.setdefault(new_template, set()).add(rule_id)
+
+
+def encode_history_cursor(entry):
+    raw = f"{entry['timestamp']}|{entry['id']}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_history_cursor(cursor):
+    """Split a history cursor into (timestamp, id), raising ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid history cursor: {cursor}") from e
+    timestamp, sep, entry_id = raw.partition("|")
+    if not sep or not timestamp or not entry_id:
+        raise ValueError(f"Invalid history cursor: {cursor}")
+    return timestamp, entry_id
+
+
+# Integer settings and their minimums; None means "no limit" for the optional per-rule/target limits
+INTEGER_SETTINGS = {
+    "max_comments_per_hour": 0,
+    "max_comments_per_rule_per_hour": 0,
+    "max_comments_per_target_per_hour": 0,
+    "max_concurrent_rules": 1,
+    "history_hot_size": 1,
+    "history_archive_days": 1,
+}
+# The global hourly cap is always set; clearing it must not turn it off
+OPTIONAL_SETTINGS = ("max_comments_per_rule_per_hour", "max_comments_per_target_per_hour")
+
+
+class SettingsError(ValueError):
+    """Raised for a settings update with missing or out-of-range values"""
+
+
+def validate_settings(settings_data):
+    """
+    Check a settings update, coercing integer settings sent as numeric
+    strings or whole floats.
+    
+    Returns:
+        A validated copy of settings_data
+    
+    Raises:
+        SettingsError: If a value is not a valid integer or is below its minimum
+    """
+    if not isinstance(settings_data, dict):
+        raise SettingsError("Settings must be an object")
+    settings = dict(settings_data)
+    for name, minimum in INTEGER_SETTINGS.items():
+        if name not in settings:
+            continue
+        value = settings[name]
+        if value is None and name in OPTIONAL_SETTINGS:
+            continue
+        try:
+            if isinstance(value, bool) or value is None or int(float(value)) != float(value):
+                raise ValueError
+            value = int(float(value))
+        except (TypeError, ValueError, OverflowError):
+            raise SettingsError(f"{name} must be a whole number, got {value!r}") from None
+        if value < minimum:
+            raise SettingsError(f"{name} must be at least {minimum}")
+        settings[name] = value
+    return settings
+
+
+# Operations and object kinds accepted by DataStore.apply_config_batch
+BATCH_OPS = ("create", "update", "upsert", "delete")
+BATCH_KINDS = ("template", "rule", "settings")
+
+
+class _ConfigBatch:
+    """
+    Working copies of the templates, rules, settings and template
+    references that a batch of operations is applied to, and a record of
+    what it changed. Nothing is shared with the live config until the
+    DataStore swaps the result in.
+    """
+    
+    def __init__(self, config, template_rules, now, new_id):
+        self.templates = dict(config.templates)
+        self.rules = dict(config.rules)
+        self.base_settings = config.settings
+        self.settings = None
+        self.template_rules = {template_id: set(rule_ids) for template_id, rule_ids in template_rules.items()}
+        self.now = now
+        self.new_id = new_id
+        self.changed_templates = set()
+        self.changed_rules = {}
+        self.saved_templates = {}
+        self.saved_rules = {}
+        self.deleted_templates = set()
+        self.deleted_rules = set()
+    
+    @property
+    def changed(self):
+        return bool(self.changed_templates or self.changed_rules or self.settings is not None)
+    
+    def apply(self, op, kind, data):
+        """
+        Apply one checked operation to the working copies
+        
+        Returns:
+            (id, status)
+        
+        Raises:
+            ValueError: If the object is missing or, for a template delete, still in use
+        """
+        if kind == "settings":
+            self.settings = freeze(dict(self.settings or self.base_settings, **data))
+            return None, "updated"
+        
+        items = self.templates if kind == "template" else self.rules
+        item_id = data.get("id")
+        existing = items.get(item_id) if item_id else None
+        
+        if op == "delete":
+            if existing is None:
+                raise ValueError(f"{kind.capitalize()} {item_id} not found")
+            if kind == "template" and self.template_rules.get(item_id):
+                raise ValueError(f"Template {item_id} is still used by {len(self.template_rules[item_id])} rule(s)")
+            del items[item_id]
+            self._record(kind, item_id, existing, None)
+            return item_id, "deleted"
+        
+        if op == "update" and existing is None:
+            raise ValueError(f"{kind.capitalize()} {item_id} not found")
+        if op == "create" or existing is None:
+            # Like the single-object API, create always assigns a fresh id
+            item_id = item_id if op == "upsert" and item_id else self.new_id()
+            created_at = data.get("created_at") if op == "upsert" and data.get("created_at") else self.now
+            status = "created"
+        else:
+            created_at = existing["created_at"]
+            status = "updated"
+        data.update(id=item_id, created_at=created_at, updated_at=self.now)
+        
+        if kind == "rule" and data.get("template_id") not in self.templates:
+            raise ValueError(f"Template {data.get('template_id')} not found")
+        item = freeze(data)
+        items[item_id] = item
+        self._record(kind, item_id, existing, item)
+        return item_id, status
+    
+    def _record(self, kind, item_id, old, new):
+        saved, deleted = ((self.saved_templates, self.deleted_templates) if kind == "template"
+                          else (self.saved_rules, self.deleted_rules))
+        if new is None:
+            saved.pop(item_id, None)
+            deleted.add(item_id)
+        else:
+            saved[item_id] = new
+            deleted.discard(item_id)
+        
+        if kind == "template":
+            self.changed_templates.add(item_id)
+        else:
+            self.changed_rules[item_id] = new
+            _move_template_reference(self.template_rules, item_id, old, new)
+
+
 class DataStore:
     """
     In-memory data store for the application.
-    Handles persistence of templates, rules, settings, and comment history.
+    Handles persistence of templates, rules, settings, and comment history
+    through a pluggable storage backend (memory only by default).
+    History beyond the in-memory window goes to the optional history archive.
+    
+    When several processes share a persistent backend, one of them is the
+    leader: it posts comments and writes history and the archive. The
+    others are followers that call sync_from_backend() to pick up changes;
+    every process picks up template, rule and settings changes that way.
+    
+    Templates, rules and settings form an immutable ConfigSnapshot, and
+    history entries are frozen too: writers build the next version under
+    the lock and swap it in, so readers never wait for writers and never
+    share a mutable reference. Analytics read a rollup snapshot taken once
+    per history version.
     """
     
-    def __init__(self):
-        self.templates = {}
-        self.rules = {}
-        self.comment_history = []
-        self.settings = {
+    def __init__(self, backend=None, archive=None, sample_data=True, clock=None, rng=None):
+        # Where timestamps and IDs come from; a VirtualClock and seeded
+        # random.Random make simulated runs fast and repeatable
+        self.clock = clock or SYSTEM_CLOCK
+        self.rng = rng
+        self._config = ConfigSnapshot(0, {}, {}, {
             "enabled": True,
             "max_comments_per_hour": 10,
+            "max_concurrent_rules": 4,
+            "history_hot_size": 1000,
+            "history_archive_days": 90,
             "notification_email": "",
             "error_notification": True
-        }
-        self._lock = threading.RLock()
-        self._init_sample_data()
+        })
+        self.archive = archive
+        self.comment_history = CommentHistory(
+            max_size=self.settings["history_hot_size"],
+            on_evict=self._archive_entry if archive is not None else None
+        )
+        self._retention_day = None
+        # Bumped on every history change; drives ETags on /api/history
+        self.history_version = 0
+        self.history_modified_at = self.clock.now()
+        self._stats = None
+        # Live updates for dashboards (history, stats, bot ticks, queue depth)
+        self.events = EventBus()
+        self._lock = metrics.timed_lock(threading.RLock(), STORE_LOCK_WAIT)
+        self.template_cache = TemplateCache()
+        self.rule_index = RuleIndex()
+        # Template id -> ids of the rules using it, so reference checks don't scan every rule
+        self._template_rules = {}
+        self._rule_listeners = []
+        self.backend = backend or MemoryBackend()
+        # Followers reload history written by the leader instead of writing it
+        self.follow_history = False
+        # Backend revisions this process has loaded
+        self._revisions = self.backend.load_revisions()
+        
+        if not self._load_from_backend() and sample_data:
+            self._init_sample_data()
+        
+        for rule in self.rules.values():
+            self.rule_index.set_rule(rule)
+        self._template_rules = _template_references(self.rules)
+        
+        self._load_archive_counts()
+    
+    @property
+    def templates(self):
+        return self._config.templates
+    
+    @property
+    def rules(self):
+        return self._config.rules
+    
+    @property
+    def settings(self):
+        return self._config.settings
+    
+    def snapshot(self):
+        """Get the current templates, rules and settings as one consistent, immutable version"""
+        return self._config
+    
+    def _load_from_backend(self):
+        """Load persisted state, returning False if there is nothing stored yet"""
+        if not self.backend.persistent:
+            return False
+        
+        templates = self.backend.load_templates()
+        rules = self.backend.load_rules()
+        settings = self.backend.load_settings()
+        if not templates and not rules and settings is None:
+            return False
+        
+        self._config = self._config.replace(
+            templates={template["id"]: freeze(template) for template in templates},
+            rules={rule["id"]: freeze(rule) for rule in rules},
+            settings=dict(self.settings, **settings) if settings is not None else None
+        )
+        self.comment_history.resize(int(self.settings["history_hot_size"]))
+        
+        # Only the recent window is loaded; older history stays in the database
+        since = (self.clock.now() - timedelta(days=HISTORY_LOAD_DAYS)).isoformat()
+        for entry in self.backend.load_history(since, self.comment_history.max_size):
+            self.comment_history.append(HistoryRecord.from_dict(entry))
+        
+        logger.info("Loaded %d templates, %d rules and %d history entries from storage",
+                    len(self.templates), len(self.rules), len(self.comment_history))
+        return True
+    
+    def set_leader(self, leader):
+        """Switch between writing history (leader) and following it (follower)"""
+        with self._lock:
+            self.follow_history = not leader
+            if self.archive is not None:
+                self.archive.read_only = not leader
+                if leader:
+                    self.archive.reload()
+            self.comment_history.on_evict = self._archive_entry if leader and self.archive is not None else None
+    
+    @_timed
+    def sync_from_backend(self):
+        """
+        Reload whatever other processes changed in the shared backend.
+        
+        Returns:
+            Set of what was reloaded: "config" and/or "history"
+        """
+        revisions = self.backend.load_revisions()
+        reloaded = set()
+        if revisions.get("config") != self._revisions.get("config"):
+            self._reload_config()
+            reloaded.add("config")
+        if self.follow_history and revisions.get("history") != self._revisions.get("history"):
+            self._reload_history()
+            reloaded.add("history")
+        self._revisions = revisions
+        return reloaded
+    
+    def _reload_config(self):
+        templates = {template["id"]: freeze(template) for template in self.backend.load_templates()}
+        rules = {rule["id"]: freeze(rule) for rule in self.backend.load_rules()}
+        settings = self.backend.load_settings()
+        
+        with self._lock:
+            for template_id, template in self.templates.items():
+                if templates.get(template_id) != template:
+                    self.template_cache.invalidate(template_id)
+            
+            changed = [
+                (rule_id, rules.get(rule_id)) for rule_id in set(self.rules) | set(rules)
+                if self.rules.get(rule_id) != rules.get(rule_id)
+            ]
+            for rule_id, rule in changed:
+                if rule is None:
+                    self.rule_index.remove_rule(rule_id)
+                else:
+                    self.rule_index.set_rule(rule)
+            
+            settings = freeze(dict(self.settings, **settings)) if settings is not None else self.settings
+            settings_changed = settings != self.settings
+            self._config = self._config.replace(templates=templates, rules=rules, settings=settings)
+            self._template_rules = _template_references(rules)
+            if settings_changed:
+                self._resize_history()
+            
+            if changed:
+                self._notify_rule_changes(changed)
+    
+    def _reload_history(self):
+        since = (self.clock.now() - timedelta(days=HISTORY_LOAD_DAYS)).isoformat()
+        history = CommentHistory(max_size=self.comment_history.max_size)
+        for entry in self.backend.load_history(since, history.max_size):
+            history.append(HistoryRecord.from_dict(entry))
+        if self.archive is not None:
+            self.archive.reload()
+        
+        with self._lock:
+            self.comment_history = history
+            self._load_archive_counts()
+            self._history_changed()
+        self.events.publish("history", {"action": "reload"})
+        self._publish_stats()
+    
+    def seed_sample_data(self):
+        """Create the sample templates and rules if nothing is stored yet"""
+        with self._lock:
+            if self.templates or self.rules:
+                return False
+            self._init_sample_data()
+            for rule in self.rules.values():
+                self.rule_index.set_rule(rule)
+            self._template_rules = _template_references(self.rules)
+            self._notify_rule_changes(list(self.rules.items()))
+            return True
+    
+    def _archive_entry(self, record):
+        self.archive.append(record.to_dict())
+    
+    def _load_archive_counts(self):
+        """Fold archived days into the analytics rollup"""
+        if self.archive is None:
+            return
+        self._apply_retention()
+        rollup = self.comment_history.rollup
+        for day, counts in self.archive.day_counts().items():
+            rollup.merge_day(day, counts)
+        for template_id, counts in self.archive.template_counts().items():
+            rollup.merge_template(template_id, counts)
+    
+    def _apply_retention(self):
+        """Drop archived days past the retention window"""
+        now = self.clock.now()
+        self._retention_day = now.strftime("%Y-%m-%d")
+        if self.archive is None:
+            return
+        
+        pruned = self.archive.prune(int(self.settings["history_archive_days"]), now=now)
+        if not pruned:
+            return
+        self._history_changed()
+        
+        template_counts = {}
+        for info in pruned.values():
+            for template_id, counts in info["templates"].items():
+                totals = template_counts.setdefault(template_id, {})
+                for status, count in counts.items():
+                    totals[status] = totals.get(status, 0) + count
+        
+        # Never drop counters for days still in the in-memory window
+        cutoff = (now - timedelta(days=int(self.settings["history_archive_days"]))).strftime("%Y-%m-%d")
+        oldest_hot = self.comment_history.oldest_timestamp()
+        if oldest_hot is not None:
+            cutoff = min(cutoff, oldest_hot[:10])
+        self.comment_history.rollup.drop_before(cutoff, template_counts)
     
     def _init_sample_data(self):
         """Initialize with some sample templates and rules"""
         # Sample templates
-        template1_id = str(uuid.uuid4())
-        template2_id = str(uuid.uuid4())
+        template1_id = new_uuid(self.rng)
+        template2_id = new_uuid(self.rng)
         
-        self.templates = {
+        templates = {
             template1_id: {
                 "id": template1_id,
                 "name": "Thank You Template",
                 "content": "Thank you for your post! This is really interesting.",
                 "variables": [],
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
+                "created_at": self.clock.now().isoformat(),
+                "updated_at": self.clock.now().isoformat()
             },
             template2_id: {
                 "id": template2_id,
                 "name": "Question Response",
                 "content": "Great question! Have you considered {suggestion}?",
                 "variables": ["suggestion"],
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
+                "created_at": self.clock.now().isoformat(),
+                "updated_at": self.clock.now().isoformat()
             }
         }
         
         # Sample rules
-        rule_id = str(uuid.uuid4())
-        self.rules = {
+        rule_id = new_uuid(self.rng)
+        rules = {
             rule_id: {
                 "id": rule_id,
                 "name": "New Post Response",
@@ -62,43 +488,66 @@ class DataStore:
                 "variable_values": {},
                 "enabled": True,
                 "cooldown_minutes": 60,
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
+                "created_at": self.clock.now().isoformat(),
+                "updated_at": self.clock.now().isoformat()
             }
         }
+        
+        self._config = self._config.replace(
+            templates={template_id: freeze(template) for template_id, template in templates.items()},
+            rules={rule_id: freeze(rule) for rule_id, rule in rules.items()}
+        )
+        for template in self.templates.values():
+            self.backend.save_template(template)
+        for rule in self.rules.values():
+            self.backend.save_rule(rule)
+        self.backend.save_settings(self.settings)
     
     def get_templates(self):
-        """Get all templates"""
-        with self._lock:
-            return list(self.templates.values())
+        """Get all templates (read-only)"""
+        return self._config.template_list
     
     def get_template(self, template_id):
-        """Get a specific template by ID"""
-        with self._lock:
-            return self.templates.get(template_id)
+        """Get a specific template by ID (read-only)"""
+        return self.templates.get(template_id)
     
+    def get_compiled_template(self, template):
+        """Get the compiled, cached form of a template for rendering"""
+        return self.template_cache.get(template)
+    
+    @_timed
     def add_template(self, template_data):
         """Add a new template"""
+        validate_template(template_data)
+        
         with self._lock:
-            template_id = str(uuid.uuid4())
+            template_id = new_uuid(self.rng)
             template_data["id"] = template_id
-            template_data["created_at"] = datetime.now().isoformat()
-            template_data["updated_at"] = datetime.now().isoformat()
-            self.templates[template_id] = template_data
+            template_data["created_at"] = self.clock.now().isoformat()
+            template_data["updated_at"] = self.clock.now().isoformat()
+            self._config = self._config.replace(templates=dict(self.templates, **{template_id: freeze(template_data)}))
+            self.backend.save_template(template_data)
             return template_id
     
+    @_timed
     def update_template(self, template_id, template_data):
         """Update an existing template"""
+        validate_template(template_data)
+        
         with self._lock:
             if template_id not in self.templates:
                 return False
             
-            # Preserve the original creation date
+            # Preserve the id and original creation date
+            template_data["id"] = template_id
             template_data["created_at"] = self.templates[template_id]["created_at"]
-            template_data["updated_at"] = datetime.now().isoformat()
-            self.templates[template_id] = template_data
+            template_data["updated_at"] = self.clock.now().isoformat()
+            self._config = self._config.replace(templates=dict(self.templates, **{template_id: freeze(template_data)}))
+            self.template_cache.invalidate(template_id)
+            self.backend.save_template(template_data)
             return True
     
+    @_timed
     def delete_template(self, template_id):
         """Delete a template by ID"""
         with self._lock:
@@ -106,173 +555,557 @@ class DataStore:
                 return False
             
             # Check if template is used by any rules
-            for rule in self.rules.values():
-                if rule["template_id"] == template_id:
-                    return False
+            if self._template_rules.get(template_id):
+                return False
             
-            del self.templates[template_id]
+            templates = dict(self.templates)
+            del templates[template_id]
+            self._config = self._config.replace(templates=templates)
+            self.template_cache.invalidate(template_id)
+            self.backend.delete_template(template_id)
             return True
     
     def get_rules(self):
-        """Get all rules"""
-        with self._lock:
-            return list(self.rules.values())
+        """Get all rules (read-only)"""
+        return self._config.rule_list
     
     def get_rule(self, rule_id):
-        """Get a specific rule by ID"""
+        """Get a specific rule by ID (read-only)"""
+        return self.rules.get(rule_id)
+    
+    def rules_using_template(self, template_id):
+        """Get the IDs of the rules that use a template"""
         with self._lock:
-            return self.rules.get(rule_id)
+            return sorted(self._template_rules.get(template_id, ()))
+    
+    def add_rule_listener(self, callback):
+        """Call callback(rule_id, rule) after a rule changes; rule is None when deleted"""
+        self._rule_listeners.append(callback)
+    
+    def _notify_rule_change(self, rule_id, rule):
+        self._notify_rule_changes([(rule_id, rule)])
+    
+    def _notify_rule_changes(self, changes):
+        """Tell listeners about (rule_id, rule) changes, publishing stats once for all of them"""
+        self._publish_stats()
+        for rule_id, rule in changes:
+            for callback in self._rule_listeners:
+                try:
+                    callback(rule_id, rule)
+                except Exception as e:
+                    logger.error("Error in rule listener for %s: %s", rule_id, e)
     
+    @_timed
     def add_rule(self, rule_data):
-        """Add a new rule"""
+        """
+        Add a new rule
+        
+        Raises:
+            CronError: If the rule's schedule is not a valid cron expression
+        """
+        if rule_data.get("schedule"):
+            CronExpression(rule_data["schedule"]).next_after(self.clock.now())
+        
         with self._lock:
-            rule_id = str(uuid.uuid4())
+            rule_id = new_uuid(self.rng)
             rule_data["id"] = rule_id
-            rule_data["created_at"] = datetime.now().isoformat()
-            rule_data["updated_at"] = datetime.now().isoformat()
-            self.rules[rule_id] = rule_data
+            rule_data["created_at"] = self.clock.now().isoformat()
+            rule_data["updated_at"] = self.clock.now().isoformat()
+            rule = freeze(rule_data)
+            self._config = self._config.replace(rules=dict(self.rules, **{rule_id: rule}))
+            _move_template_reference(self._template_rules, rule_id, None, rule)
+            self.rule_index.set_rule(rule)
+            self.backend.save_rule(rule)
+            self._notify_rule_change(rule_id, rule)
             return rule_id
     
+    @_timed
     def update_rule(self, rule_id, rule_data):
-        """Update an existing rule"""
+        """
+        Update an existing rule
+        
+        Raises:
+            CronError: If the rule's schedule is not a valid cron expression
+        """
+        if rule_data.get("schedule"):
+            CronExpression(rule_data["schedule"]).next_after(self.clock.now())
+        
         with self._lock:
             if rule_id not in self.rules:
                 return False
             
-            # Preserve the original creation date
+            # Preserve the ID and original creation date
+            rule_data["id"] = rule_id
             rule_data["created_at"] = self.rules[rule_id]["created_at"]
-            rule_data["updated_at"] = datetime.now().isoformat()
-            self.rules[rule_id] = rule_data
+            rule_data["updated_at"] = self.clock.now().isoformat()
+            rule = freeze(rule_data)
+            _move_template_reference(self._template_rules, rule_id, self.rules[rule_id], rule)
+            self._config = self._config.replace(rules=dict(self.rules, **{rule_id: rule}))
+            self.rule_index.set_rule(rule)
+            self.backend.save_rule(rule)
+            self._notify_rule_change(rule_id, rule)
             return True
     
+    @_timed
     def delete_rule(self, rule_id):
         """Delete a rule by ID"""
         with self._lock:
             if rule_id not in self.rules:
                 return False
             
-            del self.rules[rule_id]
+            rules = dict(self.rules)
+            _move_template_reference(self._template_rules, rule_id, rules.pop(rule_id), None)
+            self._config = self._config.replace(rules=rules)
+            self.rule_index.remove_rule(rule_id)
+            self.backend.delete_rule(rule_id)
+            self._notify_rule_change(rule_id, None)
             return True
     
-    def get_settings(self):
-        """Get application settings"""
+    @_timed
+    def apply_config_batch(self, operations, atomic=False):
+        """
+        Create, update, upsert or delete many templates and rules at once
+        
+        Each operation is {"op": ..., "kind": "template", "rule" or "settings",
+        "data": {...}}. Update and delete need data["id"]; an upsert that
+        creates keeps the given id and created_at, so exports re-import as
+        they were. Operations apply in order, so a rule can use a template
+        created earlier in the same batch. The changes become one config
+        version, written to the backend in one transaction.
+        
+        Args:
+            operations: Iterable of operations
+            atomic: Apply nothing if any operation fails
+        
+        Returns:
+            One result per operation: index, op, kind, id and a status of
+            created, updated, deleted, error (with a message) or skipped
+        """
+        prepared = [self._prepare_batch_operation(index, operation) for index, operation in enumerate(operations)]
+        
         with self._lock:
-            return self.settings
+            batch = _ConfigBatch(self._config, self._template_rules, self.clock.now().isoformat(),
+                                 lambda: new_uuid(self.rng))
+            for result, data in prepared:
+                if result["status"] == "error":
+                    continue
+                try:
+                    result["id"], result["status"] = batch.apply(result["op"], result["kind"], data)
+                except ValueError as e:
+                    result.update(status="error", message=str(e))
+            
+            results = [result for result, _ in prepared]
+            if atomic and any(result["status"] == "error" for result in results):
+                for result in results:
+                    if result["status"] != "error":
+                        result["status"] = "skipped"
+                return results
+            if not batch.changed:
+                return results
+            
+            # Written first: if the transaction fails, nothing has changed in memory either
+            self.backend.save_config(
+                templates=batch.saved_templates.values(),
+                rules=batch.saved_rules.values(),
+                deleted_templates=batch.deleted_templates,
+                deleted_rules=batch.deleted_rules,
+                settings=batch.settings
+            )
+            self._config = self._config.replace(
+                templates=batch.templates if batch.changed_templates else None,
+                rules=batch.rules if batch.changed_rules else None,
+                settings=batch.settings
+            )
+            self._template_rules = batch.template_rules
+            for template_id in batch.changed_templates:
+                self.template_cache.invalidate(template_id)
+            for rule_id, rule in batch.changed_rules.items():
+                if rule is None:
+                    self.rule_index.remove_rule(rule_id)
+                else:
+                    self.rule_index.set_rule(rule)
+            if batch.settings is not None:
+                self._resize_history()
+            
+            logger.info("Applied config batch: %d templates and %d rules changed, %d errors",
+                        len(batch.changed_templates), len(batch.changed_rules),
+                        sum(result["status"] == "error" for result in results))
+            self._notify_rule_changes(list(batch.changed_rules.items()))
+            return results
+    
+    def _prepare_batch_operation(self, index, operation):
+        """
+        Check an operation's shape and content outside the lock
+        
+        Returns:
+            (result, data) with a copy of the data that is safe to fill in
+        """
+        operation = operation if isinstance(operation, dict) else {}
+        op = operation.get("op")
+        kind = operation.get("kind")
+        data = operation.get("data")
+        result = {"index": index, "op": op, "kind": kind, "id": data.get("id") if isinstance(data, dict) else None,
+                  "status": "pending"}
+        try:
+            if op not in BATCH_OPS:
+                raise ValueError(f"Unknown operation {op!r}, expected one of {', '.join(BATCH_OPS)}")
+            if kind not in BATCH_KINDS:
+                raise ValueError(f"Unknown kind {kind!r}, expected one of {', '.join(BATCH_KINDS)}")
+            if not isinstance(data, dict):
+                raise ValueError("Operation data must be an object")
+            data = dict(data)
+            if kind == "settings":
+                if op not in ("update", "upsert"):
+                    raise ValueError("Settings can only be updated")
+                data = validate_settings(data)
+            elif op in ("update", "delete") and not data.get("id"):
+                raise ValueError(f"{op.capitalize()} needs an id")
+            elif op != "delete" and kind == "template":
+                validate_template(data)
+            elif op != "delete" and data.get("schedule"):
+                CronExpression(data["schedule"]).next_after(self.clock.now())
+        except ValueError as e:
+            result.update(status="error", message=str(e))
+        return result, data
     
+    @_timed
+    def dispatch_event(self, event):
+        """
+        Route a post event to the enabled rules it matches.
+        
+        Returns:
+            List of (rule, matched keywords) pairs
+        """
+        with self._lock:
+            matched = self.rule_index.dispatch(event)
+            return [(self.rules[rule_id], keywords) for rule_id, keywords in matched.items()]
+    
+    def _history_changed(self):
+        # Invalidates history ETags and the analytics rollup snapshot
+        self.history_version += 1
+        self.history_modified_at = self.clock.now()
+    
+    def _touch_history(self, action, entry):
+        """Record a history change and publish it with the updated dashboard stats"""
+        self._history_changed()
+        self.events.publish("history", {"action": action, "entry": as_dict(entry)})
+        self._publish_stats()
+    
+    def _publish_stats(self):
+        # Computed once per change, however many dashboards are listening
+        if self.events.has_subscribers("stats"):
+            self.events.publish("stats", self.get_dashboard_stats())
+    
+    def get_settings(self):
+        """Get application settings (read-only)"""
+        return self.settings
+    
+    @_timed
     def update_settings(self, settings_data):
-        """Update application settings"""
+        """
+        Update application settings
+        
+        Raises:
+            SettingsError: If a value is invalid; nothing is changed then
+        """
+        settings_data = validate_settings(settings_data)
         with self._lock:
-            self.settings.update(settings_data)
+            self._config = self._config.replace(settings=dict(self.settings, **settings_data))
+            self._resize_history()
+            self.backend.save_settings(self.settings)
             return True
     
+    def _resize_history(self):
+        self.comment_history.resize(max(int(self.settings["history_hot_size"]), 1))
+        self._apply_retention()
+        self._history_changed()
+    
+    @_timed
     def add_comment_history(self, comment_data):
         """Add a new comment to history"""
         with self._lock:
-            comment_data["id"] = str(uuid.uuid4())
-            comment_data["timestamp"] = datetime.now().isoformat()
-            self.comment_history.append(comment_data)
+            comment_data["id"] = new_uuid(self.rng)
+            comment_data["timestamp"] = self.clock.now().isoformat()
+            entry = HistoryRecord.from_dict(comment_data)
+            
+            # The ring buffer keeps the hot window; older entries spill to the archive
+            self.comment_history.append(entry)
+            if self._retention_day != self.clock.now().strftime("%Y-%m-%d"):
+                self._apply_retention()
             
-            # Trim history if it gets too large (keep last 1000 entries)
-            if len(self.comment_history) > 1000:
-                self.comment_history = self.comment_history[-1000:]
+            self._touch_history("added", entry)
+            
+            # Queued for a batched write, never blocks the posting path
+            self.backend.save_history(comment_data)
+    
+    @_timed
+    def get_comment_history(self, before=None, limit=None):
+        """
+        Get comment history, newest first.
+        
+        Without arguments this is the in-memory window. With `limit` (and an
+        optional cursor `before`, from encode_history_cursor() of the last
+        entry seen) it pages back through the window and then the archive by
+        (timestamp, id), like query_history().
+        """
+        if before is None and limit is None:
+            with self._lock:
+                return self.comment_history.newest_first()
+        entries, _ = self.query_history(cursor=before, limit=limit or 50)
+        return entries
+    
+    @_timed
+    def query_history(self, cursor=None, limit=50, status=None, rule_id=None, template_id=None,
+                      start=None, end=None):
+        """
+        Page through history newest first, across the window and the archive.
+        
+        Args:
+            cursor: Opaque cursor from a previous page's next_cursor
+            limit: Maximum entries to return
+            status, rule_id, template_id: Optional exact-match filters
+            start, end: Optional ISO timestamps or YYYY-MM-DD dates (inclusive)
+        
+        Returns:
+            (entries, next_cursor); next_cursor is None on the last page
+        
+        Raises:
+            ValueError: If the cursor or a timestamp is malformed
+        """
+        cursor_ts, cursor_id = decode_history_cursor(cursor) if cursor else (None, None)
+        if end is not None and len(end) == 10:
+            end += "T23:59:59.999999"
+        
+        upper = cursor_ts
+        if end is not None and (upper is None or to_epoch(end) < to_epoch(upper)):
+            upper = end
+        
+        # Timestamps are compared as epoch integers
+        start_epoch = to_epoch(start) if start is not None else None
+        upper_epoch = to_epoch(upper) if upper is not None else None
+        cursor_epoch = to_epoch(cursor_ts) if cursor_ts is not None else None
+        
+        # Pages are ordered by (timestamp, id), newest first, so entries
+        # sharing a timestamp page deterministically wherever they are held
+        entries = []
+        seen = set()
+        state = {"boundary": None, "done": False}
+        
+        def collect(source):
+            for entry in source:
+                timestamp = entry_epoch(entry)
+                if start_epoch is not None and timestamp < start_epoch:
+                    state["done"] = True
+                    return
+                if state["boundary"] is not None and timestamp < state["boundary"]:
+                    # Past the last timestamp the page needs; ties with it were collected too
+                    state["done"] = True
+                    return
+                if upper_epoch is not None and timestamp > upper_epoch:
+                    continue
+                if timestamp == cursor_epoch and entry["id"] >= cursor_id:
+                    continue
+                if entry["id"] in seen:
+                    # Evicted to the archive while it was being read
+                    continue
+                if status is not None and entry.get("status") != status:
+                    continue
+                if rule_id is not None and entry.get("rule_id") != rule_id:
+                    continue
+                if template_id is not None and entry.get("template_id") != template_id:
+                    continue
+                entries.append(entry)
+                seen.add(entry["id"])
+                if len(entries) == limit + 1:
+                    state["boundary"] = timestamp
+        
+        with self._lock:
+            collect(self.comment_history.iter_newest_first(upper, rule_id=rule_id, template_id=template_id))
+            oldest_hot = self.comment_history.oldest_timestamp()
+        
+        if not state["done"] and self.archive is not None:
+            # Inclusive: archived entries can share the window's oldest timestamp
+            if oldest_hot is not None and (upper_epoch is None or to_epoch(oldest_hot) < upper_epoch):
+                collect(self.archive.iter_newest_first(oldest_hot, inclusive=True))
+            else:
+                collect(self.archive.iter_newest_first(upper, inclusive=True))
+        
+        entries.sort(key=lambda entry: (entry_epoch(entry), entry["id"]), reverse=True)
+        next_cursor = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            next_cursor = encode_history_cursor(entries[-1])
+        return entries, next_cursor
     
-    def get_comment_history(self):
-        """Get comment history"""
+    @_timed
+    def count_recent_comments(self, hours=1):
+        """Count comments from the last N hours"""
         with self._lock:
-            return sorted(
-                self.comment_history, 
-                key=lambda x: x["timestamp"], 
-                reverse=True
-            )
+            cutoff = self.clock.now() - timedelta(hours=hours)
+            return self.comment_history.count_since(cutoff.isoformat())
     
-    def get_recent_comments(self, hours=1):
-        """Get comments from the last N hours"""
+    @_timed
+    def get_last_rule_comment(self, rule_id):
+        """Get the most recent history entry for a rule"""
         with self._lock:
-            cutoff = datetime.now() - timedelta(hours=hours)
-            cutoff_str = cutoff.isoformat()
-            
-            return [
-                comment for comment in self.comment_history
-                if comment["timestamp"] > cutoff_str
-            ]
+            return self.comment_history.last_for_rule(rule_id)
     
-    def get_analytics(self):
-        """Get analytics data for the dashboard"""
+    @_timed
+    def update_comment_status(self, comment_id, status):
+        """Change the status of a history entry by its platform comment ID"""
         with self._lock:
-            # Calculate daily stats for the last 7 days
-            now = datetime.now()
-            daily_counts = []
-            success_count = 0
-            error_count = 0
+            comment = self.comment_history.get_by_comment_id(comment_id)
+            if not comment:
+                return False
             
-            for i in range(7):
-                day = now - timedelta(days=i)
-                day_start = datetime(day.year, day.month, day.day, 0, 0, 0).isoformat()
-                day_end = datetime(day.year, day.month, day.day, 23, 59, 59).isoformat()
-                
-                day_comments = [
-                    comment for comment in self.comment_history
-                    if day_start <= comment["timestamp"] <= day_end
-                ]
-                
-                day_success = len([c for c in day_comments if c["status"] == "success"])
-                day_error = len([c for c in day_comments if c["status"] == "error"])
-                
-                daily_counts.append({
-                    "date": day.strftime("%Y-%m-%d"),
-                    "success": day_success,
-                    "error": day_error
-                })
-                
-                success_count += day_success
-                error_count += day_error
+            self._replace_history(comment, status=status)
+            return True
+    
+    @_timed
+    def update_comment_engagement(self, comment_id, engagement):
+        """Replace the engagement metrics of a history entry by its platform comment ID"""
+        with self._lock:
+            comment = self.comment_history.get_by_comment_id(comment_id)
+            if not comment:
+                return False
             
-            # Calculate template usage
-            template_usage = {}
-            for comment in self.comment_history:
-                template_id = comment.get("template_id")
-                if template_id:
-                    template_usage[template_id] = template_usage.get(template_id, 0) + 1
+            self._replace_history(comment, engagement=engagement)
+            return True
+    
+    def _replace_history(self, entry, **changes):
+        """Swap a history entry for an updated copy; readers of the old one are unaffected"""
+        updated = entry.replace(updated_at=self.clock.now().isoformat(), **changes)
+        self.comment_history.replace(entry, updated)
+        self._touch_history("updated", updated)
+        self.backend.save_history(updated.to_dict())
+    
+    @_timed
+    def delete_comment_history(self, history_id):
+        """Remove a single entry from comment history"""
+        with self._lock:
+            entry = self.comment_history.remove(history_id)
+            if entry is None:
+                return False
             
-            # Get template names
-            template_stats = []
-            for template_id, count in template_usage.items():
-                template = self.templates.get(template_id, {"name": "Unknown Template"})
-                template_stats.append({
-                    "id": template_id,
-                    "name": template["name"],
-                    "count": count
-                })
+            self._touch_history("deleted", {"id": entry["id"], "timestamp": entry["timestamp"]})
+            self.backend.delete_history(history_id)
+            return True
+    
+    def _total_comments(self):
+        archived = self.archive.entry_count() if self.archive is not None else 0
+        return len(self.comment_history) + archived
+    
+    def _history_stats(self):
+        """Rollup counters as of the current history version, taken once and shared by readers"""
+        stats = self._stats
+        if stats is not None and stats.version == self.history_version:
+            return stats
+        with self._lock:
+            stats = HistoryStats(self.history_version, self.comment_history.rollup.snapshot(), self._total_comments())
+            self._stats = stats
+        return stats
+    
+    @_timed
+    def get_analytics(self, days=7, hours=24):
+        """Get analytics data for the dashboard"""
+        if days not in ANALYTICS_WINDOWS:
+            raise ValueError(f"Analytics window must be one of {ANALYTICS_WINDOWS} days")
+        
+        stats = self._history_stats()
+        rollup = stats.rollup
+        templates = self.templates
+        now = self.clock.now()
+        
+        # Daily stats for the window, read from the rollup counters
+        daily_counts = []
+        success_count = 0
+        error_count = 0
+        
+        for i in range(days):
+            day = now - timedelta(days=i)
+            counts = rollup.day(day.strftime("%Y-%m-%d"))
+            day_success = counts.get("success", 0)
+            day_error = counts.get("error", 0)
             
-            # Sort by usage count
-            template_stats.sort(key=lambda x: x["count"], reverse=True)
+            daily_counts.append({
+                "date": day.strftime("%Y-%m-%d"),
+                "success": day_success,
+                "error": day_error
+            })
             
-            return {
-                "total_comments": len(self.comment_history),
-                "success_rate": (success_count / (success_count + error_count) * 100) if success_count + error_count > 0 else 100,
-                "daily_counts": daily_counts,
-                "template_stats": template_stats
-            }
+            success_count += day_success
+            error_count += day_error
+        
+        # Hourly stats for the last N hours
+        hourly_counts = []
+        for i in range(hours):
+            hour = now - timedelta(hours=i)
+            counts = rollup.hour(hour.strftime("%Y-%m-%dT%H"))
+            hourly_counts.append({
+                "hour": hour.strftime("%Y-%m-%d %H:00"),
+                "success": counts.get("success", 0),
+                "error": counts.get("error", 0)
+            })
+        
+        # Template usage, with template names
+        template_stats = []
+        for template_id, count in rollup.template_counts().items():
+            template = templates.get(template_id, {"name": "Unknown Template"})
+            template_stats.append({
+                "id": template_id,
+                "name": template["name"],
+                "count": count
+            })
+        
+        # Sort by usage count
+        template_stats.sort(key=lambda x: x["count"], reverse=True)
+        
+        return {
+            "total_comments": stats.total_comments,
+            "success_rate": (success_count / (success_count + error_count) * 100) if success_count + error_count > 0 else 100,
+            "window_days": days,
+            "daily_counts": daily_counts,
+            "hourly_counts": hourly_counts,
+            "template_stats": template_stats
+        }
     
+    @_timed
     def get_dashboard_stats(self):
         """Get summary statistics for the dashboard"""
+        stats = self._history_stats()
+        rollup = stats.rollup
+        config = self._config
+        now = self.clock.now()
+        
+        comments_today = sum(rollup.day(now.strftime("%Y-%m-%d")).values())
+        
+        # Last 24 hours: whole hours come from the rollup, only the
+        # partial hour at the start of the window is read entry by entry
+        cutoff = now - timedelta(hours=24)
+        first_full_hour = cutoff.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
         with self._lock:
-            today = datetime.now().strftime("%Y-%m-%d")
-            today_start = datetime.now().replace(hour=0, minute=0, second=0).isoformat()
-            
-            today_comments = [
-                comment for comment in self.comment_history
-                if comment["timestamp"] >= today_start
-            ]
-            
-            recent_comments = self.get_recent_comments(hours=24)
-            success_comments = [c for c in recent_comments if c["status"] == "success"]
-            
-            return {
-                "total_templates": len(self.templates),
-                "total_rules": len(self.rules),
-                "active_rules": len([r for r in self.rules.values() if r["enabled"]]),
-                "comments_today": len(today_comments),
-                "total_comments": len(self.comment_history),
-                "success_rate": (len(success_comments) / len(recent_comments) * 100) if recent_comments else 100
-            }
+            partial = self.comment_history.between(
+                cutoff.isoformat(), (first_full_hour - timedelta(microseconds=1)).isoformat()
+            )
+        # between() is inclusive, the original window is strictly after the cutoff
+        cutoff_epoch = to_epoch(cutoff.isoformat())
+        partial = [c for c in partial if c.ts > cutoff_epoch]
+        
+        recent_total = len(partial)
+        recent_success = len([c for c in partial if c.status_handle == SUCCESS])
+        
+        hour = first_full_hour
+        while hour <= now:
+            counts = rollup.hour(hour.strftime("%Y-%m-%dT%H"))
+            recent_total += sum(counts.values())
+            recent_success += counts.get("success", 0)
+            hour += timedelta(hours=1)
+        
+        return {
+            "total_templates": len(config.templates),
+            "total_rules": len(config.rules),
+            "active_rules": len([r for r in config.rule_list if r["enabled"]]),
+            "comments_today": comments_today,
+            "total_comments": stats.total_comments,
+            "success_rate": (recent_success / recent_total * 100) if recent_total else 100
+        }
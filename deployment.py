@@ -0,0 +1,224 @@
+import logging
+import os
+import threading
+import zlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_lock key shared by every process of this app
+LEADER_LOCK_KEY = zlib.crc32(b"sigm-scheduler-leader")
+
+
+class FileLock:
+    """
+    Exclusive, non-blocking lock on a file. The OS releases it when the
+    holding process exits, so a crashed leader never blocks a new one.
+    Only processes on the same host see it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        if fcntl is None:
+            raise RuntimeError("File locks need fcntl; use a PostgreSQL DATABASE_URL for leader election")
+        if self._file is not None:
+            return True
+
+        f = open(self.path, "a+")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+
+        # Note the holder for whoever is debugging a stuck deployment
+        f.seek(0)
+        f.truncate()
+        f.write(str(os.getpid()))
+        f.flush()
+        self._file = f
+        return True
+
+    def is_held(self):
+        return self._file is not None
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+class PostgresAdvisoryLock:
+    """
+    Session-level PostgreSQL advisory lock on its own connection. The server
+    releases it if the connection drops, so it works across hosts.
+    """
+
+    def __init__(self, dsn, key=LEADER_LOCK_KEY):
+        self.dsn = dsn
+        self.key = key
+        self._conn = None
+
+    def acquire(self):
+        try:
+            import psycopg2
+        except ImportError as e:
+            raise RuntimeError("psycopg2 is required for PostgreSQL leader election") from e
+        if self._conn is not None:
+            return True
+
+        try:
+            conn = psycopg2.connect(self.dsn)
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_lock(%s)", (self.key,))
+                acquired = cursor.fetchone()[0]
+        except psycopg2.Error as e:
+            logger.error("Could not try the leader lock: %s", e)
+            return False
+
+        if acquired:
+            self._conn = conn
+        else:
+            conn.close()
+        return acquired
+
+    def is_held(self):
+        """Check the lock's connection is still alive (and so the lock held)"""
+        if self._conn is None:
+            return False
+        try:
+            with self._conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return True
+        except Exception as e:
+            logger.error("Leader lock connection lost: %s", e)
+            self._close()
+            return False
+
+    def release(self):
+        if self._conn is not None:
+            try:
+                with self._conn.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(%s)", (self.key,))
+            except Exception:
+                pass
+            self._close()
+
+    def _close(self):
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+
+
+def create_leader_lock(database_url=None, path="sigm-leader.lock"):
+    """
+    Create the lock used to elect the scheduler leader: an advisory lock
+    when the store is PostgreSQL, otherwise a file lock at `path`.
+    """
+    if database_url and database_url.startswith(("postgres://", "postgresql://")):
+        return PostgresAdvisoryLock(database_url)
+    return FileLock(path)
+
+
+class LeaderElector:
+    """
+    Keeps trying to take the leader lock on a background thread.
+
+    The process holding the lock is the leader and runs the schedulers;
+    `on_elected` is called when it takes the lock and `on_lost` if it loses
+    it. When the leader exits its lock is freed and another process takes
+    over within `interval` seconds.
+    """
+
+    def __init__(self, lock, on_elected, on_lost=None, interval=10):
+        self.lock = lock
+        self.on_elected = on_elected
+        self.on_lost = on_lost
+        self.interval = interval
+        self._leader = False
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def is_leader(self):
+        return self._leader
+
+    def _check(self):
+        if self._leader:
+            if not self.lock.is_held():
+                logger.warning("Lost the scheduler leader lock")
+                self._leader = False
+                if self.on_lost:
+                    self.on_lost()
+            return
+
+        if not self.lock.acquire():
+            return
+        logger.info("Process %s is now the scheduler leader", os.getpid())
+        self._leader = True
+        try:
+            self.on_elected()
+        except Exception as e:
+            logger.error("Error taking over as scheduler leader: %s", e)
+            self._leader = False
+            self.lock.release()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._check()
+
+    def start(self):
+        """Try for the lock now, then keep checking in the background"""
+        self._check()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="leader-elector", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._leader:
+            self._leader = False
+            if self.on_lost:
+                self.on_lost()
+            self.lock.release()
+
+
+class PeriodicTask:
+    """Calls `func` every `interval` seconds on a daemon thread, logging errors"""
+
+    def __init__(self, func, interval, name="periodic-task"):
+        self.func = func
+        self.interval = interval
+        self.name = name
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.func()
+            except Exception as e:
+                logger.error("Error in %s: %s", self.name, e)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,122 @@
+import json
+import threading
+from collections import deque
+from itertools import count
+
+
+class Event:
+    """A published message; its JSON is encoded once however many subscribers read it"""
+
+    __slots__ = ("id", "topic", "data", "_encoded")
+
+    def __init__(self, event_id, topic, data):
+        self.id = event_id
+        self.topic = topic
+        self.data = data
+        self._encoded = None
+
+    def encoded(self):
+        if self._encoded is None:
+            self._encoded = json.dumps(self.data, default=str, separators=(",", ":"))
+        return self._encoded
+
+    def to_sse(self):
+        """Format the event as a Server-Sent Events message"""
+        prefix = f"id: {self.id}\n" if self.id is not None else ""
+        return f"{prefix}event: {self.topic}\ndata: {self.encoded()}\n\n"
+
+
+class Subscription:
+    """
+    A subscriber's bounded event buffer. When a slow reader lets it fill up,
+    the oldest events are dropped and the next read reports that it lagged,
+    so the client knows to reload instead of showing partial data.
+    """
+
+    def __init__(self, bus, topics, buffer_size):
+        self.bus = bus
+        self.topics = frozenset(topics) if topics else None
+        self.dropped = 0
+        self._events = deque(maxlen=buffer_size)
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def wants(self, topic):
+        return self.topics is None or topic in self.topics
+
+    def _deliver(self, event):
+        with self._condition:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """
+        Wait for the next event.
+
+        Returns:
+            An Event, a "lagged" Event if events were dropped since the last
+            read, or None if nothing arrived within `timeout` or it is closed
+        """
+        with self._condition:
+            if not self._events and not self._closed:
+                self._condition.wait(timeout)
+            if self.dropped:
+                dropped, self.dropped = self.dropped, 0
+                return Event(None, "lagged", {"dropped": dropped})
+            if not self._events:
+                return None
+            return self._events.popleft()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    """
+    In-process publish/subscribe with a bounded buffer per subscriber.
+    Publishing never blocks on slow subscribers.
+    """
+
+    def __init__(self, buffer_size=256):
+        self.buffer_size = buffer_size
+        self._subscriptions = set()
+        self._ids = count(1)
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics=None, buffer_size=None):
+        subscription = Subscription(self, topics, buffer_size or self.buffer_size)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def has_subscribers(self, topic):
+        with self._lock:
+            return any(subscription.wants(topic) for subscription in self._subscriptions)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscriptions)
+
+    def publish(self, topic, data):
+        """Send an event to every subscriber of the topic"""
+        with self._lock:
+            targets = [s for s in self._subscriptions if s.wants(topic)]
+            if not targets:
+                return None
+            event = Event(next(self._ids), topic, data)
+        for subscription in targets:
+            subscription._deliver(event)
+        return event
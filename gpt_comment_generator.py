@@ -1,10 +1,17 @@
-import openai
+import hashlib
 import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
-openai.api_key = os.getenv("OPENAI_API_KEY")
+import metrics
 
-def generate_comment(post_text):
-    prompt = f"""
+MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+
+# The prompt around the post text is built once at import
+PROMPT_PREFIX = """
 You are a supportive and encouraging assistant for the SIGN Protocol community.
 Your job is to read the post below and respond with a kind, insightful, and uplifting comment
 that encourages the poster to keep growing, one tweet at a time.
@@ -14,18 +21,205 @@ Keep the comment under 100 characters.
 Add 🧡 or 🍊 at the end — but only one.
 
 Post:
-"{post_text}"
+\""""
+
+PROMPT_SUFFIX = """\"
 
 Reply (short, warm, motivating):
 """
 
-    try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=60,
-            temperature=0.8
+
+GENERATE_SECONDS = metrics.histogram("sigm_generate_comment_seconds", "Duration of generating one comment",
+                                     ["result"])
+
+
+def build_prompt(post_text):
+    return PROMPT_PREFIX + post_text + PROMPT_SUFFIX
+
+
+class GenerationError(Exception):
+    """
+    Raised when a comment could not be generated (timeout, API error...).
+    Errors are never returned as comment text, so they can't get posted.
+    """
+
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class GenerationResult:
+    """Outcome of generating one comment: either text or error is set"""
+
+    __slots__ = ("post_text", "text", "error", "cached", "latency")
+
+    def __init__(self, post_text, text=None, error=None, cached=False, latency=0.0):
+        self.post_text = post_text
+        self.text = text
+        self.error = error
+        self.cached = cached
+        self.latency = latency
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class OpenAIBackend:
+    """OpenAI Chat Completions backend sharing one client"""
+
+    def __init__(self, api_key=None, timeout=15.0, max_retries=2):
+        import openai
+        self._openai = openai
+        # The client keeps an HTTP connection pool, so it is created once
+        self.client = openai.OpenAI(
+            api_key=api_key or os.getenv("OPENAI_API_KEY"),
+            timeout=timeout,
+            max_retries=max_retries
         )
-        return response.choices[0].message["content"].strip()
-    except Exception as e:
-        return f"[Error generating comment] {str(e)}"
+
+    def complete(self, prompt, timeout):
+        try:
+            response = self.client.chat.completions.create(
+                model=MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=60,
+                temperature=0.8,
+                timeout=timeout
+            )
+        except (self._openai.APITimeoutError, self._openai.APIConnectionError, self._openai.RateLimitError) as e:
+            raise GenerationError(str(e), retryable=True) from e
+        except self._openai.OpenAIError as e:
+            raise GenerationError(str(e)) from e
+
+        text = (response.choices[0].message.content or "").strip()
+        if not text:
+            raise GenerationError("Empty completion")
+        return text
+
+
+class StubBackend:
+    """Local stand-in model with configurable latency and error rate, for offline benchmarks"""
+
+    def __init__(self, latency=0.3, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def complete(self, prompt, timeout):
+        with self._lock:
+            fail = self._random.random() < self.error_rate
+        if self.latency > timeout:
+            time.sleep(timeout)
+            raise GenerationError("Stub backend timed out", retryable=True)
+        time.sleep(self.latency)
+        if fail:
+            raise GenerationError("Stub backend error", retryable=True)
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:6]
+        return f"Keep going, one step at a time! #{digest} 🧡"
+
+
+class TTLCache:
+    """Size-bounded (LRU) cache whose entries expire after `ttl` seconds"""
+
+    def __init__(self, max_size=1024, ttl=24 * 60 * 60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + self.ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+class CommentGenerator:
+    """
+    Comment generation service with concurrent requests, per-request timeouts
+    and a cache keyed by a hash of the prompt, so identical posts and retries
+    don't pay for a second completion.
+    """
+
+    def __init__(self, backend=None, max_workers=8, timeout=15.0, cache=None):
+        self.backend = backend or create_backend()
+        self.timeout = timeout
+        self.cache = cache or TTLCache()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gpt")
+
+    @staticmethod
+    def _cache_key(prompt):
+        return hashlib.sha256(f"{MODEL}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def generate(self, post_text):
+        """Generate one comment, raising GenerationError on failure"""
+        result = self._generate_result(post_text)
+        if not result.ok:
+            raise result.error
+        return result.text
+
+    def _generate_result(self, post_text):
+        result = self._complete(post_text)
+        GENERATE_SECONDS.observe(result.latency, result="cached" if result.cached else "ok" if result.ok else "error")
+        return result
+
+    def _complete(self, post_text):
+        started = time.perf_counter()
+        prompt = build_prompt(post_text)
+        key = self._cache_key(prompt)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            return GenerationResult(post_text, text=cached, cached=True,
+                                    latency=time.perf_counter() - started)
+
+        try:
+            text = self.backend.complete(prompt, self.timeout)
+        except GenerationError as e:
+            return GenerationResult(post_text, error=e, latency=time.perf_counter() - started)
+
+        self.cache.set(key, text)
+        return GenerationResult(post_text, text=text, latency=time.perf_counter() - started)
+
+    def generate_many(self, post_texts):
+        """Generate comments concurrently, returning GenerationResults in input order"""
+        return list(self._pool.map(self._generate_result, post_texts))
+
+
+def create_backend():
+    """Create the backend named by COMMENT_BACKEND (openai or stub)"""
+    if os.getenv("COMMENT_BACKEND", "openai") == "stub":
+        return StubBackend(latency=float(os.getenv("STUB_LATENCY", 0.3)))
+    return OpenAIBackend(timeout=float(os.getenv("OPENAI_TIMEOUT", 15)))
+
+
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def get_generator():
+    global _generator
+    with _generator_lock:
+        if _generator is None:
+            _generator = CommentGenerator()
+        return _generator
+
+
+def generate_comment(post_text):
+    """Generate a comment for a post, raising GenerationError on failure"""
+    return get_generator().generate(post_text)
@@ -0,0 +1,222 @@
+import gzip
+import heapq
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+
+
+class _NewestFirst:
+    """Heap item ordering archived entries newest first by (timestamp, id)"""
+
+    __slots__ = ("timestamp", "key", "entry")
+
+    def __init__(self, entry):
+        self.timestamp = entry["timestamp"]
+        self.key = (entry["timestamp"], entry["id"])
+        self.entry = entry
+
+    def __lt__(self, other):
+        return self.key > other.key
+
+
+class HistoryArchive:
+    """
+    Append-only archive for history entries evicted from the in-memory window.
+
+    Entries go to one gzip-compressed JSONL segment per day. Each flush
+    appends a new gzip member to the day's segment, and index.json records
+    every member's byte offset, length, entry count and timestamp range,
+    plus per-day status and template counts for analytics. Paging reads and
+    decompresses only the members it needs, newest first. Segments older
+    than `retention_days` are deleted.
+
+    When several processes share the directory only one may write; the
+    others open it `read_only` and call reload() to see new segments.
+    """
+
+    def __init__(self, directory, retention_days=90, batch_size=100, read_only=False):
+        self.directory = directory
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.read_only = read_only
+
+        self._days = {}
+        self._buffer = {}
+        self._buffered = 0
+        self._lock = threading.RLock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        path = os.path.join(self.directory, INDEX_FILE)
+        if not os.path.exists(path):
+            self._days = {}
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._days = json.load(f).get("days", {})
+        except (OSError, ValueError) as e:
+            logger.error("Could not read history archive index %s: %s", path, e)
+
+    def reload(self):
+        """Re-read the index written by the process that owns the archive"""
+        with self._lock:
+            self._load_index()
+
+    def _save_index(self):
+        path = os.path.join(self.directory, INDEX_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "days": self._days}, f)
+        os.replace(tmp_path, path)
+
+    def append(self, entry):
+        """Buffer an evicted entry, writing a segment member once the batch is full"""
+        if self.read_only:
+            return
+        with self._lock:
+            self._buffer.setdefault(entry["timestamp"][:10], []).append(entry)
+            self._buffered += 1
+            if self._buffered >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        """Write buffered entries as one gzip member per day"""
+        with self._lock:
+            if not self._buffered:
+                return
+            for day, entries in self._buffer.items():
+                try:
+                    self._write_member(day, entries)
+                except OSError as e:
+                    logger.error("Could not archive %d history entries for %s: %s", len(entries), day, e)
+            self._buffer = {}
+            self._buffered = 0
+            self._save_index()
+
+    def _write_member(self, day, entries):
+        info = self._days.setdefault(day, {
+            "file": f"history-{day}.jsonl.gz", "members": [], "counts": {}, "templates": {}
+        })
+        entries.sort(key=lambda e: e["timestamp"])
+        lines = "".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries)
+        data = gzip.compress(lines.encode("utf-8"))
+
+        with open(os.path.join(self.directory, info["file"]), "ab") as f:
+            offset = f.tell()
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        info["members"].append([offset, len(data), len(entries), entries[0]["timestamp"], entries[-1]["timestamp"]])
+        for entry in entries:
+            status = entry.get("status")
+            info["counts"][status] = info["counts"].get(status, 0) + 1
+            if entry.get("template_id"):
+                template_counts = info["templates"].setdefault(entry["template_id"], {})
+                template_counts[status] = template_counts.get(status, 0) + 1
+
+    def prune(self, retention_days=None, now=None):
+        """
+        Delete segments older than the retention window, counted back from
+        `now` (the current time by default; pass the store clock's time).
+
+        Returns:
+            Dict of day -> index info for the days that were removed
+        """
+        with self._lock:
+            if retention_days is not None:
+                self.retention_days = retention_days
+            if self.read_only:
+                return {}
+            cutoff = ((now or datetime.now()) - timedelta(days=self.retention_days)).strftime("%Y-%m-%d")
+
+            pruned = {day: info for day, info in self._days.items() if day < cutoff}
+            for day, info in pruned.items():
+                del self._days[day]
+                try:
+                    os.remove(os.path.join(self.directory, info["file"]))
+                except FileNotFoundError:
+                    pass
+            for day in [day for day in self._buffer if day < cutoff]:
+                self._buffered -= len(self._buffer.pop(day))
+
+            if pruned:
+                self._save_index()
+                logger.info("Pruned %d history archive segments older than %s", len(pruned), cutoff)
+            return pruned
+
+    def entry_count(self):
+        with self._lock:
+            return self._buffered + sum(m[2] for info in self._days.values() for m in info["members"])
+
+    def day_counts(self):
+        """Get {day: {status: count}} for archived days"""
+        with self._lock:
+            return {day: dict(info["counts"]) for day, info in self._days.items()}
+
+    def template_counts(self):
+        """Get {template_id: {status: count}} across archived days"""
+        totals = {}
+        with self._lock:
+            for info in self._days.values():
+                for template_id, counts in info["templates"].items():
+                    template_totals = totals.setdefault(template_id, {})
+                    for status, count in counts.items():
+                        template_totals[status] = template_totals.get(status, 0) + count
+        return totals
+
+    def _read_member(self, path, offset, length):
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = gzip.decompress(f.read(length))
+        return [json.loads(line) for line in data.decode("utf-8").splitlines() if line]
+
+    def iter_newest_first(self, before=None, inclusive=False):
+        """
+        Yield archived entries with timestamp < `before` (<= if inclusive),
+        newest first by (timestamp, id), decompressing one segment member at
+        a time.
+        """
+        def included(timestamp):
+            return before is None or timestamp < before or (inclusive and timestamp == before)
+
+        with self._lock:
+            members = sorted(
+                ((last, first, os.path.join(self.directory, info["file"]), offset, length)
+                 for day, info in self._days.items() if before is None or day <= before[:10]
+                 for offset, length, _, first, last in info["members"]),
+                reverse=True
+            )
+            buffered = [e for entries in self._buffer.values() for e in entries]
+
+        # Members can overlap each other and the buffer, so entries are merged
+        # through a heap. Before a member is read, everything newer than its
+        # newest entry is final; ties wait, as the member may hold more of them.
+        heap = [_NewestFirst(e) for e in buffered if included(e["timestamp"])]
+        heapq.heapify(heap)
+        for last, first, path, offset, length in members:
+            if not included(first):
+                continue
+            while heap and heap[0].timestamp > last:
+                yield heapq.heappop(heap).entry
+            try:
+                entries = self._read_member(path, offset, length)
+            except (OSError, ValueError) as e:
+                logger.error("Could not read history archive member in %s: %s", path, e)
+                continue
+            for entry in entries:
+                if included(entry["timestamp"]):
+                    heapq.heappush(heap, _NewestFirst(entry))
+        while heap:
+            yield heapq.heappop(heap).entry
+
+    def close(self):
+        self.flush()
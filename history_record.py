@@ -0,0 +1,275 @@
+import sys
+import threading
+import uuid
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+
+from snapshots import freeze
+
+EPOCH = datetime(1970, 1, 1)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+# Handle of a field the entry doesn't have at all (as opposed to None)
+ABSENT = -1
+
+
+def to_epoch(timestamp):
+    """
+    Convert an ISO timestamp (or YYYY-MM-DD date) to integer microseconds
+    since 1970-01-01. Naive times are taken as they are, so converting back
+    gives the same string; aware times are converted to local time first.
+    """
+    dt = datetime.fromisoformat(timestamp)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return (dt - EPOCH) // ONE_MICROSECOND
+
+
+def from_epoch(micros):
+    return (EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+def entry_epoch(entry):
+    """Epoch microseconds of a HistoryRecord or an archived entry dict"""
+    if isinstance(entry, HistoryRecord):
+        return entry.ts
+    return to_epoch(entry["timestamp"])
+
+
+class Interner:
+    """Maps repeated values (rule and template ids, statuses) to small integer handles and back"""
+
+    def __init__(self, values=()):
+        self._values = []
+        self._handles = {}
+        self._lock = threading.Lock()
+        for value in values:
+            self.handle(value)
+
+    def __len__(self):
+        return len(self._values)
+
+    def handle(self, value):
+        handle = self._handles.get(value)
+        if handle is None:
+            with self._lock:
+                handle = self._handles.get(value)
+                if handle is None:
+                    handle = len(self._values)
+                    self._values.append(value)
+                    self._handles[value] = handle
+        return handle
+
+    def find(self, value):
+        """Get a value's handle without adding it, or None if it was never seen"""
+        return self._handles.get(value)
+
+    def value(self, handle):
+        return self._values[handle]
+
+
+# Rule and template ids share one table; handle 0 is None
+IDS = Interner([None])
+# A small enum of statuses; unknown ones are added as they appear
+STATUSES = Interner(["success", "error", "deleted"])
+SUCCESS = STATUSES.find("success")
+
+_ABSENT = object()
+
+# Fields with their own slot, in the order they are serialized
+FIELDS = ("id", "timestamp", "post_id", "comment_id", "rule_id", "template_id", "content",
+          "status", "error_message", "platform", "engagement", "updated_at")
+_KNOWN = frozenset(FIELDS)
+
+
+def compact_id(entry_id):
+    """16 bytes for a canonical UUID string, the string itself otherwise"""
+    if isinstance(entry_id, str) and len(entry_id) == 36:
+        try:
+            parsed = uuid.UUID(entry_id)
+        except ValueError:
+            return entry_id
+        if str(parsed) == entry_id:
+            return parsed.bytes
+    return entry_id
+
+
+def _handle(interner, entry, key):
+    return interner.handle(entry[key]) if key in entry else ABSENT
+
+
+class HistoryRecord(Mapping):
+    """
+    Read-only, compact form of a comment history entry.
+
+    Timestamps are epoch microseconds, statuses and rule/template ids are
+    integer handles into shared tables, UUID ids are 16 bytes, and the usual
+    {"likes", "replies"} engagement is a pair. It still reads like the entry
+    dict (record["status"], record.get("rule_id"), dict(record)), and
+    to_dict() gives back the exact dict shape for the API and storage.
+    """
+
+    __slots__ = ("key", "ts", "post_id", "comment_id", "rule", "template", "content",
+                 "status_handle", "error_message", "platform", "engagement_data", "updated", "extra")
+
+    def __init__(self, key, ts, post_id=_ABSENT, comment_id=_ABSENT, rule=ABSENT, template=ABSENT,
+                 content=_ABSENT, status_handle=ABSENT, error_message=_ABSENT, platform=_ABSENT,
+                 engagement_data=_ABSENT, updated=ABSENT, extra=None):
+        setattr_ = object.__setattr__
+        setattr_(self, "key", key)
+        setattr_(self, "ts", ts)
+        setattr_(self, "post_id", post_id)
+        setattr_(self, "comment_id", comment_id)
+        setattr_(self, "rule", rule)
+        setattr_(self, "template", template)
+        setattr_(self, "content", content)
+        setattr_(self, "status_handle", status_handle)
+        setattr_(self, "error_message", error_message)
+        setattr_(self, "platform", platform)
+        setattr_(self, "engagement_data", engagement_data)
+        setattr_(self, "updated", updated)
+        setattr_(self, "extra", extra)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("HistoryRecord is read-only")
+
+    @classmethod
+    def from_dict(cls, entry):
+        engagement = entry.get("engagement", _ABSENT)
+        if isinstance(engagement, Mapping) and engagement.keys() == {"likes", "replies"}:
+            engagement = (engagement["likes"], engagement["replies"])
+        elif engagement is not _ABSENT:
+            engagement = freeze(engagement)
+
+        platform = entry.get("platform", _ABSENT)
+        extra = {key: value for key, value in entry.items() if key not in _KNOWN}
+        return cls(
+            key=compact_id(entry["id"]),
+            ts=to_epoch(entry["timestamp"]),
+            post_id=entry.get("post_id", _ABSENT),
+            comment_id=entry.get("comment_id", _ABSENT),
+            rule=_handle(IDS, entry, "rule_id"),
+            template=_handle(IDS, entry, "template_id"),
+            content=entry.get("content", _ABSENT),
+            status_handle=_handle(STATUSES, entry, "status"),
+            error_message=entry.get("error_message", _ABSENT),
+            platform=sys.intern(platform) if isinstance(platform, str) else platform,
+            engagement_data=engagement,
+            updated=to_epoch(entry["updated_at"]) if entry.get("updated_at") else ABSENT,
+            extra=freeze(extra) if extra else None
+        )
+
+    @property
+    def id(self):
+        return str(uuid.UUID(bytes=self.key)) if isinstance(self.key, bytes) else self.key
+
+    @property
+    def timestamp(self):
+        return from_epoch(self.ts)
+
+    @property
+    def rule_id(self):
+        return IDS.value(self.rule) if self.rule != ABSENT else None
+
+    @property
+    def template_id(self):
+        return IDS.value(self.template) if self.template != ABSENT else None
+
+    @property
+    def status(self):
+        return STATUSES.value(self.status_handle) if self.status_handle != ABSENT else None
+
+    @property
+    def engagement(self):
+        if isinstance(self.engagement_data, tuple):
+            return {"likes": self.engagement_data[0], "replies": self.engagement_data[1]}
+        return self.engagement_data
+
+    def _fields(self):
+        """(name, value) for every field the entry has, in dict order"""
+        yield "id", self.id
+        yield "timestamp", self.timestamp
+        for name in ("post_id", "comment_id"):
+            value = getattr(self, name)
+            if value is not _ABSENT:
+                yield name, value
+        if self.rule != ABSENT:
+            yield "rule_id", IDS.value(self.rule)
+        if self.template != ABSENT:
+            yield "template_id", IDS.value(self.template)
+        if self.content is not _ABSENT:
+            yield "content", self.content
+        if self.status_handle != ABSENT:
+            yield "status", STATUSES.value(self.status_handle)
+        for name in ("error_message", "platform"):
+            value = getattr(self, name)
+            if value is not _ABSENT:
+                yield name, value
+        if self.engagement_data is not _ABSENT:
+            yield "engagement", self.engagement
+        if self.updated != ABSENT:
+            yield "updated_at", from_epoch(self.updated)
+        if self.extra:
+            yield from self.extra.items()
+
+    def to_dict(self):
+        """The entry in its original dict shape"""
+        return dict(self._fields())
+
+    def _lookup(self, key):
+        # The hot keys skip building the other fields
+        if key == "id":
+            return self.id
+        if key == "timestamp":
+            return self.timestamp
+        if key == "status":
+            return STATUSES.value(self.status_handle) if self.status_handle != ABSENT else _ABSENT
+        if key == "rule_id":
+            return IDS.value(self.rule) if self.rule != ABSENT else _ABSENT
+        if key == "template_id":
+            return IDS.value(self.template) if self.template != ABSENT else _ABSENT
+        if key == "comment_id":
+            return self.comment_id
+        for name, value in self._fields():
+            if name == key:
+                return value
+        return _ABSENT
+
+    def __getitem__(self, key):
+        value = self._lookup(key)
+        if value is _ABSENT:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        value = self._lookup(key)
+        return default if value is _ABSENT else value
+
+    def __contains__(self, key):
+        return self._lookup(key) is not _ABSENT
+
+    def __iter__(self):
+        for name, _ in self._fields():
+            yield name
+
+    def __len__(self):
+        return sum(1 for _ in self._fields())
+
+    def __eq__(self, other):
+        if isinstance(other, HistoryRecord):
+            return self.to_dict() == other.to_dict()
+        return super().__eq__(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"HistoryRecord({self.to_dict()!r})"
+
+    def replace(self, **changes):
+        """Get an updated copy, e.g. record.replace(status="deleted")"""
+        return HistoryRecord.from_dict(dict(self.to_dict(), **changes))
+
+
+def as_dict(entry):
+    """History entry in its JSON shape, whether a HistoryRecord or an archived dict"""
+    return entry.to_dict() if isinstance(entry, HistoryRecord) else entry
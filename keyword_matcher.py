@@ -0,0 +1,192 @@
+import threading
+import unicodedata
+
+
+def is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over the trigger keywords of every indexed rule.
+
+    One pass over a post finds every keyword it contains, so matching costs
+    O(len(text) + matches) no matter how many rules or keywords there are.
+    Keywords and text are normalized the same way (Unicode normalization,
+    then case folding). Rules can ask for whole-word matches, which reject
+    hits that are glued to other letters or digits; leave it off for Korean,
+    where particles attach directly to the keyword.
+
+    Rules are added and removed individually. Their keywords go straight into
+    the trie and failure links are recomputed once, on the next match.
+    """
+
+    def __init__(self, case_fold=True, normalization="NFKC", word_boundary=False):
+        self.case_fold = case_fold
+        self.normalization = normalization
+        self.word_boundary = word_boundary
+
+        # normalized keyword -> {rule_id: (original keyword, whole_word)}
+        self._patterns = {}
+        # rule_id -> normalized keywords
+        self._rules = {}
+        # Total length of the live keywords, to tell when the trie needs compacting
+        self._live_chars = 0
+
+        self._goto = [{}]
+        self._fail = [0]
+        # Keyword ending at each node, or None
+        self._terminal = [None]
+        # Nearest node on the failure chain that ends a keyword
+        self._output = [0]
+        self._links_dirty = False
+        self._lock = threading.Lock()
+
+    def normalize(self, text):
+        if self.normalization:
+            text = unicodedata.normalize(self.normalization, text)
+        if self.case_fold:
+            text = text.casefold()
+        return text
+
+    def __len__(self):
+        return len(self._patterns)
+
+    def set_rule(self, rule_id, keywords, whole_word=None):
+        """Index (or re-index) a rule's keywords, replacing any previous ones"""
+        if whole_word is None:
+            whole_word = self.word_boundary
+
+        with self._lock:
+            self._remove(rule_id)
+
+            normalized = set()
+            for keyword in keywords or ():
+                key = self.normalize(keyword.strip())
+                if not key or key in normalized:
+                    continue
+                normalized.add(key)
+
+                owners = self._patterns.get(key)
+                if owners is None:
+                    owners = self._patterns[key] = {}
+                    self._live_chars += len(key)
+                    self._insert(key)
+                owners[rule_id] = (keyword, whole_word)
+
+            if normalized:
+                self._rules[rule_id] = normalized
+
+    def remove_rule(self, rule_id):
+        with self._lock:
+            self._remove(rule_id)
+
+    def _remove(self, rule_id):
+        keys = self._rules.pop(rule_id, None)
+        if not keys:
+            return
+        for key in keys:
+            owners = self._patterns[key]
+            owners.pop(rule_id, None)
+            if not owners:
+                # The trie node stays; it is skipped because it has no owners
+                del self._patterns[key]
+                self._live_chars -= len(key)
+
+        # Compact once dead branches outweigh live keywords
+        if len(self._goto) > 64 and len(self._goto) > 4 * (self._live_chars + 1):
+            self._rebuild()
+
+    def _insert(self, key):
+        node = 0
+        for ch in key:
+            child = self._goto[node].get(ch)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][ch] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append(None)
+                self._output.append(0)
+            node = child
+        self._terminal[node] = key
+        self._links_dirty = True
+
+    def _rebuild(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._terminal = [None]
+        self._output = [0]
+        for key in self._patterns:
+            self._insert(key)
+        self._links_dirty = True
+
+    def _build_links(self):
+        """Breadth-first pass setting failure and output links"""
+        goto, fail, terminal, output = self._goto, self._fail, self._terminal, self._output
+        queue = []
+        for child in goto[0].values():
+            fail[child] = 0
+            output[child] = 0
+            queue.append(child)
+
+        for node in queue:
+            for ch, child in goto[node].items():
+                state = fail[node]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                target = goto[state].get(ch, 0)
+                fail[child] = target if target != child else 0
+                output[child] = fail[child] if terminal[fail[child]] is not None else output[fail[child]]
+                queue.append(child)
+
+        self._links_dirty = False
+
+    def matches(self, text):
+        """
+        Find the rules whose keywords occur in `text`.
+
+        Returns:
+            Dict of rule_id -> list of matched keywords (as the rule spelled them)
+        """
+        text = self.normalize(text or "")
+        found = {}
+
+        with self._lock:
+            if not self._patterns:
+                return found
+            if self._links_dirty:
+                self._build_links()
+
+            goto, fail, terminal, output = self._goto, self._fail, self._terminal, self._output
+            patterns = self._patterns
+            node = 0
+            for end, ch in enumerate(text):
+                while node and ch not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(ch, 0)
+
+                hit = node if terminal[node] is not None else output[node]
+                while hit:
+                    key = terminal[hit]
+                    owners = patterns.get(key)
+                    if owners:
+                        start = end - len(key) + 1
+                        bounded = None
+                        for rule_id, (keyword, whole_word) in owners.items():
+                            if whole_word:
+                                if bounded is None:
+                                    bounded = ((start == 0 or not is_word_char(text[start - 1])) and
+                                               (end + 1 == len(text) or not is_word_char(text[end + 1])))
+                                if not bounded:
+                                    continue
+                            matched = found.setdefault(rule_id, [])
+                            if keyword not in matched:
+                                matched.append(keyword)
+                    hit = output[hit]
+
+        return found
+
+    def match(self, text):
+        """Get the set of rule IDs with at least one keyword in `text`"""
+        return set(self.matches(text))
@@ -1,7 +1,6 @@
 from dotenv import load_dotenv
 import os
-import time
-from twitter_bot import fetch_my_recent_tweet
+from twitter_bot import create_scheduler
 
 # 🌿 환경변수 로드
 load_dotenv()
@@ -11,11 +10,6 @@ openai_key = os.getenv("OPENAI_API_KEY")
 twitter_token = os.getenv("TWITTER_BEARER_TOKEN")
 
 if __name__ == "__main__":
-    while True:
-        try:
-            fetch_my_recent_tweet()
-        except Exception as e:
-            print(f"❌ 오류 발생: {e}")
-
-        print("⏳ 15분 대기 중...")
-        time.sleep(900)  # 15분(900초)마다 반복 실행
+    # 계정마다 다음 폴링 시각을 따로 잡는 스케줄러 하나로 실행
+    # (활발한 계정은 자주, 조용한 계정은 점점 드물게)
+    create_scheduler().run_forever()
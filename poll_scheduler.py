@@ -0,0 +1,143 @@
+import heapq
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PollTarget:
+    """Polling state for one watched account"""
+
+    __slots__ = ("username", "interval", "next_poll", "polls", "new_items")
+
+    def __init__(self, username, interval, next_poll):
+        self.username = username
+        self.interval = interval
+        self.next_poll = next_poll
+        self.polls = 0
+        self.new_items = 0
+
+    def to_dict(self, now):
+        return {
+            "username": self.username,
+            "interval": round(self.interval, 1),
+            "next_poll_in": round(max(self.next_poll - now, 0), 1),
+            "polls": self.polls,
+            "new_items": self.new_items
+        }
+
+
+class PollScheduler:
+    """
+    Polls many accounts from one loop using a priority queue of next-poll times.
+
+    Each account's interval adapts: it halves when a poll finds new posts and
+    grows by `backoff` when it doesn't, within [min_interval, max_interval].
+    All accounts share one API request budget. Polls are paced so requests
+    are spread evenly over the budget window instead of bursting.
+
+    The poll callback takes a username and returns (new_items, requests_used).
+    """
+
+    def __init__(self, poll, targets=(), min_interval=60, max_interval=3600,
+                 initial_interval=300, backoff=1.5, request_budget=900, budget_window=900,
+                 jitter=0.1, clock=time.monotonic, sleep=time.sleep):
+        self.poll = poll
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.initial_interval = initial_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.clock = clock
+        self.sleep = sleep
+        # Seconds between requests that keeps us inside the shared budget
+        self.request_spacing = budget_window / request_budget
+
+        self._targets = {}
+        self._heap = []
+        self._next_request = clock()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+        for username in targets:
+            self.add_target(username)
+
+    def add_target(self, username):
+        """Start watching an account, staggered after the existing ones"""
+        with self._lock:
+            if username in self._targets:
+                return
+            # Stagger first polls so a large target list doesn't burst
+            offset = len(self._targets) * self.request_spacing
+            target = PollTarget(username, self.initial_interval, self.clock() + offset)
+            self._targets[username] = target
+            heapq.heappush(self._heap, (target.next_poll, username))
+
+    def remove_target(self, username):
+        with self._lock:
+            # Stale heap entries are skipped when popped
+            self._targets.pop(username, None)
+
+    def _pop_next(self):
+        with self._lock:
+            while self._heap:
+                next_poll, username = heapq.heappop(self._heap)
+                target = self._targets.get(username)
+                # Skip entries for removed accounts
+                if target is not None and target.next_poll == next_poll:
+                    return target
+            return None
+
+    def _reschedule(self, target, new_items, now):
+        if new_items:
+            target.interval = max(self.min_interval, target.interval / 2)
+        else:
+            target.interval = min(self.max_interval, target.interval * self.backoff)
+
+        spread = target.interval * self.jitter
+        target.next_poll = now + target.interval + random.uniform(-spread, spread)
+        target.polls += 1
+        target.new_items += new_items
+        with self._lock:
+            if target.username in self._targets:
+                heapq.heappush(self._heap, (target.next_poll, target.username))
+
+    def run_once(self):
+        """Wait for the next due account, poll it and reschedule it"""
+        target = self._pop_next()
+        if target is None:
+            return False
+
+        wait = max(target.next_poll, self._next_request) - self.clock()
+        if wait > 0:
+            self.sleep(wait)
+
+        if self._stopped.is_set() or target.username not in self._targets:
+            return False
+
+        try:
+            new_items, requests_used = self.poll(target.username)
+        except Exception as e:
+            logger.error("Polling %s failed: %s", target.username, e)
+            new_items, requests_used = 0, 1
+
+        now = self.clock()
+        self._next_request = max(now, self._next_request) + max(requests_used, 1) * self.request_spacing
+        self._reschedule(target, new_items, now)
+        return True
+
+    def run_forever(self):
+        while not self._stopped.is_set():
+            if not self.run_once():
+                self.sleep(self.min_interval)
+
+    def stop(self):
+        self._stopped.set()
+
+    def snapshot(self):
+        now = self.clock()
+        with self._lock:
+            return sorted((t.to_dict(now) for t in self._targets.values()),
+                          key=lambda t: t["next_poll_in"])
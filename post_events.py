@@ -0,0 +1,144 @@
+import json
+import logging
+import os
+import random
+from datetime import datetime
+
+from clock import SYSTEM_CLOCK
+
+logger = logging.getLogger(__name__)
+
+
+class PostEvent:
+    """A post seen by a post source, to be matched against rules"""
+
+    __slots__ = ("post_id", "content", "author", "platform", "source", "created_at")
+
+    def __init__(self, post_id, content, author=None, platform="simulated", source=None, created_at=None,
+                 clock=None):
+        self.post_id = str(post_id)
+        self.content = content or ""
+        self.author = author
+        self.platform = platform
+        self.source = source
+        self.created_at = created_at or (clock or SYSTEM_CLOCK).now().isoformat()
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            post_id=data["post_id"],
+            content=data.get("content", ""),
+            author=data.get("author"),
+            platform=data.get("platform", "simulated"),
+            source=data.get("source"),
+            created_at=data.get("created_at")
+        )
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+SAMPLE_POSTS = [
+    "Can anyone help me set up my first attestation?",
+    "Quick question: how do schema hooks work?",
+    "Just shipped a new feature on SIGN Protocol!",
+    "Day 30 of building in public, still going.",
+    "Looking for feedback on my wallet integration, any help welcome",
+    "오늘도 한 걸음씩 성장 중입니다!"
+]
+
+
+class SimulatedPostSource:
+    """
+    Stand-in for a real platform: each poll finds a new post with the given
+    probability, drawn from SAMPLE_POSTS.
+    """
+
+    def __init__(self, probability=0.3, posts=SAMPLE_POSTS, rng=None, clock=None):
+        self.probability = probability
+        self.posts = posts
+        self.rng = rng or random.Random()
+        self.clock = clock or SYSTEM_CLOCK
+
+    def poll(self):
+        if self.rng.random() >= self.probability:
+            return []
+        return [PostEvent(self.clock.unique_id("post"), self.rng.choice(self.posts), source="simulated",
+                          created_at=self.clock.now().isoformat())]
+
+
+class ReplayPostSource:
+    """
+    Replays post events from a JSONL file, one object per line with at least
+    post_id and content. Each poll returns the next `batch_size` events.
+
+    With a clock, an event is only returned once the clock reaches its
+    created_at, so under a VirtualClock recorded traffic arrives at the pace
+    it was recorded, however fast the simulation runs.
+    """
+
+    def __init__(self, path, batch_size=100, clock=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.clock = clock
+        self._offset = 0
+        # The next event, read but not due yet
+        self._held = None
+
+    def _due(self, event):
+        if self.clock is None:
+            return True
+        try:
+            created_at = datetime.fromisoformat(event.created_at)
+        except (TypeError, ValueError):
+            return True
+        if created_at.tzinfo is not None:
+            created_at = created_at.astimezone().replace(tzinfo=None)
+        return created_at <= self.clock.now()
+
+    def poll(self):
+        events = []
+        if self._held is not None:
+            if not self._due(self._held):
+                return events
+            events.append(self._held)
+            self._held = None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                f.seek(self._offset)
+                while len(events) < self.batch_size:
+                    line = f.readline()
+                    if not line:
+                        break
+                    self._offset = f.tell()
+                    if not line.strip():
+                        continue
+                    try:
+                        event = PostEvent.from_dict(json.loads(line))
+                    except (ValueError, KeyError) as e:
+                        logger.warning("Skipping bad replay line in %s: %s", self.path, e)
+                        continue
+                    event.source = event.source or "replay"
+                    if not self._due(event):
+                        self._held = event
+                        break
+                    events.append(event)
+        except OSError as e:
+            logger.error("Could not read replay file %s: %s", self.path, e)
+        return events
+
+
+def create_post_source(spec, clock=None, rng=None):
+    """
+    Create a post source from a spec string:
+    simulated (default), replay:<path> or twitter.
+    """
+    if not spec or spec == "simulated":
+        return SimulatedPostSource(rng=rng, clock=clock)
+    if spec.startswith("replay:"):
+        return ReplayPostSource(os.path.expanduser(spec[len("replay:"):]))
+    if spec == "twitter":
+        # Needs tweepy and the Twitter credentials from the environment
+        from twitter_bot import TwitterTimelineSource
+        return TwitterTimelineSource()
+    raise ValueError(f"Unknown post source: {spec}")
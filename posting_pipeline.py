@@ -0,0 +1,256 @@
+import logging
+import queue
+import random
+import threading
+from collections import deque
+
+import metrics
+from comment_service import PostError
+
+logger = logging.getLogger(__name__)
+
+STAGE_SECONDS = metrics.histogram("sigm_posting_stage_seconds", "Latency of posting pipeline stages", ["stage"])
+POST_JOBS = metrics.counter("sigm_post_jobs", "Posting pipeline job events", ["event"])
+
+
+class PostJob:
+    """A rendered comment waiting to be posted"""
+
+    __slots__ = ("post_id", "comment_content", "rule_id", "template_id",
+                 "idempotency_key", "attempts", "enqueued_at", "last_error")
+
+    def __init__(self, post_id, comment_content, enqueued_at, rule_id=None, template_id=None,
+                 idempotency_key=None):
+        self.post_id = post_id
+        self.comment_content = comment_content
+        self.rule_id = rule_id
+        self.template_id = template_id
+        self.idempotency_key = idempotency_key or f"{rule_id}:{post_id}"
+        self.attempts = 0
+        self.enqueued_at = enqueued_at
+        self.last_error = None
+
+    def to_dict(self):
+        return {
+            "post_id": self.post_id,
+            "rule_id": self.rule_id,
+            "template_id": self.template_id,
+            "idempotency_key": self.idempotency_key,
+            "attempts": self.attempts,
+            "error_message": self.last_error
+        }
+
+
+class LatencyStats:
+    """Recent latency samples for one pipeline stage"""
+
+    def __init__(self, size=1000):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def summary(self):
+        with self._lock:
+            ordered = sorted(self._samples)
+            count = self.count
+        if not ordered:
+            return {"count": count, "p50": 0.0, "p95": 0.0, "max": 0.0}
+        return {
+            "count": count,
+            "p50": ordered[len(ordered) // 2],
+            "p95": ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)],
+            "max": ordered[-1]
+        }
+
+
+class PostingPipeline:
+    """
+    Bounded queue of post jobs drained by a pool of worker threads.
+
+    Retryable platform errors are retried with exponential backoff and full
+    jitter. Each job carries an idempotency key: a key that already posted is
+    never sent again, and a key can only be worked on by one worker at a time.
+    Jobs that run out of attempts go to a dead-letter list. When the queue is
+    full, submit() blocks, which slows rule evaluation down to the rate the
+    platform accepts comments.
+    """
+
+    def __init__(self, comment_service, workers=4, max_queue=100, max_attempts=4,
+                 base_delay=1.0, max_delay=30.0, dead_letter_size=1000, events=None, clock=None, rng=None):
+        self.comment_service = comment_service
+        # Shares the service's clock, so a VirtualClock drives queue latencies and backoff too
+        self.clock = clock or comment_service.clock
+        self.rng = rng or random.Random()
+        # Optional EventBus for queue depth updates
+        self.events = events
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._dead_letters = deque(maxlen=dead_letter_size)
+        self._posted_keys = {}
+        self._active_keys = set()
+        self._keys_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+        self.latency = {
+            "queue_wait": LatencyStats(),
+            "send": LatencyStats(),
+            "total": LatencyStats()
+        }
+        self.counts = {"submitted": 0, "posted": 0, "retried": 0, "failed": 0, "duplicate": 0}
+        self._counts_lock = threading.Lock()
+
+        self._workers = [
+            threading.Thread(target=self._work, name=f"poster-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _count(self, name):
+        POST_JOBS.inc(event=name)
+        with self._counts_lock:
+            self.counts[name] += 1
+
+    def _observe(self, stage, seconds):
+        STAGE_SECONDS.observe(seconds, stage=stage)
+        self.latency[stage].add(seconds)
+
+    def submit(self, post_id, comment_content, rule_id=None, template_id=None,
+               idempotency_key=None, timeout=None):
+        """
+        Queue a comment for posting, blocking while the queue is full.
+
+        Returns:
+            The queued PostJob
+
+        Raises:
+            queue.Full: If the queue stays full for `timeout` seconds
+        """
+        job = PostJob(post_id, comment_content, self.clock.monotonic(), rule_id, template_id, idempotency_key)
+        self._queue.put(job, timeout=timeout)
+        self._count("submitted")
+        self._publish_depth()
+        return job
+
+    def _publish_depth(self):
+        if self.events is not None:
+            self.events.publish("queue", {"depth": self._queue.qsize(), "capacity": self._queue.maxsize})
+
+    def _work(self):
+        while not self._stopped.is_set():
+            try:
+                job = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            try:
+                self._observe("queue_wait", self.clock.monotonic() - job.enqueued_at)
+                self._process(job)
+            except Exception as e:
+                logger.error("Unexpected error posting job %s: %s", job.idempotency_key, e)
+            finally:
+                self._observe("total", self.clock.monotonic() - job.enqueued_at)
+                self._queue.task_done()
+                self._publish_depth()
+
+    def _claim(self, key):
+        with self._keys_lock:
+            if key in self._posted_keys or key in self._active_keys:
+                return False
+            self._active_keys.add(key)
+            return True
+
+    def _finish(self, key, comment_id=None):
+        with self._keys_lock:
+            self._active_keys.discard(key)
+            if comment_id is not None:
+                self._posted_keys[key] = comment_id
+                # Keep the idempotency record bounded
+                if len(self._posted_keys) > 10000:
+                    self._posted_keys.pop(next(iter(self._posted_keys)))
+
+    def _process(self, job):
+        if not self._claim(job.idempotency_key):
+            logger.info("Skipping duplicate post job %s", job.idempotency_key)
+            self._count("duplicate")
+            return
+
+        comment_id = None
+        try:
+            while True:
+                job.attempts += 1
+                retry_after = None
+                started = self.clock.monotonic()
+                try:
+                    comment_id = self.comment_service.send_comment(
+                        job.post_id, job.comment_content, idempotency_key=job.idempotency_key
+                    )
+                    break
+                except PostError as e:
+                    job.last_error = str(e)
+                    retry_after = e.retry_after
+                    if not e.retryable or job.attempts >= self.max_attempts or self._stopped.is_set():
+                        break
+                finally:
+                    self._observe("send", self.clock.monotonic() - started)
+
+                delay = self._backoff(job.attempts, retry_after)
+                logger.info("Retrying post job %s in %.1fs (attempt %d): %s",
+                            job.idempotency_key, delay, job.attempts, job.last_error)
+                self._count("retried")
+                self.clock.wait(self._stopped, delay)
+        finally:
+            self._finish(job.idempotency_key, comment_id)
+
+        if comment_id is not None:
+            self.comment_service.record_success(job.post_id, comment_id, job.comment_content,
+                                                job.rule_id, job.template_id)
+            self._count("posted")
+        else:
+            self.comment_service.record_failure(job.post_id, job.last_error, job.comment_content,
+                                                job.rule_id, job.template_id)
+            self._dead_letters.append(dict(job.to_dict(), failed_at=self.clock.now().isoformat()))
+            self._count("failed")
+
+    def _backoff(self, attempt, retry_after=None):
+        """Exponential backoff with full jitter, honoring a platform retry-after"""
+        delay = self.rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def dead_letters(self):
+        """Get jobs that failed after all retries, oldest first"""
+        return list(self._dead_letters)
+
+    def stats(self):
+        with self._counts_lock:
+            counts = dict(self.counts)
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "workers": len(self._workers),
+            "dead_letters": len(self._dead_letters),
+            "counts": counts,
+            "latency": {stage: stats.summary() for stage, stats in self.latency.items()}
+        }
+
+    def join(self):
+        """Block until every queued job has been processed"""
+        self._queue.join()
+
+    def stop(self, timeout=5):
+        self._stopped.set()
+        for worker in self._workers:
+            worker.join(timeout)
@@ -0,0 +1,235 @@
+import logging
+import threading
+
+from clock import SYSTEM_CLOCK
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_SCOPE = "global"
+RULE_SCOPE = "rule"
+TARGET_SCOPE = "target"
+PLATFORM_SCOPE = "platform"
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `capacity` tokens per `period` seconds.
+    Not thread-safe on its own; RateLimiter serializes access.
+    """
+
+    def __init__(self, capacity, now, period=3600, tokens=None):
+        self.capacity = capacity
+        self.period = period
+        self.tokens = capacity if tokens is None else min(tokens, capacity)
+        self.updated = now
+        # Set from platform headers: no tokens until this monotonic time
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.capacity / self.period)
+            self.updated = now
+
+    def available(self, now):
+        if now < self.blocked_until:
+            return 0
+        self._refill(now)
+        return self.tokens
+
+    def consume(self, now, amount=1):
+        self._refill(now)
+        self.tokens -= amount
+
+    def refund(self, now, amount=1):
+        self._refill(now)
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def resize(self, capacity, now):
+        """Change the capacity, keeping the tokens already spent"""
+        self._refill(now)
+        spent = self.capacity - self.tokens
+        self.capacity = capacity
+        self.tokens = max(min(capacity - spent, capacity), 0)
+
+
+class RateLimiter:
+    """
+    Scoped comment rate limiter.
+
+    Each post is checked against the global bucket and, when configured, the
+    rule, target account and platform buckets. All scopes are checked and
+    consumed together under one lock, so a post either takes a token from
+    every scope or from none. Acquire is O(1) in the number of past posts.
+    """
+
+    def __init__(self, global_per_hour=10, per_rule_per_hour=None,
+                 per_target_per_hour=None, per_platform_per_hour=None, headroom=1, clock=None):
+        self.limits = {}
+        self.headroom = headroom
+        self.clock = clock or SYSTEM_CLOCK
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.configure(global_per_hour, per_rule_per_hour, per_target_per_hour, per_platform_per_hour)
+
+    def configure(self, global_per_hour, per_rule_per_hour=None,
+                  per_target_per_hour=None, per_platform_per_hour=None):
+        """Update scope limits; existing buckets keep the tokens they have spent"""
+        now = self.clock.monotonic()
+        with self._lock:
+            self.limits = {
+                GLOBAL_SCOPE: global_per_hour,
+                RULE_SCOPE: per_rule_per_hour,
+                TARGET_SCOPE: per_target_per_hour,
+                PLATFORM_SCOPE: dict(per_platform_per_hour or {})
+            }
+            for (scope, key), bucket in list(self._buckets.items()):
+                limit = self._limit_for(scope, key)
+                if limit is None:
+                    if scope != PLATFORM_SCOPE:
+                        del self._buckets[(scope, key)]
+                elif limit != bucket.capacity:
+                    bucket.resize(limit, now)
+
+    def _limit_for(self, scope, key, override=None):
+        if override is not None:
+            return override
+        limit = self.limits.get(scope)
+        if scope == PLATFORM_SCOPE:
+            return (limit or {}).get(key)
+        return limit
+
+    def _bucket(self, scope, key, now, override=None):
+        limit = self._limit_for(scope, key, override)
+        bucket = self._buckets.get((scope, key))
+        if limit is None:
+            # Platform buckets may exist only because the platform sent headers
+            return bucket if scope == PLATFORM_SCOPE else None
+        if bucket is None:
+            bucket = self._buckets[(scope, key)] = TokenBucket(limit, now)
+        elif bucket.capacity != limit:
+            bucket.resize(limit, now)
+        return bucket
+
+    def _scopes(self, rule_id, target, platform, rule_limit):
+        scopes = [(GLOBAL_SCOPE, None, None)]
+        if rule_id is not None:
+            scopes.append((RULE_SCOPE, rule_id, rule_limit))
+        if target is not None:
+            scopes.append((TARGET_SCOPE, target, None))
+        if platform is not None:
+            scopes.append((PLATFORM_SCOPE, platform, None))
+        return scopes
+
+    def try_acquire(self, rule_id=None, target=None, platform=None, rule_limit=None):
+        """
+        Take one token from every applicable scope.
+
+        Args:
+            rule_id: Rule the comment is posted for
+            target: Account whose post is being commented on
+            platform: Platform the comment is posted to
+            rule_limit: Per-rule override of the rule scope limit
+
+        Returns:
+            Tuple of (allowed, limiting_scope)
+        """
+        now = self.clock.monotonic()
+        with self._lock:
+            buckets = []
+            for scope, key, override in self._scopes(rule_id, target, platform, rule_limit):
+                bucket = self._bucket(scope, key, now, override)
+                if bucket is None:
+                    continue
+                if bucket.available(now) < 1:
+                    return False, scope
+                buckets.append(bucket)
+
+            for bucket in buckets:
+                bucket.consume(now)
+            return True, None
+
+    def release(self, rule_id=None, target=None, platform=None, rule_limit=None):
+        """Give back the tokens taken by try_acquire() for a comment that was never posted"""
+        now = self.clock.monotonic()
+        with self._lock:
+            for scope, key, override in self._scopes(rule_id, target, platform, rule_limit):
+                bucket = self._bucket(scope, key, now, override)
+                if bucket is not None:
+                    bucket.refund(now)
+
+    def has_capacity(self):
+        """Check whether the global scope has a token left; an unset global limit is unlimited"""
+        now = self.clock.monotonic()
+        with self._lock:
+            bucket = self._bucket(GLOBAL_SCOPE, None, now)
+            return bucket is None or bucket.available(now) >= 1
+
+    def record_usage(self, count, scope=GLOBAL_SCOPE, key=None):
+        """Charge tokens spent outside the limiter, e.g. history from before a restart"""
+        now = self.clock.monotonic()
+        with self._lock:
+            bucket = self._bucket(scope, key, now)
+            if bucket is not None:
+                bucket.consume(now, count)
+
+    def update_from_headers(self, platform, headers):
+        """
+        Align the platform bucket with the platform's own rate-limit headers.
+
+        Understands x-rate-limit-limit / -remaining / -reset (Twitter) and the
+        x-ratelimit-* and retry-after variants. When the platform reports that
+        fewer than `headroom` requests remain, the platform scope is closed
+        until the reset time so we stop before hitting 429s.
+        """
+        headers = {name.lower(): value for name, value in (headers or {}).items()}
+
+        def header(*names):
+            for name in names:
+                if name in headers:
+                    try:
+                        return float(headers[name])
+                    except (TypeError, ValueError):
+                        return None
+            return None
+
+        limit = header("x-rate-limit-limit", "x-ratelimit-limit")
+        remaining = header("x-rate-limit-remaining", "x-ratelimit-remaining")
+        reset = header("x-rate-limit-reset", "x-ratelimit-reset")
+        retry_after = header("retry-after")
+
+        if reset is not None:
+            # Twitter sends an epoch timestamp, others send seconds to wait
+            reset_in = reset - self.clock.time() if reset > 1e9 else reset
+        else:
+            reset_in = retry_after
+
+        with self._lock:
+            now = self.clock.monotonic()
+            bucket = self._buckets.get((PLATFORM_SCOPE, platform))
+            if bucket is None:
+                capacity = limit or self._limit_for(PLATFORM_SCOPE, platform) or remaining or 1
+                bucket = self._buckets[(PLATFORM_SCOPE, platform)] = TokenBucket(
+                    capacity, now, period=reset_in if reset_in and reset_in > 0 else 3600
+                )
+
+            if remaining is not None:
+                bucket._refill(now)
+                bucket.tokens = min(bucket.tokens, max(remaining - self.headroom, 0))
+            if reset_in is not None and reset_in > 0 and (remaining is None or remaining <= self.headroom):
+                bucket.blocked_until = now + reset_in
+                logger.info("Platform %s rate limit nearly exhausted, pausing for %.0fs", platform, reset_in)
+
+    def snapshot(self):
+        """Get the current token count of every bucket"""
+        now = self.clock.monotonic()
+        with self._lock:
+            return [
+                {
+                    "scope": scope,
+                    "key": key,
+                    "capacity": bucket.capacity,
+                    "available": round(bucket.available(now), 2)
+                }
+                for (scope, key), bucket in self._buckets.items()
+            ]
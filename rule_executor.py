@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from clock import SYSTEM_CLOCK
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENT_RULES = 4
+
+
+class RuleExecutor:
+    """
+    Runs rule handlers on a thread pool with a per-rule in-flight guard.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_CONCURRENT_RULES, clock=None):
+        self.max_workers = max_workers
+        self.clock = clock or SYSTEM_CLOCK
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rule")
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def _resize(self, max_workers):
+        if max_workers == self.max_workers:
+            return
+        old_pool = self._pool
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rule")
+        self.max_workers = max_workers
+        old_pool.shutdown(wait=False)
+
+    def _claim(self, rule_id):
+        with self._lock:
+            if rule_id in self._in_flight:
+                return False
+            self._in_flight.add(rule_id)
+            return True
+
+    def _release(self, rule_id):
+        with self._lock:
+            self._in_flight.discard(rule_id)
+
+    def is_running(self, rule_id):
+        """Check whether a rule is currently being processed"""
+        with self._lock:
+            return rule_id in self._in_flight
+
+    def run(self, rules, handler, max_workers=None, key=None):
+        """
+        Run handler(rule) for each rule concurrently and wait for all of them.
+        Items sharing a key (several posts matching one rule) run one after
+        another on one worker, so a rule never runs twice at once.
+
+        Args:
+            rules: Rules (or rule matches) to process
+            handler: Callable taking a single item
+            max_workers: Concurrency limit for this run
+            key: Callable giving an item's in-flight key, the rule ID by default
+
+        Returns:
+            Dict of timing statistics for the run
+        """
+        if max_workers:
+            self._resize(max(int(max_workers), 1))
+
+        if key is None:
+            key = lambda rule: rule["id"]
+
+        started = time.perf_counter()
+        latencies = {}
+        skipped = []
+
+        def timed(group, rule_key):
+            rule_started = time.perf_counter()
+            try:
+                for rule in group:
+                    try:
+                        handler(rule)
+                    except Exception as e:
+                        logger.error("Unhandled error in rule worker: %s", e)
+            finally:
+                latencies[rule_key] = time.perf_counter() - rule_started
+                self._release(rule_key)
+
+        groups = {}
+        for rule in rules:
+            groups.setdefault(key(rule), []).append(rule)
+
+        futures = []
+        for rule_key, group in groups.items():
+            if not self._claim(rule_key):
+                logger.debug("Rule %s is already running, skipping", rule_key)
+                skipped.append(rule_key)
+                continue
+            futures.append(self._pool.submit(timed, group, rule_key))
+
+        wait(futures)
+
+        return self._summarize(started, latencies, skipped)
+
+    def _summarize(self, started, latencies, skipped):
+        ordered = sorted(latencies.values())
+
+        def percentile(p):
+            if not ordered:
+                return 0.0
+            return ordered[min(int(len(ordered) * p), len(ordered) - 1)]
+
+        slowest = sorted(latencies.items(), key=lambda item: item[1], reverse=True)[:5]
+        return {
+            "finished_at": self.clock.now().isoformat(),
+            "duration": time.perf_counter() - started,
+            "concurrency": self.max_workers,
+            "rules_processed": len(latencies),
+            "rules_skipped": len(skipped),
+            "rule_latency": {
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": ordered[-1] if ordered else 0.0
+            },
+            "slowest_rules": [{"rule_id": rule_id, "duration": duration} for rule_id, duration in slowest]
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
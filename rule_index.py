@@ -0,0 +1,108 @@
+from keyword_matcher import KeywordMatcher
+
+# Trigger types fired by incoming posts; the rest run on a schedule
+EVENT_TRIGGERS = ("new_post", "keyword")
+
+
+def normalize_account(account):
+    return account.strip().lstrip("@").casefold() if account else None
+
+
+class RuleMatch:
+    """A rule to run, with the post event and keywords that selected it"""
+
+    __slots__ = ("rule", "event", "keywords")
+
+    def __init__(self, rule, event=None, keywords=()):
+        self.rule = rule
+        self.event = event
+        self.keywords = list(keywords)
+
+    @property
+    def key(self):
+        """In-flight key: a rule runs once at a time, whichever post it matched"""
+        return self.rule["id"]
+
+
+class RuleIndex:
+    """
+    Index over enabled rules by trigger type, keyword and target account,
+    used to route each post event straight to the rules it matches.
+
+    Event rules without keywords match every post; rules without a target
+    account match posts from any author. The index is updated one rule at a
+    time and is not thread-safe on its own: DataStore serializes access.
+    """
+
+    def __init__(self):
+        self.keywords = KeywordMatcher()
+        self._by_trigger = {}
+        # Event rule IDs that match any post content
+        self._unkeyed = set()
+        self._by_target = {}
+        self._any_target = set()
+        # rule_id -> (trigger_type, target account)
+        self._rules = {}
+
+    def __len__(self):
+        return len(self._rules)
+
+    def set_rule(self, rule):
+        """Index (or re-index) a rule; disabled rules are dropped"""
+        rule_id = rule["id"]
+        self.remove_rule(rule_id)
+        if not rule.get("enabled", True):
+            return
+
+        trigger_type = rule.get("trigger_type", "manual")
+        target = normalize_account(rule.get("target_account"))
+        self._rules[rule_id] = (trigger_type, target)
+        self._by_trigger.setdefault(trigger_type, set()).add(rule_id)
+
+        if trigger_type not in EVENT_TRIGGERS:
+            return
+
+        if rule.get("trigger_keywords"):
+            self.keywords.set_rule(rule_id, rule["trigger_keywords"], whole_word=rule.get("keyword_whole_word"))
+        else:
+            self._unkeyed.add(rule_id)
+
+        if target:
+            self._by_target.setdefault(target, set()).add(rule_id)
+        else:
+            self._any_target.add(rule_id)
+
+    def remove_rule(self, rule_id):
+        entry = self._rules.pop(rule_id, None)
+        if entry is None:
+            return
+        trigger_type, target = entry
+
+        self._by_trigger[trigger_type].discard(rule_id)
+        self.keywords.remove_rule(rule_id)
+        self._unkeyed.discard(rule_id)
+        self._any_target.discard(rule_id)
+        if target in self._by_target:
+            self._by_target[target].discard(rule_id)
+            if not self._by_target[target]:
+                del self._by_target[target]
+
+    def rules_for_trigger(self, trigger_type):
+        return set(self._by_trigger.get(trigger_type, ()))
+
+    def dispatch(self, event):
+        """
+        Find the rules a post event should trigger, in one keyword pass.
+
+        Returns:
+            Dict of rule_id -> matched keywords (empty for rules without keywords)
+        """
+        matched = self.keywords.matches(event.content)
+        for rule_id in self._unkeyed:
+            matched.setdefault(rule_id, [])
+
+        author_rules = self._by_target.get(normalize_account(event.author), ())
+        return {
+            rule_id: keywords for rule_id, keywords in matched.items()
+            if rule_id in self._any_target or rule_id in author_rules
+        }
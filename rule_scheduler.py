@@ -0,0 +1,279 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Scheduled rules without a cron expression fire this often (the old tick)
+DEFAULT_SCHEDULE_INTERVAL = 5 * 60
+
+CRON_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *"
+}
+
+# (low, high) for minute, hour, day of month, month, day of week
+CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+class CronError(ValueError):
+    """Raised for a malformed or unsatisfiable cron expression"""
+
+
+class CronExpression:
+    """
+    Five-field cron expression (minute hour day-of-month month day-of-week)
+    supporting *, lists, ranges and steps, plus @hourly/@daily/@weekly/@monthly.
+    Day of week 0 and 7 are Sunday. As in cron, when both day fields are
+    restricted a day matching either one matches.
+    """
+
+    def __init__(self, expression):
+        self.expression = expression.strip()
+        fields = CRON_ALIASES.get(self.expression, self.expression).split()
+        if len(fields) != 5:
+            raise CronError(f"Cron expression needs 5 fields: {expression!r}")
+
+        parsed = [self._parse_field(field, low, high) for field, (low, high) in zip(fields, CRON_FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {day % 7 for day in weekdays}
+        self.days_restricted = fields[2] != "*"
+        self.weekdays_restricted = fields[4] != "*"
+
+    @staticmethod
+    def _parse_field(field, low, high):
+        values = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step_text = part.split("/", 1)
+                if not step_text.isdigit() or int(step_text) == 0:
+                    raise CronError(f"Invalid cron step: {field!r}")
+                step = int(step_text)
+
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start_text, end_text = part.split("-", 1)
+                if not (start_text.isdigit() and end_text.isdigit()):
+                    raise CronError(f"Invalid cron range: {field!r}")
+                start, end = int(start_text), int(end_text)
+            elif part.isdigit():
+                start = int(part)
+                end = high if step > 1 else start
+            else:
+                raise CronError(f"Invalid cron field: {field!r}")
+
+            if start < low or end > high or start > end:
+                raise CronError(f"Cron field out of range {low}-{high}: {field!r}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, dt):
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.weekday() + 1) % 7 in self.weekdays
+        if self.days_restricted and self.weekdays_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, dt):
+        """Get the first matching minute strictly after `dt`"""
+        dt = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 5)
+
+        while dt < limit:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+            elif dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt
+
+        raise CronError(f"Cron expression never matches: {self.expression!r}")
+
+
+class RuleScheduler:
+    """
+    Next-eligible times for rules, and a timer thread for scheduled rules.
+
+    Cooldowns are kept as a per-rule "eligible again at" timestamp, so
+    checking a rule is a dict lookup instead of a history scan. Scheduled
+    rules sit in a heap ordered by their next fire time (from the rule's
+    cron `schedule`, or every DEFAULT_SCHEDULE_INTERVAL seconds); the timer
+    thread sleeps until the earliest one is due and hands due rule IDs to
+    `callback`. Times are Unix timestamps.
+    """
+
+    def __init__(self, callback=None, clock=time.time, max_sleep=60):
+        self.callback = callback
+        self.clock = clock
+        # Wake up at least this often so wall clock jumps are noticed
+        self.max_sleep = max_sleep
+
+        self._eligible_at = {}
+        self._cooldowns = {}
+        self._heap = []
+        # rule_id -> (next fire time, CronExpression or None)
+        self._scheduled = {}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    # Cooldowns
+
+    def set_cooldown(self, rule_id, cooldown_minutes):
+        with self._condition:
+            self._cooldowns[rule_id] = max(cooldown_minutes or 0, 0) * 60
+
+    def record_fired(self, rule_id, fired_at):
+        """Start a rule's cooldown from a comment made at `fired_at`"""
+        with self._condition:
+            eligible_at = fired_at + self._cooldowns.get(rule_id, 0)
+            if eligible_at > self._eligible_at.get(rule_id, 0):
+                self._eligible_at[rule_id] = eligible_at
+
+    def is_eligible(self, rule_id, now=None):
+        now = self.clock() if now is None else now
+        return self._eligible_at.get(rule_id, 0) <= now
+
+    def cooldown_remaining(self, rule_id, now=None):
+        now = self.clock() if now is None else now
+        return max(self._eligible_at.get(rule_id, 0) - now, 0)
+
+    def claim(self, rule_id, now=None):
+        """
+        Atomically check a rule's cooldown and start a new one.
+
+        Returns:
+            The previous eligible time (pass it to release() if the comment
+            isn't made after all), or None if the rule is on cooldown
+        """
+        now = self.clock() if now is None else now
+        with self._condition:
+            previous = self._eligible_at.get(rule_id, 0)
+            if previous > now:
+                return None
+            self._eligible_at[rule_id] = now + self._cooldowns.get(rule_id, 0)
+            return previous
+
+    def release(self, rule_id, previous):
+        """Undo a claim whose comment wasn't made"""
+        with self._condition:
+            if previous:
+                self._eligible_at[rule_id] = previous
+            else:
+                self._eligible_at.pop(rule_id, None)
+
+    # Scheduled rules
+
+    def set_rule(self, rule):
+        """Track a rule's cooldown and, for enabled scheduled rules, its next fire time"""
+        rule_id = rule["id"]
+        self.set_cooldown(rule_id, rule.get("cooldown_minutes", 60))
+
+        if rule.get("trigger_type") != "scheduled" or not rule.get("enabled", True):
+            self.remove_rule(rule_id, keep_cooldown=True)
+            return
+
+        cron = CronExpression(rule["schedule"]) if rule.get("schedule") else None
+        with self._condition:
+            current = self._scheduled.get(rule_id)
+            if current is not None and (current[1] and current[1].expression) == (cron and cron.expression):
+                return
+            self._push(rule_id, cron, self.clock())
+            self._condition.notify()
+
+    def remove_rule(self, rule_id, keep_cooldown=False):
+        with self._condition:
+            # Heap entries for removed rules are skipped when popped
+            self._scheduled.pop(rule_id, None)
+            if not keep_cooldown:
+                self._cooldowns.pop(rule_id, None)
+                self._eligible_at.pop(rule_id, None)
+
+    def _push(self, rule_id, cron, after):
+        if cron is not None:
+            due = cron.next_after(datetime.fromtimestamp(after)).timestamp()
+        else:
+            due = max(after + DEFAULT_SCHEDULE_INTERVAL, self._eligible_at.get(rule_id, 0))
+            if rule_id not in self._scheduled:
+                # A new interval rule fires as soon as its cooldown allows
+                due = max(after, self._eligible_at.get(rule_id, 0))
+        self._scheduled[rule_id] = (due, cron)
+        heapq.heappush(self._heap, (due, rule_id))
+
+    def pop_due(self, now=None):
+        """Pop the rules that are due and schedule their next runs"""
+        now = self.clock() if now is None else now
+        due_rules = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                due, rule_id = heapq.heappop(self._heap)
+                entry = self._scheduled.get(rule_id)
+                if entry is None or entry[0] != due:
+                    continue
+                due_rules.append(rule_id)
+                self._push(rule_id, entry[1], now)
+        return due_rules
+
+    def next_due(self):
+        """Get the earliest live fire time, or None"""
+        with self._condition:
+            while self._heap:
+                due, rule_id = self._heap[0]
+                entry = self._scheduled.get(rule_id)
+                if entry is not None and entry[0] == due:
+                    return due
+                heapq.heappop(self._heap)
+            return None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if self._stopped:
+                    return
+                next_due = self.next_due()
+                wait = self.max_sleep if next_due is None else next_due - self.clock()
+                if wait > 0:
+                    self._condition.wait(min(wait, self.max_sleep))
+                    continue
+
+            due_rules = self.pop_due()
+            if due_rules and self.callback:
+                try:
+                    self.callback(due_rules)
+                except Exception as e:
+                    logger.error("Error running scheduled rules: %s", e)
+
+    def start(self):
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="rule-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+
+    def snapshot(self):
+        now = self.clock()
+        with self._condition:
+            return {
+                "scheduled_rules": len(self._scheduled),
+                "next_due_in": max(self.next_due() - now, 0) if self._scheduled else None,
+                "rules_on_cooldown": sum(1 for eligible_at in self._eligible_at.values() if eligible_at > now)
+            }
@@ -0,0 +1,160 @@
+import gzip
+import json
+import threading
+from collections import OrderedDict
+
+from flask.json.provider import DefaultJSONProvider
+
+import metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this go out uncompressed; the headers would eat the savings
+MIN_COMPRESS_SIZE = 1024
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/html", "text/plain", "text/css",
+                      "application/javascript")
+
+COMPRESSORS = {"gzip": lambda data: gzip.compress(data, compresslevel=6, mtime=0)}
+if brotli is not None:
+    COMPRESSORS["br"] = lambda data: brotli.compress(data, quality=5)
+# Preferred first when the client accepts several equally
+ENCODING_PREFERENCE = ("br", "gzip")
+
+CACHE_LOOKUPS = metrics.counter("sigm_response_cache_lookups", "Encoded response cache lookups", ["result"])
+
+
+def dumps(value, default=None):
+    """Encode a value as compact UTF-8 JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(value, default=default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider encoding with dumps() above. Responses are built
+    from the encoded bytes directly, compact and without sorting keys, so
+    dict order (e.g. of history fields) is kept. Calls with extra options,
+    like the templates' tojson filter, use Flask's default encoder.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj, default=self.default).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj, default=self.default), mimetype=self.mimetype)
+
+
+def negotiate_encoding(accept_encodings):
+    """
+    Pick a supported content coding from a werkzeug Accept-Encoding header
+
+    Returns:
+        "br", "gzip" or None for identity
+    """
+    best, best_quality = None, 0
+    for encoding in ENCODING_PREFERENCE:
+        if encoding not in COMPRESSORS:
+            continue
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding):
+    """Compress a body, or return None if it is too small to be worth it"""
+    if len(data) < MIN_COMPRESS_SIZE:
+        return None
+    return COMPRESSORS[encoding](data)
+
+
+class EncodedBody:
+    """
+    The JSON bytes of one response and its compressed forms, each made on
+    first request and then reused for as long as the body is cached.
+    """
+
+    __slots__ = ("data", "_compressed", "_lock")
+
+    def __init__(self, data):
+        self.data = data
+        self._compressed = {}
+        self._lock = threading.Lock()
+
+    def compressed(self, encoding):
+        """The body compressed with `encoding`, or None if it is too small to compress"""
+        try:
+            return self._compressed[encoding]
+        except KeyError:
+            pass
+        with self._lock:
+            if encoding not in self._compressed:
+                self._compressed[encoding] = compress(self.data, encoding)
+            return self._compressed[encoding]
+
+
+class ResponseCache:
+    """
+    Encoded response bodies keyed by request and the version of the data
+    they were built from. While the version stays the same, repeated
+    requests skip building, encoding and compressing the response; a new
+    version replaces the entry. The least recently used keys are dropped
+    beyond `max_entries`.
+
+    Read the version before building the body: the body may then be newer
+    than its version, never older, so a stale body is never served.
+    """
+
+    def __init__(self, max_entries=256, default=None):
+        self.max_entries = max_entries
+        self.default = default
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version, build):
+        """Get the encoded body for `key` at `version`, calling build() to make it on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                CACHE_LOOKUPS.inc(result="hit")
+                return entry[1]
+
+        CACHE_LOOKUPS.inc(result="miss")
+        body = EncodedBody(dumps(build(), default=self.default))
+        with self._lock:
+            self._entries[key] = (version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
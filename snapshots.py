@@ -0,0 +1,67 @@
+class FrozenDict(dict):
+    """
+    A dict that can't be changed after it is built. It is still a dict, so
+    it serializes to JSON and renders in templates as before; dict(frozen)
+    gives a mutable copy to build the next version from.
+    """
+
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+
+def freeze(value):
+    """Recursively turn dicts into FrozenDicts and lists into tuples"""
+    if isinstance(value, FrozenDict):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class ConfigSnapshot:
+    """
+    One immutable version of the templates, rules and settings. Writers
+    build the next version and swap it in; readers keep whichever version
+    they got, consistent and without taking a lock.
+    """
+
+    __slots__ = ("version", "templates", "rules", "settings", "template_list", "rule_list")
+
+    def __init__(self, version, templates, rules, settings):
+        self.version = version
+        # Parts carried over by replace() are already frozen and are shared
+        self.templates = templates if isinstance(templates, FrozenDict) else FrozenDict(templates)
+        self.rules = rules if isinstance(rules, FrozenDict) else FrozenDict(rules)
+        self.settings = freeze(settings)
+        self.template_list = tuple(self.templates.values())
+        self.rule_list = tuple(self.rules.values())
+
+    def replace(self, templates=None, rules=None, settings=None):
+        """Build the next version with some parts replaced"""
+        return ConfigSnapshot(
+            self.version + 1,
+            self.templates if templates is None else templates,
+            self.rules if rules is None else rules,
+            self.settings if settings is None else settings
+        )
+
+
+class HistoryStats:
+    """Rollup counters and totals as of one history version"""
+
+    __slots__ = ("version", "rollup", "total_comments")
+
+    def __init__(self, version, rollup, total_comments):
+        self.version = version
+        self.rollup = rollup
+        self.total_comments = total_comments
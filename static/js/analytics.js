@@ -1,32 +1,66 @@
 let analyticsData = null;
 let commentHistory = [];
+let historyCursor = null;
+
+// Fields the history list renders; the API returns only these
+const HISTORY_FIELDS = 'id,timestamp,status,rule_id,template_id,content,post_id,platform,error_message,engagement';
+const HISTORY_PAGE_SIZE = 50;
 let templates = {};
 let rules = {};
+let activityChart = null;
+let templateChart = null;
 
 document.addEventListener('DOMContentLoaded', function() {
     // Initialize event listeners
     document.getElementById('status-filter').addEventListener('change', filterHistory);
+    document.getElementById('window-filter').addEventListener('change', changeWindow);
+    document.getElementById('load-more-history').addEventListener('click', loadMoreHistory);
     
     // Load data
     loadData();
+    
+    // New and changed history entries are pushed by the server
+    subscribeLive({
+        history: applyHistoryChange,
+        lagged: filterHistory
+    });
 });
 
+// Apply a pushed history change to the loaded page
+function applyHistoryChange(change) {
+    if (change.action === 'reload') {
+        filterHistory();
+        return;
+    }
+    
+    const entry = change.entry;
+    const statusFilter = document.getElementById('status-filter').value;
+    const index = commentHistory.findIndex(comment => comment.id === entry.id);
+    
+    if (change.action === 'added') {
+        if (statusFilter !== 'all' && entry.status !== statusFilter) {
+            return;
+        }
+        commentHistory.unshift(entry);
+    } else if (change.action === 'updated' && index !== -1) {
+        commentHistory[index] = entry;
+    } else if (change.action === 'deleted' && index !== -1) {
+        commentHistory.splice(index, 1);
+    } else {
+        return;
+    }
+    
+    renderCommentHistory();
+}
+
 // Load all necessary data
 async function loadData() {
     try {
         // Load analytics data
-        const analyticsResponse = await fetch('/api/analytics');
-        if (!analyticsResponse.ok) {
-            throw new Error('Failed to fetch analytics data');
-        }
-        analyticsData = await analyticsResponse.json();
+        await loadAnalytics();
         
-        // Load comment history
-        const historyResponse = await fetch('/api/history');
-        if (!historyResponse.ok) {
-            throw new Error('Failed to fetch comment history');
-        }
-        commentHistory = await historyResponse.json();
+        // Load the first page of comment history
+        await loadHistory(false);
         
         // Load templates
         const templatesResponse = await fetch('/api/templates');
@@ -57,18 +91,75 @@ async function loadData() {
     }
 }
 
+// Load a page of comment history, filtered on the server
+async function loadHistory(append) {
+    const params = new URLSearchParams({ limit: HISTORY_PAGE_SIZE, fields: HISTORY_FIELDS });
+    const statusFilter = document.getElementById('status-filter').value;
+    if (statusFilter !== 'all') {
+        params.set('status', statusFilter);
+    }
+    if (append && historyCursor) {
+        params.set('cursor', historyCursor);
+    }
+    
+    const historyResponse = await fetch(`/api/history?${params}`);
+    if (!historyResponse.ok) {
+        throw new Error('Failed to fetch comment history');
+    }
+    const page = await historyResponse.json();
+    
+    commentHistory = append ? commentHistory.concat(page.items) : page.items;
+    historyCursor = page.next_cursor;
+    document.getElementById('load-more-history').classList.toggle('d-none', !historyCursor);
+}
+
+// Load the next page of comment history
+async function loadMoreHistory() {
+    try {
+        await loadHistory(true);
+        renderCommentHistory();
+    } catch (error) {
+        console.error('Error loading history:', error);
+        showErrorMessage('Failed to load history: ' + error.message);
+    }
+}
+
+// Load analytics data for the selected window
+async function loadAnalytics() {
+    const days = document.getElementById('window-filter').value;
+    const analyticsResponse = await fetch(`/api/analytics?days=${days}`);
+    if (!analyticsResponse.ok) {
+        throw new Error('Failed to fetch analytics data');
+    }
+    analyticsData = await analyticsResponse.json();
+}
+
+// Reload analytics when the window changes
+async function changeWindow() {
+    try {
+        await loadAnalytics();
+        initializeCharts();
+    } catch (error) {
+        console.error('Error loading analytics:', error);
+        showErrorMessage('Failed to load analytics: ' + error.message);
+    }
+}
+
 // Initialize charts with analytics data
 function initializeCharts() {
     if (!analyticsData) return;
     
-    // Activity chart - last 7 days
+    if (activityChart) activityChart.destroy();
+    if (templateChart) templateChart.destroy();
+    
+    // Activity chart - selected window
     const activityCtx = document.getElementById('activityChart').getContext('2d');
     const dailyCounts = analyticsData.daily_counts || [];
     
     // Reverse the data to show chronological order
     const reversedCounts = [...dailyCounts].reverse();
     
-    new Chart(activityCtx, {
+    activityChart = new Chart(activityCtx, {
         type: 'bar',
         data: {
             labels: reversedCounts.map(day => day.date),
@@ -114,7 +205,7 @@ function initializeCharts() {
     // Only show top 5 templates
     const topTemplates = templateStats.slice(0, 5);
     
-    new Chart(templateCtx, {
+    templateChart = new Chart(templateCtx, {
         type: 'doughnut',
         data: {
             labels: topTemplates.map(t => t.name),
@@ -145,13 +236,9 @@ function initializeCharts() {
 // Render comment history
 function renderCommentHistory() {
     const container = document.getElementById('history-container');
-    const statusFilter = document.getElementById('status-filter').value;
     
-    // Filter comments based on status if needed
-    let filteredHistory = commentHistory;
-    if (statusFilter !== 'all') {
-        filteredHistory = commentHistory.filter(comment => comment.status === statusFilter);
-    }
+    // The status filter is applied by the server
+    const filteredHistory = commentHistory;
     
     if (filteredHistory.length === 0) {
         container.innerHTML = `
@@ -218,8 +305,14 @@ function renderCommentHistory() {
 }
 
 // Filter comment history based on status
-function filterHistory() {
-    renderCommentHistory();
+async function filterHistory() {
+    try {
+        await loadHistory(false);
+        renderCommentHistory();
+    } catch (error) {
+        console.error('Error loading history:', error);
+        showErrorMessage('Failed to load history: ' + error.message);
+    }
 }
 
 // Show error message
@@ -0,0 +1,21 @@
+/**
+ * Live updates pushed by the server over /api/stream (Server-Sent Events)
+ */
+
+// Subscribe to event topics, e.g. subscribeLive({stats: data => ..., lagged: () => ...}).
+// A "lagged" event means updates were dropped and the page should reload its data.
+function subscribeLive(handlers) {
+    if (!window.EventSource) {
+        return null;
+    }
+    
+    const topics = Object.keys(handlers).filter(topic => topic !== 'lagged').join(',');
+    const source = new EventSource(`/api/stream?topics=${encodeURIComponent(topics)}`);
+    
+    Object.entries(handlers).forEach(([topic, handler]) => {
+        source.addEventListener(topic, event => handler(JSON.parse(event.data)));
+    });
+    
+    window.addEventListener('beforeunload', () => source.close());
+    return source;
+}
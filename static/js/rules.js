@@ -147,12 +147,15 @@ function showNewRuleModal() {
     document.getElementById('template-id').value = '';
     document.getElementById('trigger-type').value = '';
     document.getElementById('trigger-keywords').value = '';
+    document.getElementById('keyword-whole-word').checked = false;
+    document.getElementById('rule-schedule').value = '';
     document.getElementById('cooldown-minutes').value = '60';
     document.getElementById('rule-enabled').checked = true;
     document.getElementById('ruleModalLabel').textContent = 'New Rule';
     
     // Reset conditional fields
     document.getElementById('keywords-container').classList.add('d-none');
+    document.getElementById('schedule-container').classList.add('d-none');
     document.getElementById('template-variables-container').classList.add('d-none');
     document.getElementById('variable-fields').innerHTML = '';
     
@@ -179,10 +182,18 @@ function editRule(ruleId) {
     if (rule.trigger_type === 'keyword' || rule.trigger_type === 'new_post') {
         document.getElementById('keywords-container').classList.remove('d-none');
         document.getElementById('trigger-keywords').value = (rule.trigger_keywords || []).join(', ');
+        document.getElementById('keyword-whole-word').checked = !!rule.keyword_whole_word;
     } else {
         document.getElementById('keywords-container').classList.add('d-none');
     }
     
+    if (rule.trigger_type === 'scheduled') {
+        document.getElementById('schedule-container').classList.remove('d-none');
+        document.getElementById('rule-schedule').value = rule.schedule || '';
+    } else {
+        document.getElementById('schedule-container').classList.add('d-none');
+    }
+    
     // Load template variables
     updateTemplateVariables();
     
@@ -209,6 +220,12 @@ function updateFormFields() {
     } else {
         document.getElementById('keywords-container').classList.add('d-none');
     }
+    
+    if (triggerType === 'scheduled') {
+        document.getElementById('schedule-container').classList.remove('d-none');
+    } else {
+        document.getElementById('schedule-container').classList.add('d-none');
+    }
 }
 
 // Update template variables form fields
@@ -284,6 +301,8 @@ async function saveRule() {
         template_id: templateId,
         trigger_type: triggerType,
         trigger_keywords: triggerKeywords,
+        keyword_whole_word: document.getElementById('keyword-whole-word').checked,
+        schedule: triggerType === 'scheduled' ? document.getElementById('rule-schedule').value.trim() : '',
         variable_values: variableValues,
         cooldown_minutes: cooldownMinutes,
         enabled
@@ -313,7 +332,8 @@ async function saveRule() {
         }
         
         if (!response.ok) {
-            throw new Error('Failed to save rule');
+            const error = await response.json().catch(() => ({}));
+            throw new Error(error.message || 'Failed to save rule');
         }
         
         const result = await response.json();
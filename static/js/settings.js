@@ -7,11 +7,15 @@ document.addEventListener('DOMContentLoaded', function() {
     // Load settings
     loadSettings();
     
-    // Update run times
+    // Load run times, and reload them whenever a bot run finishes
     updateRunTimes();
-    
-    // Update run times every minute
-    setInterval(updateRunTimes, 60000);
+    subscribeLive({
+        tick: data => {
+            if (data.phase === 'end') {
+                updateRunTimes();
+            }
+        }
+    });
 });
 
 // Load settings from API
@@ -27,6 +31,9 @@ async function loadSettings() {
         // Update form values
         document.getElementById('bot-enabled').checked = settings.enabled;
         document.getElementById('max-comments').value = settings.max_comments_per_hour;
+        document.getElementById('max-concurrent-rules').value = settings.max_concurrent_rules || 4;
+        document.getElementById('history-hot-size').value = settings.history_hot_size || 1000;
+        document.getElementById('history-archive-days').value = settings.history_archive_days || 90;
         document.getElementById('notification-email').value = settings.notification_email || '';
         document.getElementById('error-notification').checked = settings.error_notification;
     } catch (error) {
@@ -40,11 +47,27 @@ async function saveSettings() {
     // Collect form values
     const updatedSettings = {
         enabled: document.getElementById('bot-enabled').checked,
-        max_comments_per_hour: parseInt(document.getElementById('max-comments').value, 10),
         notification_email: document.getElementById('notification-email').value,
         error_notification: document.getElementById('error-notification').checked
     };
     
+    // An empty number field parses to NaN, which would be sent as null
+    const numberFields = {
+        max_comments_per_hour: 'max-comments',
+        max_concurrent_rules: 'max-concurrent-rules',
+        history_hot_size: 'history-hot-size',
+        history_archive_days: 'history-archive-days'
+    };
+    for (const [name, id] of Object.entries(numberFields)) {
+        const value = parseInt(document.getElementById(id).value, 10);
+        if (Number.isNaN(value)) {
+            const label = document.querySelector(`label[for="${id}"]`).textContent;
+            showErrorMessage(`${label} must be a number`);
+            return;
+        }
+        updatedSettings[name] = value;
+    }
+    
     try {
         const saveButton = document.getElementById('save-settings-btn');
         saveButton.disabled = true;
@@ -58,17 +81,13 @@ async function saveSettings() {
             body: JSON.stringify(updatedSettings)
         });
         
-        if (!response.ok) {
-            throw new Error('Failed to save settings');
-        }
+        const result = await response.json().catch(() => ({}));
         
-        const result = await response.json();
-        
-        if (result.success) {
+        if (response.ok && result.success) {
             settings = updatedSettings;
             showSuccessMessage('Settings saved successfully');
         } else {
-            showErrorMessage('Failed to save settings');
+            showErrorMessage('Failed to save settings' + (result.message ? ': ' + result.message : ''));
         }
     } catch (error) {
         console.error('Error saving settings:', error);
@@ -81,22 +100,24 @@ async function saveSettings() {
 }
 
 // Update last run and next run times
-function updateRunTimes() {
-    // For demo purposes, we'll simulate the last run and next run times
-    // In a real application, this would be fetched from the server
-    
-    const now = new Date();
-    
-    // Simulate last run time (between 0 and 5 minutes ago)
-    const lastRunMinutesAgo = now.getMinutes() % 5;
-    const lastRun = new Date(now.getTime() - lastRunMinutesAgo * 60000);
-    
-    // Next run will be in (5 - lastRunMinutesAgo) minutes
-    const nextRunMinutesFromNow = 5 - lastRunMinutesAgo;
-    const nextRun = new Date(now.getTime() + nextRunMinutesFromNow * 60000);
-    
-    document.getElementById('last-run-time').textContent = formatDateTime(lastRun);
-    document.getElementById('next-run-time').textContent = formatDateTime(nextRun);
+async function updateRunTimes() {
+    try {
+        const response = await fetch('/api/bot/stats');
+        if (!response.ok) {
+            throw new Error('Failed to fetch bot stats');
+        }
+        
+        const stats = await response.json();
+        
+        document.getElementById('last-run-time').textContent = stats.last_tick
+            ? formatDateTime(new Date(stats.last_tick.finished_at))
+            : 'Not run yet';
+        document.getElementById('next-run-time').textContent = stats.next_tick_at
+            ? formatDateTime(new Date(stats.next_tick_at))
+            : 'Not scheduled';
+    } catch (error) {
+        console.error('Error loading run times:', error);
+    }
 }
 
 // Format date and time
@@ -213,7 +213,8 @@ async function saveTemplate() {
         }
         
         if (!response.ok) {
-            throw new Error('Failed to save template');
+            const error = await response.json().catch(() => ({}));
+            throw new Error(error.message || 'Failed to save template');
         }
         
         const result = await response.json();
@@ -252,7 +253,7 @@ async function deleteTemplate() {
             loadTemplates();
         } else {
             deleteModal.hide();
-            showErrorMessage('Failed to delete template. It may be in use by one or more rules.');
+            showErrorMessage('Failed to delete template' + (result.message ? ': ' + result.message : '.'));
         }
     } catch (error) {
         console.error('Error deleting template:', error);
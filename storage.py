@@ -0,0 +1,371 @@
+import json
+import logging
+import queue
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """
+    Storage backend that persists nothing.
+    Used when no database is configured; DataStore keeps everything in memory.
+    """
+
+    persistent = False
+
+    def load_templates(self):
+        return []
+
+    def load_rules(self):
+        return []
+
+    def load_settings(self):
+        return None
+
+    def load_history(self, since, limit):
+        return []
+
+    def load_revisions(self):
+        return {}
+
+    def load_state(self, key):
+        return None
+
+    def save_state(self, key, data):
+        pass
+
+    def save_template(self, template):
+        pass
+
+    def delete_template(self, template_id):
+        pass
+
+    def save_rule(self, rule):
+        pass
+
+    def delete_rule(self, rule_id):
+        pass
+
+    def save_settings(self, settings):
+        pass
+
+    def save_config(self, templates=(), rules=(), deleted_templates=(), deleted_rules=(), settings=None):
+        """Write many config changes at once; persistent backends do it in one transaction"""
+        for template in templates:
+            self.save_template(template)
+        for rule in rules:
+            self.save_rule(rule)
+        for template_id in deleted_templates:
+            self.delete_template(template_id)
+        for rule_id in deleted_rules:
+            self.delete_rule(rule_id)
+        if settings is not None:
+            self.save_settings(settings)
+
+    def save_history(self, entry):
+        pass
+
+    def delete_history(self, history_id):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLBackend(MemoryBackend):
+    """
+    Base class for DB-API backends.
+    Templates, rules and settings are stored as JSON documents and written
+    through immediately. History writes are queued and group-committed by a
+    background writer so callers never wait on the database.
+
+    Every write also bumps a revision counter ("config" or "history") in the
+    same transaction, so other processes sharing the database can cheaply
+    tell when they need to reload.
+    """
+
+    persistent = True
+    placeholder = "?"
+
+    SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS templates (id TEXT PRIMARY KEY, data TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS rules (id TEXT PRIMARY KEY, data TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS settings (id INTEGER PRIMARY KEY, data TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS comment_history ("
+        " id TEXT PRIMARY KEY,"
+        " timestamp TEXT NOT NULL,"
+        " rule_id TEXT,"
+        " template_id TEXT,"
+        " comment_id TEXT,"
+        " status TEXT,"
+        " data TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS idx_history_timestamp ON comment_history (timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_history_rule_timestamp ON comment_history (rule_id, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_history_comment_id ON comment_history (comment_id)",
+        "CREATE TABLE IF NOT EXISTS revisions (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS shared_state (id TEXT PRIMARY KEY, data TEXT NOT NULL)",
+    ]
+
+    BUMP_REVISION = (
+        "INSERT INTO revisions (name, value) VALUES (?, 1) "
+        "ON CONFLICT (name) DO UPDATE SET value = revisions.value + 1"
+    )
+
+    def __init__(self, batch_size=100, flush_interval=0.5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn = self._connect()
+        self._conn_lock = threading.RLock()
+        self._create_schema()
+
+        self._pending = queue.Queue()
+        self._stopped = threading.Event()
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        raise NotImplementedError
+
+    def _sql(self, statement):
+        return statement.replace("?", self.placeholder)
+
+    def _execute(self, statement, params=(), many=False, revision=None):
+        with self._conn_lock:
+            cursor = self._conn.cursor()
+            try:
+                if many:
+                    cursor.executemany(self._sql(statement), params)
+                else:
+                    cursor.execute(self._sql(statement), params)
+                if revision is not None:
+                    cursor.execute(self._sql(self.BUMP_REVISION), (revision,))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def _query(self, statement, params=()):
+        with self._conn_lock:
+            cursor = self._conn.cursor()
+            try:
+                cursor.execute(self._sql(statement), params)
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+
+    def _create_schema(self):
+        for statement in self.SCHEMA:
+            self._execute(statement)
+
+    # Templates, rules and settings
+
+    def load_templates(self):
+        return [json.loads(row[0]) for row in self._query("SELECT data FROM templates")]
+
+    def load_rules(self):
+        return [json.loads(row[0]) for row in self._query("SELECT data FROM rules")]
+
+    def load_settings(self):
+        rows = self._query("SELECT data FROM settings WHERE id = 1")
+        return json.loads(rows[0][0]) if rows else None
+
+    def save_template(self, template):
+        self._upsert("templates", template["id"], template)
+
+    def delete_template(self, template_id):
+        self._execute("DELETE FROM templates WHERE id = ?", (template_id,), revision="config")
+
+    def save_rule(self, rule):
+        self._upsert("rules", rule["id"], rule)
+
+    def delete_rule(self, rule_id):
+        self._execute("DELETE FROM rules WHERE id = ?", (rule_id,), revision="config")
+
+    def save_settings(self, settings):
+        self._upsert("settings", 1, settings)
+
+    UPSERT = "INSERT INTO {table} (id, data) VALUES (?, ?) ON CONFLICT (id) DO UPDATE SET data = excluded.data"
+
+    def save_config(self, templates=(), rules=(), deleted_templates=(), deleted_rules=(), settings=None):
+        """Write many config changes and a single config revision bump in one transaction"""
+        statements = [
+            (self.UPSERT.format(table="templates"), [(t["id"], json.dumps(t)) for t in templates]),
+            (self.UPSERT.format(table="rules"), [(r["id"], json.dumps(r)) for r in rules]),
+            ("DELETE FROM templates WHERE id = ?", [(template_id,) for template_id in deleted_templates]),
+            ("DELETE FROM rules WHERE id = ?", [(rule_id,) for rule_id in deleted_rules]),
+            (self.UPSERT.format(table="settings"), [(1, json.dumps(settings))] if settings is not None else []),
+        ]
+        with self._conn_lock:
+            cursor = self._conn.cursor()
+            try:
+                for statement, params in statements:
+                    if params:
+                        cursor.executemany(self._sql(statement), params)
+                cursor.execute(self._sql(self.BUMP_REVISION), ("config",))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def _upsert(self, table, row_id, data, revision="config"):
+        self._execute(
+            self.UPSERT.format(table=table),
+            (row_id, json.dumps(data)),
+            revision=revision
+        )
+
+    # State shared between processes
+
+    def load_revisions(self):
+        """Get {name: revision} for the config and history revision counters"""
+        return dict(self._query("SELECT name, value FROM revisions"))
+
+    def load_state(self, key):
+        rows = self._query("SELECT data FROM shared_state WHERE id = ?", (key,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def save_state(self, key, data):
+        """Store a JSON document other processes can read, e.g. the leader's bot status"""
+        self._upsert("shared_state", key, data, revision=None)
+
+    # Comment history
+
+    def load_history(self, since, limit):
+        """Load the most recent history entries after `since`, oldest first"""
+        rows = self._query(
+            "SELECT data FROM comment_history WHERE timestamp > ? "
+            "ORDER BY timestamp DESC LIMIT ?",
+            (since, limit)
+        )
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def save_history(self, entry):
+        """Queue an insert or update of a history entry"""
+        self._pending.put(("save", dict(entry)))
+
+    def delete_history(self, history_id):
+        """Queue the removal of a history entry"""
+        self._pending.put(("delete", history_id))
+
+    def _write_loop(self):
+        while not self._stopped.is_set() or not self._pending.empty():
+            try:
+                first = self._pending.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                logger.error("Failed to write %d history changes: %s", len(batch), e)
+            finally:
+                for _ in batch:
+                    self._pending.task_done()
+
+    def _write_batch(self, batch):
+        """Apply a batch of queued history changes in a single transaction"""
+        with self._conn_lock:
+            cursor = self._conn.cursor()
+            try:
+                for op, payload in batch:
+                    if op == "save":
+                        cursor.execute(self._sql(
+                            "INSERT INTO comment_history "
+                            "(id, timestamp, rule_id, template_id, comment_id, status, data) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                            "ON CONFLICT (id) DO UPDATE SET status = excluded.status, data = excluded.data"
+                        ), (
+                            payload["id"],
+                            payload["timestamp"],
+                            payload.get("rule_id"),
+                            payload.get("template_id"),
+                            payload.get("comment_id"),
+                            payload.get("status"),
+                            json.dumps(payload)
+                        ))
+                    else:
+                        cursor.execute(self._sql("DELETE FROM comment_history WHERE id = ?"), (payload,))
+                cursor.execute(self._sql(self.BUMP_REVISION), ("history",))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def flush(self):
+        """Block until all queued history changes are written"""
+        self._pending.join()
+
+    def close(self):
+        self._stopped.set()
+        self._writer.join()
+        with self._conn_lock:
+            self._conn.close()
+
+
+class SQLiteBackend(SQLBackend):
+    """SQLite backend using WAL so readers never block the history writer"""
+
+    def __init__(self, path, **kwargs):
+        self.path = path
+        super().__init__(**kwargs)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps committed data safe without an fsync per transaction
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+
+class PostgresBackend(SQLBackend):
+    """PostgreSQL backend using psycopg2"""
+
+    placeholder = "%s"
+
+    def __init__(self, dsn, **kwargs):
+        self.dsn = dsn
+        super().__init__(**kwargs)
+
+    def _connect(self):
+        try:
+            import psycopg2
+        except ImportError as e:
+            raise RuntimeError("psycopg2 is required for the PostgreSQL backend") from e
+        return psycopg2.connect(self.dsn)
+
+
+def create_backend(url=None):
+    """
+    Create a storage backend from a database URL.
+
+    Args:
+        url: sqlite:///path/to/file.db, postgresql://... or None for memory only
+
+    Returns:
+        A storage backend instance
+    """
+    if not url:
+        return MemoryBackend()
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith(("postgres://", "postgresql://")):
+        return PostgresBackend(url)
+    raise ValueError(f"Unsupported database URL: {url}")
@@ -0,0 +1,104 @@
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Same placeholder syntax the template editor highlights: {name}
+VARIABLE_PATTERN = re.compile(r'\{([^}]+)\}')
+
+
+class TemplateError(ValueError):
+    """Raised when a template's declared variables don't match its content"""
+
+
+class CompiledTemplate:
+    """
+    Template content parsed once into alternating literal and variable segments.
+    `segments` is a list of strings; odd positions are variable names.
+    """
+
+    __slots__ = ("segments", "variables")
+
+    def __init__(self, content):
+        # re.split with one capture group alternates literal, variable, literal...
+        self.segments = VARIABLE_PATTERN.split(content)
+        self.variables = tuple(dict.fromkeys(self.segments[1::2]))
+
+    def render(self, variable_values):
+        """Fill in variables, leaving unknown ones as [name] placeholders"""
+        parts = self.segments[:]
+        missing = None
+        for i in range(1, len(parts), 2):
+            name = parts[i]
+            if name in variable_values:
+                parts[i] = str(variable_values[name])
+            else:
+                parts[i] = f"[{name}]"
+                if missing is None:
+                    missing = []
+                missing.append(name)
+
+        if missing:
+            logger.warning("Template has unfilled variables: %s", missing)
+
+        return "".join(parts)
+
+
+def compile_template(content):
+    """Parse template content into a CompiledTemplate"""
+    return CompiledTemplate(content or "")
+
+
+def validate_template(template_data):
+    """
+    Check a template's declared variables against its content.
+    Fills in `variables` from the content when it isn't given.
+
+    Raises:
+        TemplateError: If declared and used variables differ
+    """
+    compiled = compile_template(template_data.get("content", ""))
+    declared = template_data.get("variables")
+    if declared is None:
+        template_data["variables"] = list(compiled.variables)
+        return compiled
+
+    undeclared = [name for name in compiled.variables if name not in declared]
+    unused = [name for name in declared if name not in compiled.variables]
+    if undeclared or unused:
+        problems = []
+        if undeclared:
+            problems.append(f"undeclared variables {undeclared}")
+        if unused:
+            problems.append(f"declared but unused variables {unused}")
+        raise TemplateError("Template has " + " and ".join(problems))
+
+    return compiled
+
+
+class TemplateCache:
+    """
+    Compiled templates keyed by template id and `updated_at`.
+    """
+
+    def __init__(self):
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def get(self, template):
+        """Get the compiled form of a template, compiling it on first use"""
+        key = (template.get("id"), template.get("updated_at"))
+        with self._lock:
+            cached = self._compiled.get(key[0])
+            if cached is not None and cached[0] == key[1]:
+                return cached[1]
+
+        compiled = compile_template(template.get("content", ""))
+        with self._lock:
+            self._compiled[key[0]] = (key[1], compiled)
+        return compiled
+
+    def invalidate(self, template_id):
+        with self._lock:
+            self._compiled.pop(template_id, None)
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """The Flask app module on an in-memory store, with its schedulers stopped"""
+    os.environ.pop("DATABASE_URL", None)
+    os.environ.update({
+        "DEPLOYMENT_MODE": "single",
+        "HISTORY_ARCHIVE_DIR": str(tmp_path_factory.mktemp("history_archive")),
+        "LOG_LEVEL": "WARNING",
+        "POST_SOURCES": "simulated",
+    })
+    import app
+    app.stop_scheduling()
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,57 @@
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+from clock import VirtualClock
+from data_store import DataStore
+
+
+def recount(entries, now, days, hours):
+    """Analytics computed the slow way, by scanning every entry"""
+    daily = Counter()
+    hourly = Counter()
+    templates = Counter()
+    for entry in entries:
+        timestamp = datetime.fromisoformat(entry["timestamp"])
+        daily[timestamp.strftime("%Y-%m-%d"), entry["status"]] += 1
+        hourly[timestamp.strftime("%Y-%m-%d %H:00"), entry["status"]] += 1
+        if entry.get("template_id"):
+            templates[entry["template_id"]] += 1
+    dates = [(now - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+    hour_keys = [(now - timedelta(hours=i)).strftime("%Y-%m-%d %H:00") for i in range(hours)]
+    return (
+        [{"date": d, "success": daily[d, "success"], "error": daily[d, "error"]} for d in dates],
+        [{"hour": h, "success": hourly[h, "success"], "error": hourly[h, "error"]} for h in hour_keys],
+        dict(templates)
+    )
+
+
+def test_rollups_match_a_full_rescan_through_adds_updates_and_deletes():
+    rng = random.Random(2)
+    clock = VirtualClock(datetime(2026, 1, 5, 8))
+    store = DataStore(sample_data=False, clock=clock, rng=random.Random(2))
+    for i in range(300):
+        clock.advance(rng.randint(0, 1800))
+        store.add_comment_history({"post_id": f"p{i}", "comment_id": f"c{i}", "content": "x",
+                                   "template_id": rng.choice(["t1", "t2", None]),
+                                   "status": rng.choice(["success", "success", "error"])})
+
+    entries = store.get_comment_history()
+    for entry in rng.sample(entries, 30):
+        store.update_comment_status(entry["comment_id"], "error" if entry["status"] == "success" else "success")
+    for entry in rng.sample(store.get_comment_history(), 30):
+        store.delete_comment_history(entry["id"])
+
+    entries = store.get_comment_history()
+    daily, hourly, templates = recount(entries, clock.now(), 7, 24)
+    analytics = store.get_analytics(days=7)
+    assert analytics["daily_counts"] == daily
+    assert analytics["hourly_counts"] == hourly
+    assert {t["id"]: t["count"] for t in analytics["template_stats"]} == templates
+    assert analytics["total_comments"] == len(entries)
+
+    # The dashboard's last 24 hours mix whole-hour rollups with the partial first hour
+    cutoff = clock.now() - timedelta(hours=24)
+    recent = [e for e in entries if datetime.fromisoformat(e["timestamp"]) > cutoff]
+    success_rate = len([e for e in recent if e["status"] == "success"]) / len(recent) * 100
+    assert store.get_dashboard_stats()["success_rate"] == success_rate
@@ -0,0 +1,57 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from bench_suite import print_comparison, result
+from synthetic import SyntheticPostSource, make_history, make_rules, make_templates
+
+
+def make_report(p95_ms, throughput, rss):
+    row = {"scenario": "api", "name": "GET /api/rules", "p95_ms": p95_ms, "throughput": throughput}
+    return {"version": "base", "created_at": "2026-01-05",
+            "runs": [{"history_size": 1000, "peak_rss_mb": rss, "results": [row]}]}
+
+
+def test_result_row_has_throughput_and_percentiles():
+    row = result("api", "GET /", [0.001] * 90 + [0.01] * 10)
+
+    assert row["ops"] == 100
+    assert row["seconds"] == 0.19
+    assert row["throughput"] == round(100 / 0.19, 3)
+    assert row["p50_ms"] == 1.0
+    assert row["p95_ms"] == 10.0
+
+
+def test_comparison_flags_regressions_past_the_threshold(capsys):
+    print_comparison(make_report(10, 100, 50), make_report(12, 95, 60))
+
+    output = capsys.readouterr().out
+    assert "+20%" in output and "-5%" in output
+    assert "<- regression" in output
+    assert "1 regressions past 10%" in output
+    assert "peak RSS at 1,000: 50 -> 60 MiB" in output
+
+
+def test_small_changes_are_not_regressions(capsys):
+    print_comparison(make_report(10, 100, 50), make_report(10.5, 98, 50))
+
+    assert "0 regressions" in capsys.readouterr().out
+
+
+def test_synthetic_load_is_reproducible_from_a_seed():
+    def generate(seed):
+        rng = random.Random(seed)
+        templates = make_templates(rng, 5)
+        rules = make_rules(rng, templates, 8)
+        history = list(make_history(rng, rules, 20))
+        keywords = sorted({keyword for rule in rules for keyword in rule["trigger_keywords"]})
+        posts = SyntheticPostSource(random.Random(seed + 1), keywords, posts_per_poll=10).poll()
+        return ([(t["id"], t["content"]) for t in templates],
+                [(r["id"], r["trigger_keywords"]) for r in rules],
+                [(e["id"], e["status"]) for e in history],
+                [(p.post_id, p.content) for p in posts])
+
+    assert generate(3) == generate(3)
+    assert generate(3) != generate(4)
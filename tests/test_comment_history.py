@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+
+from comment_history import CommentHistory
+from history_record import HistoryRecord
+
+START = datetime(2026, 1, 5)
+
+
+def record(i, seconds=None, rule_id="rule-a", status="success"):
+    return HistoryRecord.from_dict({
+        "id": f"e{i:04d}",
+        "timestamp": (START + timedelta(seconds=i if seconds is None else seconds)).isoformat(),
+        "rule_id": rule_id,
+        "template_id": "template-a",
+        "status": status,
+    })
+
+
+def ids(entries):
+    return [entry["id"] for entry in entries]
+
+
+def test_evicts_oldest_to_on_evict_when_full():
+    evicted = []
+    history = CommentHistory(max_size=3, on_evict=evicted.append)
+    for i in range(5):
+        history.append(record(i))
+
+    assert len(history) == 3
+    assert ids(history.oldest_first()) == ["e0002", "e0003", "e0004"]
+    assert ids(evicted) == ["e0000", "e0001"]
+    assert history.oldest_timestamp() == record(2)["timestamp"]
+
+
+def test_entry_older_than_full_window_goes_straight_to_archive():
+    evicted = []
+    history = CommentHistory(max_size=2, on_evict=evicted.append)
+    history.append(record(10))
+    history.append(record(11))
+    history.append(record(1))
+
+    assert ids(history.oldest_first()) == ["e0010", "e0011"]
+    assert ids(evicted) == ["e0001"]
+
+
+def test_out_of_order_append_keeps_time_order_across_wraparound():
+    history = CommentHistory(max_size=4)
+    for i in (0, 1, 2, 3, 4, 5):
+        history.append(record(i))
+    history.append(record(9, seconds=3.5))
+
+    assert ids(history.oldest_first()) == ["e0003", "e0009", "e0004", "e0005"]
+    assert ids(history.newest_first()) == ["e0005", "e0004", "e0009", "e0003"]
+
+
+def test_iter_newest_first_includes_the_boundary():
+    history = CommentHistory(max_size=10)
+    for i in range(6):
+        history.append(record(i))
+    cutoff = record(3)["timestamp"]
+
+    assert ids(history.iter_newest_first(cutoff)) == ["e0003", "e0002", "e0001", "e0000"]
+    assert ids(history.iter_newest_first(cutoff, rule_id="rule-a")) == ["e0003", "e0002", "e0001", "e0000"]
+
+
+def test_equal_timestamps_are_all_kept():
+    evicted = []
+    history = CommentHistory(max_size=3, on_evict=evicted.append)
+    for i in range(5):
+        history.append(record(i, seconds=0))
+
+    assert ids(history.oldest_first()) == ["e0002", "e0003", "e0004"]
+    assert ids(evicted) == ["e0000", "e0001"]
+    assert len(history.between(record(0)["timestamp"], record(0)["timestamp"])) == 3
+
+
+def test_resize_evicts_and_keeps_order():
+    evicted = []
+    history = CommentHistory(max_size=5, on_evict=evicted.append)
+    for i in range(5):
+        history.append(record(i))
+    history.resize(2)
+
+    assert ids(history.oldest_first()) == ["e0003", "e0004"]
+    assert ids(evicted) == ["e0000", "e0001", "e0002"]
+
+    history.resize(4)
+    history.append(record(5))
+    history.append(record(6))
+    assert ids(history.oldest_first()) == ["e0003", "e0004", "e0005", "e0006"]
+
+
+def test_remove_replace_and_indexes():
+    history = CommentHistory(max_size=5)
+    for i in range(4):
+        history.append(record(i, rule_id="rule-b" if i % 2 else "rule-a"))
+
+    removed = history.remove("e0001")
+    assert removed["id"] == "e0001"
+    assert history.get("e0001") is None
+    assert ids(history.for_rule("rule-b")) == ["e0003"]
+
+    updated = HistoryRecord.from_dict(dict(history.get("e0002").to_dict(), status="error"))
+    history.replace(history.get("e0002"), updated)
+    assert history.get("e0002")["status"] == "error"
+    assert history.rollup.day("2026-01-05") == {"success": 2, "error": 1}
+
+
+def test_time_rule_template_and_comment_id_lookups():
+    history = CommentHistory(max_size=10)
+    for i in range(6):
+        history.append(record(i * 60, rule_id="rule-b" if i % 3 == 0 else "rule-a"))
+    history.append(HistoryRecord.from_dict({"id": "e-posted", "timestamp": (START + timedelta(hours=1)).isoformat(),
+                                            "rule_id": "rule-c", "template_id": "template-b",
+                                            "comment_id": "c-42", "status": "success"}))
+
+    window = ids(history.between((START + timedelta(seconds=60)).isoformat(), (START + timedelta(seconds=180)).isoformat()))
+    assert window == ["e0060", "e0120", "e0180"]
+    assert history.count_since((START + timedelta(seconds=240)).isoformat()) == 2
+
+    assert ids(history.for_rule("rule-b")) == ["e0000", "e0180"]
+    assert history.last_for_rule("rule-a")["id"] == "e0300"
+    assert history.last_for_rule("rule-unknown") is None
+    assert ids(history.for_template("template-b")) == ["e-posted"]
+    assert history.get_by_comment_id("c-42")["id"] == "e-posted"
+
+    until = (START + timedelta(seconds=120)).isoformat()
+    assert ids(history.iter_newest_first(until=until)) == ["e0120", "e0060", "e0000"]
+    assert ids(history.iter_newest_first(until=until, rule_id="rule-a")) == ["e0120", "e0060"]
+    assert ids(history.iter_newest_first(template_id="template-a"))[:2] == ["e0300", "e0240"]
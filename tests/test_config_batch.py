@@ -0,0 +1,98 @@
+import json
+
+from data_store import DataStore
+
+
+def op(op, kind, **data):
+    return {"op": op, "kind": kind, "data": data}
+
+
+def test_batch_applies_in_order_as_one_version():
+    store = DataStore(sample_data=False)
+    changes = []
+    store.add_rule_listener(lambda rule_id, rule: changes.append(rule_id))
+    version = store.snapshot().version
+
+    results = store.apply_config_batch([
+        op("upsert", "template", id="t-thanks", name="Thanks", content="Thanks {name}!", variables=["name"]),
+        op("create", "rule", name="Thank everyone", template_id="t-thanks", trigger_type="new_post", enabled=True),
+        op("update", "settings", max_comments_per_hour=12),
+    ])
+
+    assert [result["status"] for result in results] == ["created", "created", "updated"]
+    assert results[0]["id"] == "t-thanks"
+    assert store.snapshot().version == version + 1
+    assert store.rules_using_template("t-thanks") == [results[1]["id"]]
+    assert store.get_settings()["max_comments_per_hour"] == 12
+    assert changes == [results[1]["id"]]
+
+
+def test_failed_operations_are_reported_and_the_rest_applied():
+    store = DataStore(sample_data=False)
+    results = store.apply_config_batch([
+        op("create", "template", name="Hi", content="Hi!", variables=[]),
+        op("update", "rule", id="missing", name="Nope"),
+        op("create", "rule", name="Orphan", template_id="missing", trigger_type="new_post"),
+        {"op": "rename", "kind": "rule", "data": {}},
+        "not an operation",
+    ])
+
+    assert [result["status"] for result in results] == ["created", "error", "error", "error", "error"]
+    assert "not found" in results[1]["message"]
+    assert len(store.get_templates()) == 1
+
+
+def test_atomic_batches_apply_nothing_on_error():
+    store = DataStore(sample_data=False)
+    template_id = store.add_template({"name": "Hi", "content": "Hi!", "variables": []})
+    store.add_rule({"name": "Rule", "template_id": template_id, "trigger_type": "new_post", "enabled": True})
+    version = store.snapshot().version
+
+    results = store.apply_config_batch([
+        op("create", "template", name="Bye", content="Bye!", variables=[]),
+        op("delete", "template", id=template_id),
+    ], atomic=True)
+
+    assert [result["status"] for result in results] == ["skipped", "error"]
+    assert "still used" in results[1]["message"]
+    assert store.snapshot().version == version
+    assert len(store.get_templates()) == 1
+
+
+def test_export_imports_back_as_it_was(client, app_module):
+    store = app_module.data_store
+    template_id = store.add_template({"name": "Export me", "content": "Exported {name}", "variables": ["name"]})
+    rule_id = store.add_rule({"name": "Export rule", "template_id": template_id, "trigger_type": "keyword",
+                              "trigger_keywords": ["export"], "enabled": False})
+    try:
+        response = client.get("/api/export")
+        assert response.mimetype == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert lines[0]["kind"] == "settings"
+        exported_rule = next(line["data"] for line in lines if line["kind"] == "rule" and line["data"]["id"] == rule_id)
+
+        store.apply_config_batch([op("delete", "rule", id=rule_id), op("delete", "template", id=template_id)])
+        assert store.get_rule(rule_id) is None
+
+        response = client.post("/api/import", data=response.get_data(), content_type="application/x-ndjson")
+        body = response.get_json()
+        assert body["success"]
+        assert body["counts"]["created"] == 2
+        assert store.get_rule(rule_id)["created_at"] == exported_rule["created_at"]
+        assert store.get_rule(rule_id)["trigger_keywords"] == ("export",)
+    finally:
+        store.apply_config_batch([op("delete", "rule", id=rule_id), op("delete", "template", id=template_id)])
+
+
+def test_batch_routes_take_json_arrays_and_reject_bad_bodies(client, app_module):
+    response = client.post("/api/templates/batch?op=create",
+                           json=[{"name": "Batch", "content": "Batch!", "variables": []}])
+    body = response.get_json()
+    assert body["success"] and body["counts"] == {"created": 1}
+    client.post("/api/templates/batch", json=[{"op": "delete", "id": body["results"][0]["id"]}])
+    assert app_module.data_store.get_template(body["results"][0]["id"]) is None
+
+    response = client.post("/api/rules/batch", data=b'{"name": "x"}\nnot json\n', content_type="application/x-ndjson")
+    assert response.status_code == 400
+    assert "line 2" in response.get_json()["message"]
+    assert client.post("/api/rules/batch", json={"name": "x"}).status_code == 400
@@ -0,0 +1,54 @@
+import pytest
+
+from deployment import FileLock, LeaderElector, PostgresAdvisoryLock, create_leader_lock, fcntl
+
+pytestmark = pytest.mark.skipif(fcntl is None, reason="file locks need fcntl")
+
+
+def test_file_lock_has_one_holder_at_a_time(tmp_path):
+    path = tmp_path / "leader.lock"
+    first, second = FileLock(str(path)), FileLock(str(path))
+
+    assert first.acquire()
+    assert not second.acquire()
+
+    first.release()
+    assert second.acquire()
+    second.release()
+
+
+def test_elector_takes_over_when_the_leader_stops(tmp_path):
+    path = str(tmp_path / "leader.lock")
+    calls = []
+    leader = LeaderElector(FileLock(path), lambda: calls.append("a elected"), lambda: calls.append("a lost"), interval=60)
+    standby = LeaderElector(FileLock(path), lambda: calls.append("b elected"), interval=60)
+
+    leader.start()
+    standby.start()
+    assert leader.is_leader and not standby.is_leader
+
+    leader.stop()
+    standby._check()
+    standby.stop()
+
+    assert calls == ["a elected", "a lost", "b elected"]
+
+
+def test_failed_takeover_gives_the_lock_back(tmp_path):
+    path = str(tmp_path / "leader.lock")
+
+    def on_elected():
+        raise RuntimeError("scheduler failed to start")
+
+    elector = LeaderElector(FileLock(path), on_elected, interval=60)
+    elector._check()
+
+    assert not elector.is_leader
+    other = FileLock(path)
+    assert other.acquire()
+    other.release()
+
+
+def test_lock_kind_follows_the_database_url(tmp_path):
+    assert isinstance(create_leader_lock("postgresql://localhost/sigm"), PostgresAdvisoryLock)
+    assert isinstance(create_leader_lock(None, path=str(tmp_path / "x.lock")), FileLock)
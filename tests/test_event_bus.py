@@ -0,0 +1,47 @@
+from event_bus import EventBus
+
+
+def test_subscribers_get_only_their_topics():
+    bus = EventBus()
+    history = bus.subscribe(["history"])
+    everything = bus.subscribe()
+    bus.publish("history", {"id": 1})
+    bus.publish("stats", {"total": 2})
+
+    assert history.get(timeout=0).data == {"id": 1}
+    assert history.get(timeout=0) is None
+    assert [everything.get(timeout=0).topic for _ in range(2)] == ["history", "stats"]
+    assert bus.has_subscribers("stats")
+
+    everything.close()
+    assert not bus.has_subscribers("stats")
+    assert bus.publish("stats", {}) is None
+
+
+def test_slow_readers_are_told_they_lagged():
+    bus = EventBus(buffer_size=2)
+    subscription = bus.subscribe()
+    for i in range(5):
+        bus.publish("history", {"id": i})
+
+    lagged = subscription.get(timeout=0)
+    assert (lagged.topic, lagged.data) == ("lagged", {"dropped": 3})
+    assert [subscription.get(timeout=0).data["id"] for _ in range(2)] == [3, 4]
+
+
+def test_events_are_formatted_as_sse():
+    bus = EventBus()
+    subscription = bus.subscribe()
+    bus.publish("queue", {"depth": 1})
+    assert subscription.get(timeout=0).to_sse() == 'id: 1\nevent: queue\ndata: {"depth":1}\n\n'
+
+
+def test_stream_sends_history_events_and_ends_after_its_lifetime(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module, "STREAM_MAX_SECONDS", 0.3)
+    response = client.get("/api/stream?topics=history")
+    app_module.data_store.add_comment_history({"post_id": "streamed", "content": "x", "status": "success"})
+
+    body = b"".join(response.response).decode("utf-8")
+    assert body.startswith("retry: 5000\n\n")
+    assert "event: history" in body and "streamed" in body
+    assert app_module.data_store.events.subscriber_count() == 0
@@ -0,0 +1,54 @@
+import pytest
+
+from gpt_comment_generator import CommentGenerator, GenerationError, StubBackend, TTLCache
+
+
+class CountingBackend(StubBackend):
+    """StubBackend that counts completions and fails for posts containing "fail" """
+
+    def __init__(self):
+        super().__init__(latency=0)
+        self.calls = 0
+
+    def complete(self, prompt, timeout):
+        self.calls += 1
+        if "fail" in prompt:
+            raise GenerationError("backend down", retryable=True)
+        return super().complete(prompt, timeout)
+
+
+def test_identical_posts_are_completed_once():
+    backend = CountingBackend()
+    generator = CommentGenerator(backend=backend)
+    first = generator.generate("Shipped it!")
+    assert generator.generate("Shipped it!") == first
+    assert backend.calls == 1
+
+
+def test_generate_many_keeps_order_and_does_not_cache_errors():
+    backend = CountingBackend()
+    generator = CommentGenerator(backend=backend, max_workers=4)
+    posts = [f"post {i}" for i in range(8)] + ["please fail"]
+    results = generator.generate_many(posts)
+
+    assert [result.post_text for result in results] == posts
+    assert all(result.ok for result in results[:-1])
+    assert not results[-1].ok and results[-1].error.retryable
+
+    with pytest.raises(GenerationError):
+        generator.generate("please fail")
+    assert backend.calls == 10
+    assert generator.generate_many(["post 3"])[0].cached
+
+
+def test_cache_entries_expire_and_the_least_recent_is_evicted():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+    expired = TTLCache(ttl=-1)
+    expired.set("a", 1)
+    assert expired.get("a") is None
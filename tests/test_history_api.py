@@ -0,0 +1,35 @@
+def add_entries(store, count, **fields):
+    for i in range(count):
+        store.add_comment_history(dict({"post_id": f"api-{i}", "content": "x", "status": "success"}, **fields))
+
+
+def test_history_pages_with_cursors_and_filters(app_module, client):
+    add_entries(app_module.data_store, 7, status="error", rule_id="api-rule")
+
+    entries, cursor = [], None
+    while True:
+        url = "/api/history?rule_id=api-rule&status=error&limit=3" + (f"&cursor={cursor}" if cursor else "")
+        page = client.get(url).get_json()
+        entries.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(entries) == 7
+    assert len({entry["id"] for entry in entries}) == 7
+
+    fields = client.get("/api/history?rule_id=api-rule&limit=1&fields=id,status").get_json()["items"]
+    assert set(fields[0]) == {"id", "status"}
+    assert client.get("/api/history?cursor=not-a-cursor").status_code == 400
+
+
+def test_unchanged_history_is_revalidated_with_a_304(app_module, client):
+    first = client.get("/api/history?limit=5")
+    etag = first.headers["ETag"]
+    assert client.get("/api/history?limit=5", headers={"If-None-Match": etag}).status_code == 304
+    # Another query has its own ETag
+    assert client.get("/api/history?limit=6", headers={"If-None-Match": etag}).status_code == 200
+
+    add_entries(app_module.data_store, 1)
+    changed = client.get("/api/history?limit=5", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
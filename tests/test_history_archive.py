@@ -0,0 +1,64 @@
+import random
+from datetime import datetime, timedelta
+
+from history_archive import HistoryArchive
+
+START = datetime(2026, 1, 5, 23, 59, 50)
+
+
+def entry(i, seconds):
+    return {"id": f"e{i:04d}", "timestamp": (START + timedelta(seconds=seconds)).isoformat(), "status": "success"}
+
+
+def newest_first(entries):
+    return sorted(entries, key=lambda e: (e["timestamp"], e["id"]), reverse=True)
+
+
+def ids(entries):
+    return [e["id"] for e in entries]
+
+
+def test_buffered_entry_tied_with_segment_end_keeps_order(tmp_path):
+    archive = HistoryArchive(str(tmp_path), batch_size=2)
+    archive.append(entry(1, 0))
+    archive.append(entry(2, 5))
+    # Buffered, same timestamp as the member's newest entry, then an older one
+    archive.append(entry(3, 5))
+
+    assert ids(archive.iter_newest_first()) == ["e0003", "e0002", "e0001"]
+
+
+def test_overlapping_members_and_buffer_merge_newest_first(tmp_path):
+    rng = random.Random(11)
+    archive = HistoryArchive(str(tmp_path), batch_size=7)
+    entries = [entry(i, rng.randint(0, 30)) for i in range(60)]
+    rng.shuffle(entries)
+    for e in entries:
+        archive.append(e)
+
+    assert ids(archive.iter_newest_first()) == ids(newest_first(entries))
+
+
+def test_iter_boundaries(tmp_path):
+    archive = HistoryArchive(str(tmp_path), batch_size=3)
+    entries = [entry(i, i // 2) for i in range(10)]
+    for e in entries:
+        archive.append(e)
+    cutoff = entries[4]["timestamp"]
+
+    assert ids(archive.iter_newest_first(cutoff)) == ids(newest_first(e for e in entries if e["timestamp"] < cutoff))
+    assert ids(archive.iter_newest_first(cutoff, inclusive=True)) == ids(
+        newest_first(e for e in entries if e["timestamp"] <= cutoff))
+
+
+def test_prune_uses_given_cutoff_and_survives_reload(tmp_path):
+    archive = HistoryArchive(str(tmp_path), retention_days=1, batch_size=1)
+    archive.append({"id": "old", "timestamp": "2026-01-01T10:00:00", "status": "success"})
+    archive.append({"id": "new", "timestamp": "2026-01-05T10:00:00", "status": "success"})
+
+    pruned = archive.prune(now=datetime(2026, 1, 5, 12))
+    assert list(pruned) == ["2026-01-01"]
+
+    reopened = HistoryArchive(str(tmp_path))
+    assert ids(reopened.iter_newest_first()) == ["new"]
+    assert reopened.entry_count() == 1
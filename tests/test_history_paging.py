@@ -0,0 +1,107 @@
+import random
+from datetime import datetime
+
+from clock import VirtualClock
+from data_store import DataStore, encode_history_cursor
+from history_archive import HistoryArchive
+
+
+def make_store(tmp_path, hot_size=3):
+    clock = VirtualClock(datetime(2026, 1, 5, 12))
+    store = DataStore(archive=HistoryArchive(str(tmp_path), batch_size=2), sample_data=False, clock=clock)
+    store.update_settings({"history_hot_size": hot_size})
+    return store, clock
+
+
+def add(store, name):
+    store.add_comment_history({"post_id": name, "content": name, "status": "success"})
+
+
+def posts(entries):
+    return [entry["post_id"] for entry in entries]
+
+
+def test_get_comment_history_keeps_archived_entries_tied_with_the_window(tmp_path):
+    store, clock = make_store(tmp_path)
+    add(store, "a1")
+    clock.advance(1)
+    for name in ("c1", "c2", "c3", "c4", "c5"):
+        add(store, name)
+
+    # Two of the entries sharing the window's oldest timestamp are archived
+    entries = store.get_comment_history(limit=10)
+    assert sorted(posts(entries)) == ["a1", "c1", "c2", "c3", "c4", "c5"]
+    assert posts(entries)[-1] == "a1"
+
+
+def test_archive_retention_follows_the_store_clock(tmp_path):
+    store, clock = make_store(tmp_path, hot_size=1)
+    store.update_settings({"history_archive_days": 2})
+    add(store, "old")
+    clock.advance(2 * 24 * 3600)
+    add(store, "kept")
+    clock.advance(24 * 3600)
+    add(store, "later")
+    store.archive.flush()
+    store._apply_retention()
+
+    assert store.archive.entry_count() == 1
+    assert posts(store.get_comment_history(limit=10)) == ["later", "kept"]
+
+
+def test_get_comment_history_pages_entries_sharing_a_timestamp(tmp_path):
+    store, clock = make_store(tmp_path, hot_size=40)
+    for i in range(451):
+        if i % 150 == 0:
+            clock.advance(1)
+        add(store, f"p{i}")
+
+    entries, before = [], None
+    while True:
+        page = store.get_comment_history(before=before, limit=20)
+        if not page:
+            break
+        entries.extend(page)
+        before = encode_history_cursor(page[-1])
+
+    assert len(entries) == 451
+    assert len({entry["id"] for entry in entries}) == 451
+    assert entries == sorted(entries, key=lambda e: (e["timestamp"], e["id"]), reverse=True)
+
+
+def page_all(store, limit, **filters):
+    entries, cursor = store.query_history(limit=limit, **filters)
+    while cursor is not None:
+        page, cursor = store.query_history(cursor=cursor, limit=limit, **filters)
+        entries.extend(page)
+    return entries
+
+
+def test_query_history_keeps_entries_tied_at_the_archive_boundary(tmp_path):
+    store, _ = make_store(tmp_path)
+    for name in ("c1", "c2", "c3", "c4", "c5"):
+        add(store, name)
+
+    entries, cursor = store.query_history(limit=10)
+    assert sorted(posts(entries)) == ["c1", "c2", "c3", "c4", "c5"]
+    assert cursor is None
+    assert sorted(posts(page_all(store, limit=2))) == ["c1", "c2", "c3", "c4", "c5"]
+
+
+def test_query_history_cursor_pages_equal_timestamps_exactly_once(tmp_path):
+    rng = random.Random(7)
+    store, clock = make_store(tmp_path, hot_size=7)
+    for i in range(60):
+        if rng.random() < 0.3:
+            clock.advance(1)
+        store.add_comment_history({"post_id": f"p{i}", "content": "x", "rule_id": rng.choice(["r1", "r2"]),
+                                   "status": rng.choice(["success", "error"])})
+    expected = sorted(store.get_comment_history(limit=100), key=lambda e: (e["timestamp"], e["id"]), reverse=True)
+    assert len(expected) == 60
+
+    for limit in (1, 2, 5, 50):
+        assert [e["id"] for e in page_all(store, limit)] == [e["id"] for e in expected]
+        assert [e["id"] for e in page_all(store, limit, status="error")] == [
+            e["id"] for e in expected if e["status"] == "error"]
+        assert [e["id"] for e in page_all(store, limit, rule_id="r2")] == [
+            e["id"] for e in expected if e["rule_id"] == "r2"]
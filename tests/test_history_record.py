@@ -0,0 +1,70 @@
+import pytest
+
+from history_record import STATUSES, HistoryRecord, as_dict, from_epoch, to_epoch
+
+
+def make_entry(**overrides):
+    entry = {
+        "id": "6f1c2a4e-9b3d-4c1e-8a7f-2d5e6b7c8d9e",
+        "timestamp": "2026-01-05T12:30:00.250000",
+        "post_id": "post-1",
+        "comment_id": "comment-1",
+        "rule_id": "rule-1",
+        "template_id": "template-1",
+        "content": "Nice post!",
+        "status": "success",
+        "platform": "twitter",
+        "engagement": {"likes": 3, "replies": 1},
+    }
+    entry.update(overrides)
+    return entry
+
+
+def test_record_round_trips_to_the_same_dict():
+    entry = make_entry(updated_at="2026-01-05T13:00:00", campaign="spring")
+    record = HistoryRecord.from_dict(entry)
+
+    assert record.to_dict() == entry
+    assert list(record) == list(entry)
+    assert dict(record) == entry
+    assert as_dict(record) == entry
+
+
+def test_record_is_stored_compactly():
+    record = HistoryRecord.from_dict(make_entry())
+
+    assert record.key == bytes.fromhex("6f1c2a4e9b3d4c1e8a7f2d5e6b7c8d9e")
+    assert record.ts == to_epoch("2026-01-05T12:30:00.250000")
+    assert record.status_handle == STATUSES.find("success")
+    assert record.engagement_data == (3, 1)
+
+
+def test_missing_fields_stay_missing():
+    entry = make_entry()
+    del entry["template_id"], entry["engagement"]
+    entry["rule_id"] = None
+    record = HistoryRecord.from_dict(entry)
+
+    assert "template_id" not in record
+    assert record.get("engagement", "none") == "none"
+    assert "rule_id" in record and record["rule_id"] is None
+    with pytest.raises(KeyError):
+        record["template_id"]
+
+
+def test_record_is_read_only_and_replace_copies():
+    record = HistoryRecord.from_dict(make_entry())
+
+    with pytest.raises(AttributeError):
+        record.content = "edited"
+
+    deleted = record.replace(status="deleted")
+    assert deleted["status"] == "deleted"
+    assert record["status"] == "success"
+    assert deleted["id"] == record["id"]
+
+
+def test_non_uuid_ids_and_epoch_conversion():
+    record = HistoryRecord.from_dict(make_entry(id="legacy-42"))
+    assert record["id"] == "legacy-42"
+    assert from_epoch(to_epoch("2026-01-05T12:30:00")) == "2026-01-05T12:30:00"
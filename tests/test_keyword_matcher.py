@@ -0,0 +1,52 @@
+import random
+
+from keyword_matcher import KeywordMatcher
+
+
+def test_overlapping_keywords_and_normalization():
+    matcher = KeywordMatcher()
+    matcher.set_rule("r1", ["he", "she", "hers"])
+    matcher.set_rule("r2", ["ＳＩＧＮ"])
+    matcher.set_rule("r3", ["빌드"])
+
+    assert matcher.matches("USHERS") == {"r1": ["she", "he", "hers"]}
+    assert matcher.match("sign protocol") == {"r2"}
+    # Korean particles attach directly to the keyword
+    assert matcher.match("오늘도 빌드를 했어요") == {"r3"}
+    assert matcher.matches("") == {}
+
+
+def test_whole_word_rules_reject_glued_hits():
+    matcher = KeywordMatcher()
+    matcher.set_rule("whole", ["cat"], whole_word=True)
+    matcher.set_rule("any", ["cat"])
+    assert matcher.match("concatenate") == {"any"}
+    assert matcher.match("a cat!") == {"whole", "any"}
+
+
+def test_rules_can_be_replaced_and_removed():
+    matcher = KeywordMatcher()
+    matcher.set_rule("r1", ["alpha"])
+    matcher.set_rule("r1", ["beta"])
+    assert matcher.match("alpha beta") == {"r1"}
+    assert matcher.matches("alpha") == {}
+    matcher.remove_rule("r1")
+    assert matcher.match("beta") == set()
+
+
+def test_matches_agree_with_a_substring_scan():
+    rng = random.Random(4)
+    alphabet = "abc"
+    keywords = {f"r{i}": ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4)))
+                          for _ in range(rng.randint(1, 3))] for i in range(30)}
+    matcher = KeywordMatcher()
+    for rule_id, words in keywords.items():
+        matcher.set_rule(rule_id, words)
+    for rule_id in rng.sample(sorted(keywords), 10):
+        matcher.remove_rule(rule_id)
+        del keywords[rule_id]
+
+    for _ in range(200):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+        expected = {rule_id for rule_id, words in keywords.items() if any(word in text for word in words)}
+        assert matcher.match(text) == expected
@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+from metrics import Registry, TimedLock, timed, timed_lock
+
+
+def test_counter_renders_labelled_totals():
+    registry = Registry()
+    posted = registry.counter("sigm_comments_posted", "Comments posted", ["status"])
+    posted.inc(status="success")
+    posted.inc(2, status="success")
+    posted.inc(status="error")
+
+    assert registry.render().splitlines() == [
+        "# HELP sigm_comments_posted Comments posted",
+        "# TYPE sigm_comments_posted counter",
+        'sigm_comments_posted_total{status="error"} 1',
+        'sigm_comments_posted_total{status="success"} 3',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = registry.histogram("sigm_tick_seconds", "Tick duration", buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 3):
+        latency.observe(value)
+
+    samples = registry.render().splitlines()[2:]
+    assert samples == [
+        'sigm_tick_seconds_bucket{le="0.1"} 1',
+        'sigm_tick_seconds_bucket{le="1"} 3',
+        'sigm_tick_seconds_bucket{le="+Inf"} 4',
+        "sigm_tick_seconds_sum 4.05",
+        "sigm_tick_seconds_count 4",
+    ]
+
+
+def test_gauges_are_read_at_render_time_and_errors_skipped():
+    registry = Registry()
+    depth = [3]
+    registry.gauge("sigm_queue_depth", "Queue depth", lambda: depth[0])
+    registry.gauge("sigm_broken", "Always fails", lambda: 1 / 0)
+
+    depth[0] = 7
+    rendered = registry.render()
+    assert "sigm_queue_depth 7\n" in rendered
+    assert not [line for line in rendered.splitlines() if line.startswith("sigm_broken")]
+
+
+def test_names_are_registered_once():
+    registry = Registry()
+    registry.counter("sigm_ticks", "Ticks")
+    with pytest.raises(ValueError):
+        registry.counter("sigm_ticks", "Ticks again")
+
+
+def test_disabled_registry_ignores_updates():
+    registry = Registry(enabled=False)
+    ticks = registry.counter("sigm_ticks", "Ticks")
+    latency = registry.histogram("sigm_tick_seconds", "Tick duration")
+    lock = threading.Lock()
+
+    ticks.inc()
+    assert timed(latency)(lambda: "ran")() == "ran"
+    assert timed_lock(lock, latency) is lock
+    assert "sigm_ticks_total 0" in registry.render()
+    assert "sigm_tick_seconds_count 0" in registry.render()
+
+
+def test_timed_lock_observes_each_acquire():
+    registry = Registry()
+    waits = registry.histogram("sigm_lock_wait_seconds", "Lock waits")
+    lock = timed_lock(threading.Lock(), waits)
+
+    assert isinstance(lock, TimedLock)
+    with lock:
+        pass
+    with lock:
+        pass
+    assert "sigm_lock_wait_seconds_count 2" in registry.render()
+
+
+def test_metrics_endpoint_serves_the_text_format(client):
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert "# TYPE sigm_history_entries gauge" in response.get_data(as_text=True)
@@ -0,0 +1,38 @@
+from clock import VirtualClock
+from poll_scheduler import PollScheduler
+
+
+def make_scheduler(poll, targets, **kwargs):
+    clock = VirtualClock(0)
+    scheduler = PollScheduler(poll, targets, min_interval=60, max_interval=3600, initial_interval=300,
+                              backoff=2, jitter=0, clock=clock.monotonic, sleep=clock.sleep, **kwargs)
+    return scheduler, clock
+
+
+def test_intervals_shrink_for_active_accounts_and_grow_for_quiet_ones():
+    scheduler, _ = make_scheduler(lambda username: (1 if username == "busy" else 0, 1), ["busy", "quiet"])
+    for _ in range(4):
+        scheduler.run_once()
+
+    # busy is polled three times (300 -> 150 -> 75 -> 60, the minimum), quiet once
+    intervals = {target["username"]: target["interval"] for target in scheduler.snapshot()}
+    assert intervals == {"busy": 60, "quiet": 600}
+
+
+def test_requests_are_spread_over_the_shared_budget():
+    polled = []
+    scheduler, clock = make_scheduler(lambda username: (polled.append((username, clock.time())) or 0, 3),
+                                      ["a", "b", "c"], request_budget=60, budget_window=60)
+    for _ in range(3):
+        scheduler.run_once()
+
+    # One request a second: each poll used three, so the next waits three seconds
+    assert [t for _, t in polled] == [0, 3, 6]
+
+
+def test_removed_accounts_are_not_polled():
+    polled = []
+    scheduler, _ = make_scheduler(lambda username: (polled.append(username) or 0, 1), ["a", "b"])
+    scheduler.remove_target("a")
+    scheduler.run_once()
+    assert polled == ["b"]
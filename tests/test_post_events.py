@@ -0,0 +1,24 @@
+import random
+from datetime import datetime
+
+from clock import VirtualClock
+from post_events import PostEvent, SimulatedPostSource
+
+
+def test_events_take_their_time_from_the_clock():
+    clock = VirtualClock(datetime(2026, 1, 5, 12))
+    assert PostEvent("post-1", "hello", clock=clock).created_at == "2026-01-05T12:00:00"
+    assert PostEvent("post-1", "hello", created_at="2025-12-31T09:00:00").created_at == "2025-12-31T09:00:00"
+
+
+def test_seeded_simulated_source_repeats():
+    def poll_all(seed):
+        clock = VirtualClock(datetime(2026, 1, 5, 12))
+        source = SimulatedPostSource(rng=random.Random(seed), clock=clock)
+        events = []
+        for _ in range(20):
+            events.extend(event.to_dict() for event in source.poll())
+            clock.advance(60)
+        return events
+
+    assert poll_all(5) == poll_all(5)
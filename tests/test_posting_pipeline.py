@@ -0,0 +1,77 @@
+import random
+import time
+from datetime import datetime
+
+from clock import VirtualClock
+from comment_service import CommentService, PostError
+from data_store import DataStore
+from posting_pipeline import PostingPipeline
+
+
+class FailingService(CommentService):
+    def _send(self, post_id, comment_content):
+        raise PostError("busy", retryable=True)
+
+
+def run_failing_job(seed):
+    clock = VirtualClock(datetime(2026, 1, 5, 12))
+    store = DataStore(sample_data=False, clock=clock)
+    pipeline = PostingPipeline(FailingService(store), workers=1, max_attempts=4, base_delay=60, max_delay=600,
+                               rng=random.Random(seed))
+    try:
+        pipeline.submit("post-1", "hello", rule_id="rule-1")
+        pipeline.join()
+    finally:
+        pipeline.stop()
+    return clock, pipeline.dead_letters()
+
+
+def test_backoff_runs_on_the_clock_and_a_seeded_rng():
+    started = time.perf_counter()
+    clock, dead_letters = run_failing_job(seed=3)
+    # Three backoffs of up to 60, 120 and 240 seconds, simulated rather than waited for
+    assert time.perf_counter() - started < 5
+
+    assert len(dead_letters) == 1
+    assert dead_letters[0]["attempts"] == 4
+    assert dead_letters[0]["failed_at"] == clock.now().isoformat()
+    assert clock.now() > datetime(2026, 1, 5, 12)
+
+    repeated_clock, _ = run_failing_job(seed=3)
+    assert repeated_clock.time() == clock.time()
+
+
+class FlakyService(CommentService):
+    """Fails each post's first attempt with a retryable error, and posts "spam" never"""
+
+    def __init__(self, data_store):
+        super().__init__(data_store)
+        self.attempts = {}
+
+    def _send(self, post_id, comment_content):
+        self.attempts[post_id] = self.attempts.get(post_id, 0) + 1
+        if comment_content == "spam":
+            raise PostError("rejected")
+        if self.attempts[post_id] == 1:
+            raise PostError("busy", retryable=True)
+        return self.clock.unique_id("comment")
+
+
+def test_retries_post_once_and_rejections_are_dead_lettered():
+    store = DataStore(sample_data=False, clock=VirtualClock(datetime(2026, 1, 5, 12)))
+    service = FlakyService(store)
+    pipeline = PostingPipeline(service, workers=2, base_delay=1, rng=random.Random(1))
+    try:
+        pipeline.submit("post-1", "hello", rule_id="rule-1")
+        pipeline.submit("post-2", "spam", rule_id="rule-1")
+        pipeline.join()
+        # Same rule and post: the idempotency key has already posted
+        pipeline.submit("post-1", "hello", rule_id="rule-1")
+        pipeline.join()
+    finally:
+        pipeline.stop()
+
+    assert service.attempts == {"post-1": 2, "post-2": 1}
+    assert pipeline.counts == {"submitted": 3, "posted": 1, "retried": 1, "failed": 1, "duplicate": 1}
+    assert [job["post_id"] for job in pipeline.dead_letters()] == ["post-2"]
+    assert sorted(entry["status"] for entry in store.get_comment_history()) == ["error", "success"]
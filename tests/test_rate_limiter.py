@@ -0,0 +1,127 @@
+import bot as bot_module
+from bot import Bot
+from clock import VirtualClock
+from comment_service import CommentService, PostError
+from data_store import DataStore
+from posting_pipeline import PostingPipeline
+from rate_limiter import RateLimiter
+
+
+def test_unset_global_limit_is_unlimited():
+    limiter = RateLimiter(global_per_hour=None, clock=VirtualClock(0))
+    assert limiter.has_capacity()
+    assert limiter.try_acquire() == (True, None)
+
+
+def test_release_gives_back_every_scope():
+    limiter = RateLimiter(global_per_hour=1, per_rule_per_hour=1, per_target_per_hour=1, clock=VirtualClock(0))
+    assert limiter.try_acquire(rule_id="r", target="t") == (True, None)
+    assert not limiter.has_capacity()
+
+    limiter.release(rule_id="r", target="t")
+    assert limiter.has_capacity()
+    assert limiter.try_acquire(rule_id="r", target="t") == (True, None)
+
+    # Never beyond capacity
+    limiter.release(rule_id="r", target="t")
+    limiter.release(rule_id="r", target="t")
+    assert limiter.try_acquire(rule_id="r", target="t") == (True, None)
+    assert limiter.try_acquire(rule_id="r", target="t") == (False, "global")
+
+
+class RejectingService(CommentService):
+    def send_comment(self, post_id, comment_content):
+        raise PostError("rejected")
+
+
+def test_refused_post_keeps_its_token_and_cooldown():
+    store = DataStore(sample_data=False, clock=VirtualClock(0))
+    bot = Bot(store, RejectingService(store))
+    bot.rate_limiter.configure(1)
+    rule = {"id": "rule-1", "target_account": "someone", "cooldown_minutes": 0}
+
+    success, _ = bot._post_comment(rule, {"id": "template-1"}, "post-1", "hello")
+    assert not success
+    # The platform saw the request, so it counts against the limits
+    assert not bot.rate_limiter.has_capacity()
+
+
+def test_post_turned_away_by_a_full_queue_refunds_its_token_and_cooldown(monkeypatch):
+    monkeypatch.setattr(bot_module, "PIPELINE_SUBMIT_TIMEOUT", 0.01)
+    store = DataStore(sample_data=False, clock=VirtualClock(0))
+    service = CommentService(store)
+    pipeline = PostingPipeline(service, workers=0, max_queue=1)
+    bot = Bot(store, service, pipeline=pipeline)
+    bot.rate_limiter.configure(2)
+    rule = {"id": "rule-1", "cooldown_minutes": 60}
+    bot.rule_scheduler.set_rule(rule)
+
+    assert bot._post_comment(rule, {"id": "template-1"}, "post-1", "hello")[0]
+    bot.rule_scheduler.release("rule-1", 0)
+    assert bot._post_comment(rule, {"id": "template-1"}, "post-2", "hello") == (False, "Posting queue is full")
+
+    assert bot.rate_limiter.has_capacity()
+    assert bot.rule_scheduler.claim("rule-1") is not None
+
+
+class HeaderService(CommentService):
+    def __init__(self, data_store, remaining):
+        super().__init__(data_store)
+        self.remaining = remaining
+
+    def _send(self, post_id, comment_content):
+        self.remaining -= 1
+        self.report_headers({"x-rate-limit-remaining": str(self.remaining), "x-rate-limit-reset": "600"})
+        return self.clock.unique_id("comment")
+
+
+def test_successful_responses_close_the_platform_scope_before_it_refuses():
+    store = DataStore(sample_data=False, clock=VirtualClock(0))
+    bot = Bot(store, HeaderService(store, remaining=3))
+    rule = {"id": "rule-1", "cooldown_minutes": 0}
+
+    assert bot._post_comment(rule, {"id": "template-1"}, "post-1", "hello")[0]
+    assert bot._post_comment(rule, {"id": "template-1"}, "post-2", "hello")[0]
+    # One left, which is the headroom
+    assert bot._post_comment(rule, {"id": "template-1"}, "post-3", "hello") == (False, "Rate limit reached (platform)")
+
+
+def test_each_scope_limits_independently_and_refills_over_time():
+    clock = VirtualClock(0)
+    limiter = RateLimiter(global_per_hour=10, per_rule_per_hour=2, per_target_per_hour=3,
+                          per_platform_per_hour={"twitter": 4}, clock=clock)
+
+    assert limiter.try_acquire(rule_id="a", target="@x", platform="twitter") == (True, None)
+    assert limiter.try_acquire(rule_id="a", target="@x", platform="twitter") == (True, None)
+    assert limiter.try_acquire(rule_id="a", target="@x", platform="twitter") == (False, "rule")
+    assert limiter.try_acquire(rule_id="b", target="@x", platform="twitter") == (True, None)
+    assert limiter.try_acquire(rule_id="c", target="@x", platform="twitter") == (False, "target")
+    assert limiter.try_acquire(rule_id="c", target="@y", platform="twitter") == (True, None)
+    assert limiter.try_acquire(rule_id="d", target="@z", platform="twitter") == (False, "platform")
+
+    # A refused post takes nothing from the scopes that had room
+    assert limiter.try_acquire(rule_id="d", target="@z") == (True, None)
+    buckets = {(bucket["scope"], bucket["key"]): bucket["available"] for bucket in limiter.snapshot()}
+    assert buckets[("global", None)] == 5
+
+    # Rule "a" earns back one token every 30 minutes
+    clock.advance(1800)
+    assert limiter.try_acquire(rule_id="a") == (True, None)
+    assert limiter.try_acquire(rule_id="a") == (False, "rule")
+
+
+def test_per_rule_overrides_and_reconfiguring_keep_spent_tokens():
+    clock = VirtualClock(0)
+    limiter = RateLimiter(global_per_hour=None, per_rule_per_hour=5, clock=clock)
+
+    assert limiter.try_acquire(rule_id="a", rule_limit=1) == (True, None)
+    assert limiter.try_acquire(rule_id="a", rule_limit=1) == (False, "rule")
+
+    limiter.configure(global_per_hour=3)
+    limiter.record_usage(2)
+    assert limiter.try_acquire(rule_id="b") == (True, None)
+    assert not limiter.has_capacity()
+
+    limiter.configure(global_per_hour=5)
+    assert limiter.has_capacity()
+    assert limiter.try_acquire(rule_id="b") == (True, None)
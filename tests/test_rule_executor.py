@@ -0,0 +1,97 @@
+import threading
+import time
+from datetime import datetime
+
+from clock import VirtualClock
+from post_events import PostEvent
+from rule_executor import RuleExecutor
+from rule_index import RuleMatch
+
+
+def test_run_summary_uses_the_executor_clock():
+    start = datetime(2024, 1, 1, 12, 0)
+    executor = RuleExecutor(max_workers=2, clock=VirtualClock(start))
+    try:
+        stats = executor.run([{"id": "a"}, {"id": "b"}], lambda rule: None)
+    finally:
+        executor.shutdown()
+    assert stats["finished_at"] == start.isoformat()
+    assert stats["rules_processed"] == 2
+
+
+def test_matches_for_one_rule_never_run_at_once():
+    executor = RuleExecutor(max_workers=4)
+    lock = threading.Lock()
+    running = {"rule-1": 0, "rule-2": 0}
+    overlap = []
+    handled = []
+
+    def handler(match):
+        rule_id, post_id = match.rule["id"], match.event.post_id
+        with lock:
+            running[rule_id] += 1
+            overlap.append(running[rule_id])
+        time.sleep(0.05)
+        with lock:
+            running[rule_id] -= 1
+            handled.append(post_id)
+
+    matches = [RuleMatch({"id": rule_id}, PostEvent(post_id, "text"))
+               for rule_id, post_id in [("rule-1", "post-1"), ("rule-1", "post-2"), ("rule-2", "post-1")]]
+    try:
+        stats = executor.run(matches, handler, key=lambda match: match.key)
+    finally:
+        executor.shutdown()
+
+    # Both posts are handled, one after the other
+    assert sorted(handled) == ["post-1", "post-1", "post-2"]
+    assert max(overlap) == 1
+    assert stats["rules_processed"] == 2
+    assert stats["rules_skipped"] == 0
+
+
+def test_different_rules_run_concurrently_and_errors_stay_contained():
+    executor = RuleExecutor(max_workers=3)
+    # Only passes if all three handlers are running at the same time
+    barrier = threading.Barrier(3, timeout=5)
+    handled = []
+
+    def handler(rule):
+        barrier.wait()
+        if rule["id"] == "broken":
+            raise RuntimeError("template missing")
+        handled.append(rule["id"])
+
+    try:
+        stats = executor.run([{"id": "a"}, {"id": "b"}, {"id": "broken"}], handler)
+    finally:
+        executor.shutdown()
+
+    assert sorted(handled) == ["a", "b"]
+    assert stats["rules_processed"] == 3
+    assert stats["concurrency"] == 3
+    assert {slow["rule_id"] for slow in stats["slowest_rules"]} == {"a", "b", "broken"}
+
+
+def test_rule_still_running_from_an_earlier_run_is_skipped():
+    executor = RuleExecutor(max_workers=2)
+    started, release = threading.Event(), threading.Event()
+
+    def slow(rule):
+        started.set()
+        release.wait(5)
+
+    first = threading.Thread(target=executor.run, args=([{"id": "a"}], slow))
+    first.start()
+    try:
+        assert started.wait(5)
+        assert executor.is_running("a")
+        stats = executor.run([{"id": "a"}, {"id": "b"}], lambda rule: None)
+    finally:
+        release.set()
+        first.join(5)
+        executor.shutdown()
+
+    assert stats["rules_processed"] == 1
+    assert stats["rules_skipped"] == 1
+    assert not executor.is_running("a")
@@ -0,0 +1,39 @@
+from data_store import DataStore
+from post_events import PostEvent
+
+
+def add_rule(store, name, **fields):
+    template_id = store.add_template({"name": name, "content": "Nice!", "variables": []})
+    return store.add_rule(dict({"name": name, "template_id": template_id, "enabled": True}, **fields))
+
+
+def dispatched(store, content, author=None):
+    return {rule["name"]: keywords for rule, keywords in store.dispatch_event(PostEvent("p1", content, author=author))}
+
+
+def test_events_reach_only_the_rules_they_match():
+    store = DataStore(sample_data=False)
+    add_rule(store, "any post", trigger_type="new_post")
+    add_rule(store, "from alice", trigger_type="new_post", target_account="@Alice")
+    add_rule(store, "help", trigger_type="keyword", trigger_keywords=["help", "question"])
+    add_rule(store, "scheduled", trigger_type="scheduled", schedule="0 9 * * *")
+    add_rule(store, "disabled", trigger_type="keyword", trigger_keywords=["help"], enabled=False)
+
+    assert dispatched(store, "Just shipped") == {"any post": []}
+    assert dispatched(store, "Quick question, any HELP?", author="alice") == {
+        "any post": [], "from alice": [], "help": ["question", "help"]}
+
+
+def test_rule_changes_reindex_it():
+    store = DataStore(sample_data=False)
+    rule_id = add_rule(store, "help", trigger_type="keyword", trigger_keywords=["help"])
+    rule = store.get_rule(rule_id)
+
+    store.update_rule(rule_id, dict(rule, trigger_keywords=["support"]))
+    assert dispatched(store, "help") == {}
+    assert dispatched(store, "support") == {"help": ["support"]}
+
+    store.update_rule(rule_id, dict(store.get_rule(rule_id), enabled=False))
+    assert dispatched(store, "support") == {}
+    store.delete_rule(rule_id)
+    assert len(store.rule_index) == 0
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+import pytest
+
+from clock import VirtualClock
+from rule_scheduler import DEFAULT_SCHEDULE_INTERVAL, CronError, CronExpression, RuleScheduler
+
+
+def test_cron_next_after():
+    start = datetime(2026, 1, 5, 8, 30, 15)  # a Monday
+    assert CronExpression("*/15 9-17 * * 1-5").next_after(start) == datetime(2026, 1, 5, 9, 0)
+    assert CronExpression("@daily").next_after(start) == datetime(2026, 1, 6, 0, 0)
+    assert CronExpression("0 12 * * 0").next_after(start) == datetime(2026, 1, 11, 12, 0)
+    # Both day fields restricted: either matches
+    assert CronExpression("0 0 1 * 3").next_after(start) == datetime(2026, 1, 7, 0, 0)
+    assert CronExpression("0 0 29 2 *").next_after(start) == datetime(2028, 2, 29, 0, 0)
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "*/0 * * * *", "a * * * *", "0 0 31 2 *"])
+def test_bad_cron_expressions(expression):
+    with pytest.raises(CronError):
+        CronExpression(expression).next_after(datetime(2026, 1, 5))
+
+
+def test_cooldown_claims_and_releases():
+    clock = VirtualClock(0)
+    scheduler = RuleScheduler(clock=clock.time)
+    scheduler.set_cooldown("r1", 10)
+
+    assert scheduler.claim("r1") == 0
+    assert scheduler.claim("r1") is None
+    assert scheduler.cooldown_remaining("r1") == 600
+    clock.advance(600)
+    assert scheduler.is_eligible("r1")
+
+    previous = scheduler.claim("r1")
+    scheduler.release("r1", previous)
+    assert scheduler.claim("r1") is not None
+
+
+def test_scheduled_rules_fire_from_the_heap():
+    clock = VirtualClock(datetime(2026, 1, 5, 8, 59).timestamp())
+    scheduler = RuleScheduler(clock=clock.time)
+    scheduler.set_rule({"id": "cron", "trigger_type": "scheduled", "schedule": "0 9 * * *"})
+    scheduler.set_rule({"id": "interval", "trigger_type": "scheduled"})
+    scheduler.set_rule({"id": "event", "trigger_type": "keyword"})
+
+    assert scheduler.pop_due() == ["interval"]
+    assert scheduler.next_due() == clock.time() + 60
+    clock.advance(60)
+    assert scheduler.pop_due() == ["cron"]
+    clock.advance(DEFAULT_SCHEDULE_INTERVAL)
+    assert scheduler.pop_due() == ["interval"]
+
+    scheduler.remove_rule("cron")
+    clock.advance(24 * 3600)
+    assert scheduler.pop_due() == ["interval"]
@@ -0,0 +1,78 @@
+import gzip
+import json
+
+from werkzeug.http import parse_accept_header
+
+import serialization
+from serialization import MIN_COMPRESS_SIZE, ResponseCache, compress, dumps, loads, negotiate_encoding
+from snapshots import freeze
+
+
+def test_dumps_is_compact_utf8_keeping_key_order():
+    data = dumps({"b": 1, "a": ["서명", None]})
+
+    assert data == '{"b":1,"a":["서명",null]}'.encode("utf-8")
+    assert loads(data) == {"b": 1, "a": ["서명", None]}
+    assert json.loads(dumps(freeze({"keywords": ["a"]}))) == {"keywords": ["a"]}
+
+
+def test_negotiate_encoding_follows_the_accept_header():
+    assert negotiate_encoding(parse_accept_header("gzip, deflate")) == "gzip"
+    assert negotiate_encoding(parse_accept_header("identity")) is None
+    assert negotiate_encoding(parse_accept_header("gzip;q=0")) is None
+    expected = "br" if "br" in serialization.COMPRESSORS else "gzip"
+    assert negotiate_encoding(parse_accept_header("gzip, br")) == expected
+
+
+def test_small_bodies_are_not_compressed():
+    assert compress(b"x" * (MIN_COMPRESS_SIZE - 1), "gzip") is None
+    body = b"x" * MIN_COMPRESS_SIZE
+    assert gzip.decompress(compress(body, "gzip")) == body
+
+
+def test_cache_builds_once_per_version_and_drops_the_oldest():
+    cache = ResponseCache(max_entries=2)
+    builds = []
+
+    def build(value):
+        return lambda: builds.append(value) or {"value": value}
+
+    first = cache.get("rules", 1, build("a"))
+    assert cache.get("rules", 1, build("b")) is first
+    assert loads(first.data) == {"value": "a"}
+    assert first.compressed("gzip") is first.compressed("gzip")
+
+    assert loads(cache.get("rules", 2, build("c")).data) == {"value": "c"}
+    cache.get("templates", 1, build("d"))
+    cache.get("settings", 1, build("e"))
+    assert len(cache) == 2
+    cache.get("rules", 2, build("f"))
+    assert builds == ["a", "c", "d", "e", "f"]
+
+
+def test_api_responses_are_gzipped_for_clients_that_accept_it(client, app_module):
+    store = app_module.data_store
+    template_ids = [store.add_template({"name": f"Padding {i}", "content": "Long enough to compress " * 20,
+                                        "variables": []}) for i in range(3)]
+    try:
+        plain = client.get("/api/templates")
+        response = client.get("/api/templates", headers={"Accept-Encoding": "gzip"})
+
+        assert plain.headers.get("Content-Encoding") is None
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert json.loads(gzip.decompress(response.get_data())) == plain.get_json()
+    finally:
+        for template_id in template_ids:
+            store.delete_template(template_id)
+
+
+def test_cached_responses_change_with_the_data(client, app_module):
+    store = app_module.data_store
+    before = client.get("/api/settings").get_json()
+    limit = before["max_comments_per_hour"]
+    try:
+        store.update_settings({"max_comments_per_hour": limit + 1})
+        assert client.get("/api/settings").get_json()["max_comments_per_hour"] == limit + 1
+    finally:
+        store.update_settings({"max_comments_per_hour": limit})
@@ -0,0 +1,28 @@
+import pytest
+
+from data_store import DataStore, SettingsError
+
+
+def test_invalid_settings_are_rejected_without_changing_anything():
+    store = DataStore(sample_data=False)
+    before = store.get_settings()
+
+    for bad in ({"history_hot_size": None}, {"history_hot_size": "many"}, {"max_concurrent_rules": 0},
+                {"history_archive_days": 1.5}, {"max_comments_per_hour": True},
+                {"max_comments_per_hour": None}, None):
+        with pytest.raises(SettingsError):
+            store.update_settings(bad)
+    assert store.get_settings() == before
+
+    # The store still resizes and saves normally afterwards
+    assert store.update_settings({"history_hot_size": "20", "max_comments_per_rule_per_hour": None})
+    assert store.get_settings()["history_hot_size"] == 20
+    assert store.get_settings()["max_comments_per_rule_per_hour"] is None
+    assert store.comment_history.max_size == 20
+
+
+def test_batch_settings_updates_are_validated():
+    store = DataStore(sample_data=False)
+    results = store.apply_config_batch([{"op": "update", "kind": "settings", "data": {"history_hot_size": None}}])
+    assert results[0]["status"] == "error"
+    assert store.get_settings()["history_hot_size"] == 1000
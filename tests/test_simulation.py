@@ -0,0 +1,66 @@
+import random
+import time
+from datetime import datetime
+
+from bot import Bot
+from clock import VirtualClock, new_uuid
+from comment_service import CommentService
+from data_store import DataStore
+from post_events import SimulatedPostSource
+from simulation import Simulation
+
+START = datetime(2026, 1, 5)
+
+
+def test_virtual_clock_only_moves_forward_when_told():
+    clock = VirtualClock(START)
+    clock.sleep(30)
+    clock.advance_to(START.timestamp())
+
+    assert clock.now() == datetime(2026, 1, 5, 0, 0, 30)
+    assert clock.monotonic() == clock.time()
+    ids = [clock.unique_id("post") for _ in range(3)]
+    assert len(set(ids)) == 3
+
+
+def test_seeded_uuids_repeat():
+    assert new_uuid(random.Random(1)) == new_uuid(random.Random(1))
+    assert new_uuid(random.Random(1)) != new_uuid(random.Random(2))
+
+
+def simulate(seed, hours=12):
+    clock = VirtualClock(START)
+    store = DataStore(sample_data=False, clock=clock, rng=random.Random(seed))
+    store.update_settings({"max_concurrent_rules": 1, "max_comments_per_rule_per_hour": 2})
+    template_id = store.add_template({"name": "Thanks", "content": "Thanks for sharing!", "variables": []})
+    store.add_rule({"name": "Every post", "template_id": template_id, "trigger_type": "new_post",
+                    "trigger_keywords": [], "enabled": True, "cooldown_minutes": 30})
+
+    source = SimulatedPostSource(probability=0.5, rng=random.Random(seed + 1), clock=clock)
+    bot = Bot(store, CommentService(store), sources=[source])
+    started = time.perf_counter()
+    summary = Simulation(bot, clock, tick_interval=300).run(hours * 3600)
+    history = [(entry["id"], entry["timestamp"], entry["status"]) for entry in store.get_comment_history()]
+    return summary, history, clock, time.perf_counter() - started
+
+
+def test_simulation_fast_forwards_in_virtual_time():
+    summary, history, clock, wall_seconds = simulate(seed=7)
+
+    assert clock.now() == datetime(2026, 1, 5, 12)
+    # Every five minutes, counting both ends of the run
+    assert summary["ticks"] == 12 * 12 + 1
+    assert summary["events"] > 0 and history
+    assert wall_seconds < 60
+    # The 30 minute cooldown holds in simulated time; entries are stamped
+    # after the simulated posting delay, so allow a little under it
+    posted = sorted(datetime.fromisoformat(timestamp) for _, timestamp, status in history if status == "success")
+    assert all((later - earlier).total_seconds() >= 1790 for earlier, later in zip(posted, posted[1:]))
+
+
+def test_seeded_simulations_repeat_exactly():
+    first, first_history, _, _ = simulate(seed=11)
+    second, second_history, _, _ = simulate(seed=11)
+
+    assert first_history == second_history
+    assert first["outcomes"] == second["outcomes"]
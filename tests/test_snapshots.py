@@ -0,0 +1,67 @@
+import json
+import pickle
+
+import pytest
+
+from data_store import DataStore
+from snapshots import ConfigSnapshot, FrozenDict, freeze
+
+
+def test_freeze_is_deep_and_read_only():
+    frozen = freeze({"name": "Rule", "keywords": ["a", "b"], "values": {"project": "siGM"}})
+
+    assert isinstance(frozen, FrozenDict)
+    assert frozen["keywords"] == ("a", "b")
+    for change in (lambda: frozen.update(name="x"), lambda: frozen.pop("name"),
+                   lambda: frozen["values"].__setitem__("project", "x"), lambda: frozen.clear()):
+        with pytest.raises(TypeError):
+            change()
+    with pytest.raises(TypeError):
+        frozen["name"] = "x"
+
+    # Still a dict for JSON and pickling, and dict() gives an editable copy
+    assert json.loads(json.dumps(frozen))["keywords"] == ["a", "b"]
+    assert pickle.loads(pickle.dumps(frozen)) == frozen
+    copy = dict(frozen)
+    copy["name"] = "Edited"
+    assert frozen["name"] == "Rule"
+
+
+def test_replace_builds_the_next_version_sharing_unchanged_parts():
+    first = ConfigSnapshot(1, {"t1": freeze({"id": "t1"})}, {}, {"enabled": True})
+    second = first.replace(rules={"r1": freeze({"id": "r1"})})
+
+    assert second.version == 2
+    assert second.templates is first.templates
+    assert second.settings is first.settings
+    assert first.rule_list == () and len(second.rule_list) == 1
+
+
+def test_readers_keep_the_version_they_took():
+    store = DataStore(sample_data=False)
+    template_id = store.add_template({"name": "Hi", "content": "Hi {name}", "variables": ["name"]})
+    rule_id = store.add_rule({"name": "Rule", "template_id": template_id, "trigger_type": "new_post",
+                              "trigger_keywords": [], "enabled": True})
+    before = store.snapshot()
+
+    store.update_rule(rule_id, dict(store.get_rule(rule_id), enabled=False))
+    store.update_settings({"max_comments_per_hour": 5})
+    store.delete_template(template_id)
+
+    assert before.rules[rule_id]["enabled"] is True
+    assert before.settings["max_comments_per_hour"] != 5
+    assert template_id in before.templates
+    after = store.snapshot()
+    assert after.version > before.version
+    assert after.rules[rule_id]["enabled"] is False
+    assert store.get_rules() is after.rule_list
+
+
+def test_returned_objects_cannot_be_edited_in_place():
+    store = DataStore(sample_data=False)
+    template_id = store.add_template({"name": "Hi", "content": "Hi", "variables": []})
+
+    with pytest.raises(TypeError):
+        store.get_template(template_id)["content"] = "Changed"
+    with pytest.raises(TypeError):
+        store.get_settings()["enabled"] = False
@@ -0,0 +1,55 @@
+import pytest
+
+from data_store import DataStore
+from storage import MemoryBackend, SQLiteBackend, create_backend
+
+
+def test_sqlite_store_survives_a_restart(tmp_path):
+    path = str(tmp_path / "sigm.db")
+    store = DataStore(SQLiteBackend(path), sample_data=False)
+    template_id = store.add_template({"name": "Thanks", "content": "Thanks {name}!", "variables": ["name"]})
+    rule_id = store.add_rule({"name": "Reply", "template_id": template_id, "trigger_type": "new_post",
+                              "enabled": True})
+    store.update_settings({"max_comments_per_hour": 25})
+    for i in range(250):
+        store.add_comment_history({"post_id": f"p{i}", "comment_id": f"c{i}", "content": "x",
+                                   "rule_id": rule_id, "template_id": template_id, "status": "success"})
+    store.update_comment_status("c10", "error")
+    deleted = store.get_comment_history()[0]["id"]
+    store.delete_comment_history(deleted)
+    store.backend.close()
+
+    reopened = DataStore(SQLiteBackend(path), sample_data=False)
+    try:
+        assert reopened.get_template(template_id)["name"] == "Thanks"
+        assert reopened.get_rule(rule_id)["template_id"] == template_id
+        assert reopened.get_settings()["max_comments_per_hour"] == 25
+        history = reopened.get_comment_history()
+        assert len(history) == 249
+        assert deleted not in {entry["id"] for entry in history}
+        assert reopened.comment_history.get_by_comment_id("c10")["status"] == "error"
+    finally:
+        reopened.backend.close()
+
+
+def test_history_writes_are_batched_off_the_caller(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "sigm.db"), batch_size=50)
+    try:
+        for i in range(120):
+            backend.save_history({"id": f"h{i:03d}", "timestamp": f"2026-01-05T12:{i // 60:02d}:{i % 60:02d}",
+                                  "status": "success"})
+        backend.flush()
+        assert len(backend.load_history("2026-01-01", 1000)) == 120
+        # The newest entries, returned oldest first
+        assert [entry["id"] for entry in backend.load_history("2026-01-01", 2)] == ["h118", "h119"]
+    finally:
+        backend.close()
+
+
+def test_create_backend_from_url(tmp_path):
+    assert isinstance(create_backend(None), MemoryBackend)
+    backend = create_backend(f"sqlite:///{tmp_path / 'sigm.db'}")
+    assert isinstance(backend, SQLiteBackend)
+    backend.close()
+    with pytest.raises(ValueError):
+        create_backend("mysql://localhost/sigm")
@@ -0,0 +1,36 @@
+import pytest
+
+from data_store import DataStore
+from template_compiler import TemplateError, compile_template, validate_template
+
+
+def test_render_fills_variables_and_marks_missing_ones():
+    compiled = compile_template("Hi {name}, welcome to {place}! {name}")
+    assert compiled.variables == ("name", "place")
+    assert compiled.render({"name": "Ann", "place": "SIGN"}) == "Hi Ann, welcome to SIGN! Ann"
+    assert compiled.render({"name": "Ann"}) == "Hi Ann, welcome to [place]! Ann"
+    assert compile_template("No variables").render({}) == "No variables"
+
+
+def test_validate_checks_declared_variables():
+    template = {"content": "Hi {name}"}
+    validate_template(template)
+    assert template["variables"] == ["name"]
+
+    with pytest.raises(TemplateError, match="undeclared variables"):
+        validate_template({"content": "Hi {name}", "variables": []})
+    with pytest.raises(TemplateError, match="declared but unused"):
+        validate_template({"content": "Hi", "variables": ["name"]})
+
+
+def test_store_reuses_compiled_templates_until_they_change():
+    store = DataStore(sample_data=False)
+    template_id = store.add_template({"name": "Greeting", "content": "Hi {name}", "variables": ["name"]})
+
+    first = store.get_compiled_template(store.get_template(template_id))
+    assert store.get_compiled_template(store.get_template(template_id)) is first
+
+    store.update_template(template_id, {"name": "Greeting", "content": "Hello {name}", "variables": ["name"]})
+    updated = store.get_compiled_template(store.get_template(template_id))
+    assert updated is not first
+    assert updated.render({"name": "Ann"}) == "Hello Ann"
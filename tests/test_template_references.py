@@ -0,0 +1,16 @@
+from data_store import DataStore
+
+
+def test_templates_in_use_report_their_rules_and_are_kept():
+    store = DataStore(sample_data=False)
+    template_id = store.add_template({"name": "Thanks", "content": "Thanks {name}!", "variables": ["name"]})
+    unused_id = store.add_template({"name": "Hello", "content": "Hello!", "variables": []})
+    rule_ids = sorted(store.add_rule({"name": f"Rule {i}", "template_id": template_id, "trigger_type": "new_post",
+                                      "enabled": True}) for i in range(2))
+
+    assert store.rules_using_template(template_id) == rule_ids
+    assert not store.delete_template(template_id)
+    assert store.get_template(template_id) is not None
+
+    assert store.rules_using_template(unused_id) == []
+    assert store.delete_template(unused_id)
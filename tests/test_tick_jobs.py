@@ -0,0 +1,66 @@
+import threading
+from datetime import datetime
+
+from clock import VirtualClock
+from tick_jobs import FINISHED, TickCoordinator
+
+
+def test_jobs_are_stamped_with_the_coordinator_clock():
+    clock = VirtualClock(datetime(2026, 1, 5, 12))
+    coordinator = TickCoordinator(lambda: clock.advance(90) or {"events": 0}, clock=clock)
+    try:
+        job, coalesced = coordinator.request()
+        assert not coalesced
+        assert coordinator.wait(job, timeout=5)
+    finally:
+        coordinator.stop()
+
+    assert job.status == FINISHED
+    assert job.submitted_at == "2026-01-05T12:00:00"
+    assert job.started_at == "2026-01-05T12:00:00"
+    assert job.finished_at == "2026-01-05T12:01:30"
+    assert job.duration == 90
+
+
+def test_requests_while_a_job_is_queued_are_coalesced():
+    started, release = threading.Event(), threading.Event()
+
+    def run_tick():
+        started.set()
+        release.wait(5)
+        return {"events": 0}
+
+    coordinator = TickCoordinator(run_tick)
+    try:
+        first, _ = coordinator.request()
+        assert started.wait(5)
+
+        # The first tick is running: the next request queues one follow-up
+        # and every request after that joins it
+        second, coalesced = coordinator.request()
+        assert not coalesced and second is not first
+        third, coalesced = coordinator.request()
+        assert coalesced and third is second
+        assert second.coalesced == 1
+
+        release.set()
+        assert coordinator.wait(second, timeout=5)
+    finally:
+        release.set()
+        coordinator.stop()
+
+    assert first.status == second.status == FINISHED
+    assert [job.id for job in coordinator.recent()] == [second.id, first.id]
+
+
+def test_run_now_returns_a_job_handle(client, app_module):
+    response = client.post("/api/run-now")
+
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body["success"] and body["job_id"]
+    assert body["status"] in ("queued", "running", "finished")
+
+    job = app_module.tick_coordinator.get(body["job_id"])
+    app_module.tick_coordinator.wait(job, timeout=10)
+    assert client.get(f"/api/jobs/{body['job_id']}").get_json()["id"] == body["job_id"]
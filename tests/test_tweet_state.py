@@ -0,0 +1,32 @@
+from tweet_state import PollState, RepliedSet
+
+
+def test_cursors_and_replies_survive_a_restart(tmp_path):
+    path = str(tmp_path / "state.json")
+    state = PollState(path)
+    state.advance("alice", 100)
+    state.advance("alice", 90)
+    state.mark_replied(95)
+    state.save()
+
+    reloaded = PollState(path)
+    assert reloaded.get_cursor("alice") == 100
+    assert reloaded.get_cursor("bob") is None
+    assert reloaded.has_replied(95)
+    assert not reloaded.has_replied(96)
+
+
+def test_unreadable_state_starts_empty(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text("{not json")
+    state = PollState(str(path))
+    assert state.get_cursor("alice") is None
+
+
+def test_replied_set_drops_the_oldest_ids_when_full():
+    replied = RepliedSet([5, 1, 3], max_size=3)
+    replied.add(3)
+    replied.add(7)
+    assert replied.to_list() == [3, 5, 7]
+    assert 1 not in replied
+    assert len(replied) == 3
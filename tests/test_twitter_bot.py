@@ -0,0 +1,40 @@
+import pytest
+
+pytest.importorskip("tweepy")
+pytest.importorskip("dotenv")
+
+import twitter_bot
+from tweet_state import PollState
+
+
+class Tweet:
+    def __init__(self, tweet_id):
+        self.id = tweet_id
+
+
+class FilteredTimeline:
+    """user_timeline that drops retweets after applying count, as the API does with include_rts=False"""
+
+    def __init__(self, tweet_ids, retweet_ids):
+        self.tweet_ids = sorted(tweet_ids, reverse=True)
+        self.retweet_ids = set(retweet_ids)
+        self.requests = 0
+
+    def user_timeline(self, screen_name, since_id=None, max_id=None, count=20, **kwargs):
+        self.requests += 1
+        window = [tweet_id for tweet_id in self.tweet_ids
+                  if (since_id is None or tweet_id > since_id) and (max_id is None or tweet_id <= max_id)][:count]
+        return [Tweet(tweet_id) for tweet_id in window if tweet_id not in self.retweet_ids]
+
+
+def test_short_page_from_filtered_retweets_does_not_stop_paging(tmp_path, monkeypatch):
+    timeline = FilteredTimeline(range(1, 11), retweet_ids={9})
+    monkeypatch.setattr(twitter_bot, "api", timeline)
+    monkeypatch.setattr(twitter_bot, "PAGE_SIZE", 3)
+    state = PollState(str(tmp_path / "state.json"))
+    state.advance("someone", 1)
+
+    tweets, requests = twitter_bot.fetch_new_tweets("someone", state=state)
+
+    assert [tweet.id for tweet in tweets] == [2, 3, 4, 5, 6, 7, 8, 10]
+    assert requests == timeline.requests
@@ -0,0 +1,161 @@
+import logging
+import threading
+from collections import OrderedDict
+from itertools import count
+
+from clock import SYSTEM_CLOCK
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+
+
+class TickJob:
+    """A requested bot tick and, once it has run, its timing and outcome"""
+
+    __slots__ = ("id", "trigger", "status", "submitted_at", "started_at", "finished_at",
+                 "duration", "coalesced", "result", "error")
+
+    def __init__(self, job_id, trigger, submitted_at):
+        self.id = job_id
+        self.trigger = trigger
+        self.status = QUEUED
+        self.submitted_at = submitted_at
+        self.started_at = None
+        self.finished_at = None
+        self.duration = None
+        # Number of later requests folded into this job
+        self.coalesced = 0
+        self.result = None
+        self.error = None
+
+    @property
+    def done(self):
+        return self.status in (FINISHED, FAILED)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class TickCoordinator:
+    """
+    Runs bot ticks one at a time on a background thread.
+
+    Requests are coalesced: while a job is waiting to run, further requests
+    join it, and while a tick is running, at most one follow-up job is
+    queued so changes made during the tick are still picked up. Finished
+    jobs are kept (up to `history`) so their status can be looked up by ID.
+    """
+
+    def __init__(self, run_tick, events=None, history=100, clock=None):
+        self.run_tick = run_tick
+        self.events = events
+        self.history = history
+        self.clock = clock or SYSTEM_CLOCK
+
+        self._jobs = OrderedDict()
+        self._ids = count(1)
+        self._pending = None
+        self._running = None
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def request(self, trigger="manual"):
+        """
+        Ask for a tick to run.
+
+        Returns:
+            (job, coalesced) - the job that will cover this request, and
+            whether it was folded into an already queued job
+        """
+        with self._condition:
+            if self._pending is not None:
+                self._pending.coalesced += 1
+                return self._pending, True
+
+            job = TickJob(f"tick-{next(self._ids)}", trigger, self.clock.now().isoformat())
+            self._pending = job
+            self._remember(job)
+            self._condition.notify()
+
+        self._start()
+        self._publish(job)
+        return job, False
+
+    def _remember(self, job):
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.history:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if not oldest.done:
+                break
+            del self._jobs[oldest_id]
+
+    def get(self, job_id):
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def recent(self, limit=20):
+        """Get the most recent jobs, newest first"""
+        with self._condition:
+            jobs = list(self._jobs.values())
+        return jobs[::-1][:limit]
+
+    @property
+    def running(self):
+        return self._running
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                job, self._pending = self._pending, None
+                self._running = job
+                job.status = RUNNING
+                job.started_at = self.clock.now().isoformat()
+
+            self._publish(job)
+            start = self.clock.monotonic()
+            try:
+                job.result = self.run_tick()
+                job.status = FINISHED
+            except Exception as e:
+                logger.error("Tick job %s failed: %s", job.id, e)
+                job.error = str(e)
+                job.status = FAILED
+
+            with self._condition:
+                job.duration = round(self.clock.monotonic() - start, 3)
+                job.finished_at = self.clock.now().isoformat()
+                self._running = None
+                self._condition.notify_all()
+            self._publish(job)
+
+    def _start(self):
+        with self._condition:
+            if self._thread is not None or self._stopped:
+                return
+            self._thread = threading.Thread(target=self._run, name="tick-jobs", daemon=True)
+            self._thread.start()
+
+    def wait(self, job, timeout=None):
+        """Block until a job is done; returns whether it finished in time"""
+        with self._condition:
+            return self._condition.wait_for(lambda: job.done, timeout)
+
+    def stop(self, timeout=5):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _publish(self, job):
+        if self.events is not None:
+            self.events.publish("job", job.to_dict())
@@ -0,0 +1,99 @@
+import json
+import logging
+import os
+import threading
+from array import array
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+
+class RepliedSet:
+    """
+    Bounded set of tweet IDs we have replied to, kept as a sorted int64 array.
+
+    Tweet IDs grow over time, so when the set is full the smallest (oldest)
+    IDs are dropped. Those tweets are already behind the since_id cursor and
+    will not be fetched again.
+    """
+
+    def __init__(self, ids=(), max_size=10000):
+        self.max_size = max_size
+        self._ids = array("q", sorted(set(int(i) for i in ids))[-max_size:])
+
+    def __contains__(self, tweet_id):
+        tweet_id = int(tweet_id)
+        pos = bisect_left(self._ids, tweet_id)
+        return pos < len(self._ids) and self._ids[pos] == tweet_id
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, tweet_id):
+        tweet_id = int(tweet_id)
+        pos = bisect_left(self._ids, tweet_id)
+        if pos < len(self._ids) and self._ids[pos] == tweet_id:
+            return
+        self._ids.insert(pos, tweet_id)
+        if len(self._ids) > self.max_size:
+            del self._ids[:len(self._ids) - self.max_size]
+
+    def to_list(self):
+        return self._ids.tolist()
+
+
+class PollState:
+    """
+    Per-target since_id cursors and replied tweet IDs, persisted to a JSON file
+    so a restart neither re-replies nor re-reads old tweets.
+    """
+
+    def __init__(self, path, max_replied=10000):
+        self.path = path
+        self.cursors = {}
+        self.replied = RepliedSet(max_size=max_replied)
+        self._lock = threading.Lock()
+        self._load(max_replied)
+
+    def _load(self, max_replied):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error("Could not read poll state from %s: %s", self.path, e)
+            return
+
+        self.cursors = {target: int(since_id) for target, since_id in data.get("cursors", {}).items()}
+        self.replied = RepliedSet(data.get("replied", []), max_size=max_replied)
+
+    def get_cursor(self, target):
+        with self._lock:
+            return self.cursors.get(target)
+
+    def advance(self, target, tweet_id):
+        """Move a target's cursor forward; it never moves back"""
+        with self._lock:
+            if tweet_id > self.cursors.get(target, 0):
+                self.cursors[target] = tweet_id
+
+    def mark_replied(self, tweet_id):
+        with self._lock:
+            self.replied.add(tweet_id)
+
+    def has_replied(self, tweet_id):
+        with self._lock:
+            return tweet_id in self.replied
+
+    def save(self):
+        """Write the state atomically so a crash never leaves a partial file"""
+        with self._lock:
+            data = {"cursors": dict(self.cursors), "replied": self.replied.to_list()}
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
@@ -1,8 +1,11 @@
 import os
-import time
 import tweepy
 from dotenv import load_dotenv
-from gpt_comment_generator import generate_comment
+from gpt_comment_generator import get_generator
+from rate_limiter import RateLimiter
+from tweet_state import PollState
+from poll_scheduler import PollScheduler
+from post_events import PostEvent
 
 # 🌱 환경변수 로드
 load_dotenv()
@@ -17,48 +20,178 @@ auth = tweepy.OAuth1UserHandler(
 api = tweepy.API(auth)
 
 TARGET_USERNAME = os.getenv("TARGET_USERNAME")  # .env에 @ 없이 저장
-replied_tweet_ids = set()
+# 👥 여러 계정 감시: 쉼표로 구분 (없으면 TARGET_USERNAME 하나만)
+TARGET_USERNAMES = [
+    name.strip().lstrip("@")
+    for name in os.getenv("TARGET_USERNAMES", TARGET_USERNAME or "").split(",")
+    if name.strip()
+]
 
-def fetch_my_recent_tweet():
-    try:
+# 💾 since_id 커서와 답글 단 트윗 ID를 재시작 후에도 유지
+poll_state = PollState(os.getenv("TWITTER_STATE_FILE", "twitter_state.json"))
+
+# 📄 한 페이지에 가져올 트윗 수 (user_timeline 최대 200)
+PAGE_SIZE = 200
+# 🌱 커서가 없을 때(첫 실행) 살펴볼 최근 트윗 수
+FIRST_RUN_COUNT = 5
+
+# 🚦 답글 속도 제한 (플랫폼 헤더로 429 전에 멈춤)
+rate_limiter = RateLimiter(global_per_hour=int(os.getenv("MAX_REPLIES_PER_HOUR", "10")))
+
+def fetch_new_tweets(username, state=poll_state):
+    """state의 since_id 이후 트윗을 페이지 단위로 끝까지 가져와 (오래된 순 트윗, 요청 수) 반환"""
+    since_id = state.get_cursor(username)
+    if since_id is None:
+        # 첫 실행: 과거 트윗 전체에 답글을 달지 않도록 최근 몇 개만 확인
         tweets = api.user_timeline(
-            screen_name=TARGET_USERNAME,
-            count=5,
+            screen_name=username,
+            count=FIRST_RUN_COUNT,
+            tweet_mode="extended",
+            exclude_replies=False,
+            include_rts=False
+        )
+        return sorted(tweets, key=lambda t: t.id), 1
+
+    tweets = []
+    max_id = None
+    requests = 0
+    while True:
+        requests += 1
+        page = api.user_timeline(
+            screen_name=username,
+            since_id=since_id,
+            max_id=max_id,
+            count=PAGE_SIZE,
             tweet_mode="extended",
             exclude_replies=False,
             include_rts=False
         )
+        if not page:
+            break
+        tweets.extend(page)
+        # include_rts=False는 count를 적용한 뒤 리트윗을 걸러내므로
+        # 짧은 페이지가 따라잡았다는 뜻은 아님: 빈 페이지나 커서까지 계속
+        max_id = min(t.id for t in page) - 1
+        if max_id <= since_id:
+            break
+
+    return sorted(tweets, key=lambda t: t.id), requests
+
+def poll_target(username):
+    """한 계정의 새 트윗에 답글을 달고 (새 트윗 수, API 요청 수) 반환"""
+    requests = 0
+    new_tweets = 0
+    try:
+        tweets, requests = fetch_new_tweets(username)
 
         if not tweets:
-            print("🥲 새로운 트윗 없음.")
-            return
+            print(f"🥲 @{username}: 새로운 트윗 없음.")
+            return 0, requests
 
+        pending = []
         for tweet in tweets:
-            if tweet.id in replied_tweet_ids:
-                continue
-            if tweet.in_reply_to_status_id is not None:
+            if poll_state.has_replied(tweet.id) or tweet.in_reply_to_status_id is not None:
+                # 앞선 트윗이 모두 처리된 경우에만 커서 전진
+                if not pending:
+                    poll_state.advance(username, tweet.id)
                 continue
+            pending.append(tweet)
+
+        new_tweets = len(pending)
+        if not pending:
+            return 0, requests
+
+        # 🤖 새 트윗들의 댓글을 동시에 생성 (성공한 결과는 캐시되어 재시도 시 재사용)
+        results = get_generator().generate_many([tweet.full_text for tweet in pending])
+
+        for tweet, result in zip(pending, results):
+            if not result.ok:
+                print(f"❌ 댓글 생성 실패, 다음 주기에 다시 시도: {result.error}")
+                return new_tweets, requests
+
+            allowed, scope = rate_limiter.try_acquire(target=username, platform="twitter")
+            if not allowed:
+                print(f"🚦 속도 제한({scope}) 도달, 다음 주기에 다시 시도")
+                return new_tweets, requests
 
             print(f"✅ 감지된 트윗: {tweet.full_text}")
-            reply_text = generate_comment(tweet.full_text)
 
-            api.update_status(
-                status=f"@{TARGET_USERNAME} {reply_text}",
-                in_reply_to_status_id=tweet.id,
-                auto_populate_reply_metadata=True
-            )
+            try:
+                api.update_status(
+                    status=f"@{username} {result.text}",
+                    in_reply_to_status_id=tweet.id,
+                    auto_populate_reply_metadata=True
+                )
+            except tweepy.HTTPException as e:
+                if isinstance(e, tweepy.TooManyRequests):
+                    # 게시되지 않았으므로 토큰 반환 (플랫폼 범위는 아래 헤더로 닫힘)
+                    rate_limiter.release(target=username, platform="twitter")
+                rate_limiter.update_from_headers("twitter", e.response.headers)
+                raise
+            # 📉 성공한 응답의 남은 한도도 반영해 429 전에 멈춤
+            rate_limiter.update_from_headers("twitter", api.last_response.headers)
 
             print("💬 댓글 작성 완료!")
-            replied_tweet_ids.add(tweet.id)
+            poll_state.mark_replied(tweet.id)
+            poll_state.advance(username, tweet.id)
+            poll_state.save()
 
     except Exception as e:
         print(f"❌ 오류 발생: {e}")
+    finally:
+        # 커서는 처리가 끝난 트윗까지만 전진하므로 실패한 트윗은 다음 주기에 다시 시도
+        poll_state.save()
+
+    return new_tweets, requests
+
+class TwitterTimelineSource:
+    """
+    감시 계정들의 새 트윗을 PostEvent로 내보내는 Bot용 게시물 소스.
+    답글 루프(poll_target)와 커서를 공유하면 서로 처리 전 트윗을 건너뛰게 되므로
+    별도의 PollState와 상태 파일(TWITTER_SOURCE_STATE_FILE)을 사용
+    """
+
+    def __init__(self, usernames=None, state=None):
+        self.usernames = usernames or TARGET_USERNAMES
+        self.state = state or PollState(os.getenv("TWITTER_SOURCE_STATE_FILE", "twitter_source_state.json"))
+
+    def poll(self):
+        events = []
+        for username in self.usernames:
+            tweets, _ = fetch_new_tweets(username, self.state)
+            for tweet in tweets:
+                # 커서를 전진시켜 같은 트윗을 두 번 내보내지 않음
+                self.state.advance(username, tweet.id)
+                if tweet.in_reply_to_status_id is not None:
+                    continue
+                events.append(PostEvent(
+                    post_id=tweet.id,
+                    content=tweet.full_text,
+                    author=username,
+                    platform="twitter",
+                    source="twitter",
+                    created_at=tweet.created_at.isoformat()
+                ))
+        self.state.save()
+        return events
+
+def fetch_my_recent_tweet():
+    poll_target(TARGET_USERNAME)
+
+def create_scheduler(usernames=None):
+    """계정별 적응형 간격과 공유 API 예산으로 폴링하는 스케줄러 생성"""
+    return PollScheduler(
+        poll_target,
+        targets=usernames or TARGET_USERNAMES,
+        min_interval=int(os.getenv("POLL_MIN_INTERVAL", 60)),
+        max_interval=int(os.getenv("POLL_MAX_INTERVAL", 60 * 60)),
+        initial_interval=int(os.getenv("POLL_INITIAL_INTERVAL", 60 * 5)),
+        # user_timeline: 15분에 900회 (사용자 인증 기준)
+        request_budget=int(os.getenv("POLL_REQUEST_BUDGET", 900)),
+        budget_window=15 * 60
+    )
 
 # 🕐 루프
 if __name__ == "__main__":
-    print("📡 데일리필 봇 실행 시작: 앞으로 작성하는 트윗을 감시 중...🧡")
-    while True:
-        fetch_my_recent_tweet()
-        print("⏳ 5분 대기 후 재탐색 중...")
-        time.sleep(60 * 5)  # 5분 간격
-
+    print(f"📡 데일리필 봇 실행 시작: {len(TARGET_USERNAMES)}개 계정의 트윗을 감시 중...🧡")
+    create_scheduler().run_forever()